@@ -0,0 +1,60 @@
+"""Compare two benchmark result files and flag regressions.
+
+Usage::
+
+    python benchmarks/compare.py baseline.json candidate.json --threshold 0.1
+
+Cases are matched by key (benchmark name plus parameters) and compared
+on their median time. The exit status is ``1`` when any case got slower
+than ``threshold`` (a fraction, ``0.1`` = 10%), so the script can gate CI.
+"""
+
+import argparse
+import sys
+
+from harness import load_results
+
+
+def compare(
+    baseline: dict[str, dict],
+    candidate: dict[str, dict],
+    threshold: float,
+) -> list[tuple[str, float, float, float]]:
+    """Return ``(key, old, new, ratio)`` of cases slower than allowed."""
+    regressions = []
+    for key, new in candidate.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        old_median = old["summary"]["median"]
+        new_median = new["summary"]["median"]
+        if old_median <= 0:
+            continue
+        ratio = new_median / old_median
+        if ratio > 1 + threshold:
+            regressions.append((key, old_median, new_median, ratio))
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+    for key in sorted(candidate.keys() - baseline.keys()):
+        print(f"new case {key}")
+    regressions = compare(baseline, candidate, args.threshold)
+    for key, old, new, ratio in regressions:
+        print(
+            f"REGRESSION {key}: {old * 1e3:.3f} ms -> {new * 1e3:.3f} ms"
+            f" ({ratio:.2f}x)"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Timing helpers and machine-readable result records for the benchmarks.
+
+Each benchmark produces one :class:`Result` per parameter set. Results
+are written as a single JSON document tagged with the package version,
+git revision and interpreter so runs from different versions can be
+compared with ``benchmarks/compare.py``.
+"""
+
+import datetime as dt
+import gc
+import importlib.metadata
+import json
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+
+@dataclass
+class Result:
+    """Timings of one benchmark for one parameter set.
+
+    Attributes:
+        name: Benchmark name, e.g. ``"client_get"``.
+        params: Parameters that identify this case, e.g. body size.
+        times: Wall-clock seconds of each measured repetition.
+        items: Work items processed per repetition (bytes, records,
+            URLs...), used to derive the throughput.
+        unit: Name of the work item unit.
+    """
+
+    name: str
+    params: dict[str, Any]
+    times: list[float]
+    items: int = 1
+    unit: str = "call"
+    summary: dict[str, float] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        best = min(self.times)
+        median = statistics.median(self.times)
+        self.summary = {
+            "min": best,
+            "median": median,
+            "mean": statistics.fmean(self.times),
+            "stdev": (
+                statistics.stdev(self.times) if len(self.times) > 1 else 0.0
+            ),
+            "throughput": self.items / median if median > 0 else 0.0,
+        }
+
+    @property
+    def key(self) -> str:
+        """Stable identifier of the case used to match results across runs."""
+        params = ",".join(f"{k}={v}" for k, v in sorted(self.params.items()))
+        return f"{self.name}[{params}]"
+
+
+def measure(
+    fn: Callable[[], Any],
+    repeat: int = 5,
+    warmup: int = 1,
+) -> list[float]:
+    """Call ``fn`` ``warmup + repeat`` times and return the measured times.
+
+    The garbage collector is disabled while timing so that collections
+    triggered by a previous case do not leak into the next one.
+    """
+    for _ in range(warmup):
+        fn()
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return times
+
+
+def _git_revision() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return out.stdout.strip()
+
+
+def _package_version() -> str:
+    try:
+        return importlib.metadata.version("sidra-fetcher")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def environment() -> dict[str, str]:
+    """Describe the interpreter, machine and code revision of this run."""
+    return {
+        "sidra_fetcher": _package_version(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": dt.datetime.now(dt.timezone.utc).isoformat(),
+    }
+
+
+def write_results(results: list[Result], path: str | Path) -> None:
+    """Write ``results`` and the run environment as a JSON document."""
+    document = {
+        "environment": environment(),
+        "results": [asdict(r) | {"key": r.key} for r in results],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str | Path) -> dict[str, dict]:
+    """Load a results document and index its cases by :attr:`Result.key`."""
+    with open(path, "r", encoding="utf-8") as f:
+        document = json.load(f)
+    return {r["key"]: r for r in document["results"]}
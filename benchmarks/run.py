@@ -0,0 +1,394 @@
+"""Run the sidra-fetcher hot path benchmarks.
+
+Usage::
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --only client_get parse_url --repeat 10
+
+The HTTP benchmarks never touch the network: requests are answered by
+:class:`sidra_fetcher.mock.MockIBGE`, in-process by default or over a
+local socket with ``--server``, with an optional per-request latency
+for the async client. ``--fixtures DIR`` replays responses recorded with
+:class:`sidra_fetcher.replay.RecordReplayTransport` instead.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from harness import Result, measure, write_results
+
+from sidra_fetcher.fetcher import AsyncSidraClient, SidraClient
+from sidra_fetcher.mock import (
+    MockConfig,
+    MockIBGE,
+    MockIBGEServer,
+    build_localidades,
+    build_metadados,
+    build_periodos,
+    build_values,
+    values_rows_for_size,
+)
+from sidra_fetcher.reader import (
+    flatten_aggregate_metadata,
+    load_agregado,
+    read_localidades,
+    read_metadados,
+    read_periodos,
+    save_agregado,
+)
+from sidra_fetcher.replay import (
+    AsyncRecordReplayTransport,
+    RecordReplayTransport,
+)
+from sidra_fetcher.sidra import parse_url
+from sidra_fetcher.stats import (
+    AgregadoCounts,
+    calculate_aggregate_counts,
+    calculate_catalog,
+)
+from sidra_fetcher.values import decode_value, decode_values
+
+BODY_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+NIVEIS = ["N1", "N2", "N3", "N6", "N7", "N8", "N9", "N13", "N14", "N15"]
+N_NIVEIS = [1, 3, 6, 10]
+N_CATEGORIAS = [10, 50, 200]
+N_VALUES = [10_000, 1_000_000]
+N_AGREGADOS = [1_000, 10_000]
+IMPORT_MODULES = [
+    "sidra_fetcher",
+    "sidra_fetcher.sidra",
+    "sidra_fetcher.reader",
+    "sidra_fetcher.stats",
+    "sidra_fetcher.fetcher",
+]
+URLS = [
+    "https://apisidra.ibge.gov.br/values/t/6723/n1/all/v/all/p/all"
+    "/c844/all/d/v1394%202,v1395%202,v1396%202,v10008%205",
+    "https://apisidra.ibge.gov.br/values/t/1419/n1/all/n7/all/v/63,69"
+    "/p/202001,202002,202003/c315/7169,7170/h/n/f/c/d/m",
+    "https://apisidra.ibge.gov.br/values/t/6579/n6/3304557,3550308"
+    "/v/9324/p/last%205/f/u/d/s",
+]
+
+
+@dataclass
+class Options:
+    """Command line options shared by every benchmark."""
+
+    repeat: int = 5
+    latency: float = 0.005
+    server: bool = False
+    fixtures: Path | None = None
+
+
+@contextlib.contextmanager
+def transports(
+    options: Options, config: MockConfig
+) -> Iterator[tuple[Any, Any]]:
+    """Yield ``(sync, async)`` transports serving ``config``."""
+    if options.fixtures is not None:
+        yield (
+            RecordReplayTransport(options.fixtures),
+            AsyncRecordReplayTransport(options.fixtures),
+        )
+        return
+    app = MockIBGE(config)
+    if options.server:
+        with MockIBGEServer(app) as server:
+            yield server.transport(), server.async_transport()
+        return
+    yield app.transport(), app.async_transport()
+
+
+def bench_client_get(options: Options) -> list[Result]:
+    """Throughput of :meth:`SidraClient.get` against response body size."""
+    url = "https://apisidra.ibge.gov.br/values/t/1/n6/all/v/all/p/all"
+    results = []
+    for size in BODY_SIZES:
+        config = MockConfig(values_rows=values_rows_for_size(size))
+        with (
+            transports(options, config) as (transport, _),
+            SidraClient(transport=transport) as client,
+        ):
+            n_bytes = len(json.dumps(client.get(url)).encode("utf-8"))
+            times = measure(lambda: client.get(url), repeat=options.repeat)
+        results.append(
+            Result(
+                name="client_get",
+                params={"body_bytes": size},
+                times=times,
+                items=n_bytes,
+                unit="byte",
+            )
+        )
+    return results
+
+
+def bench_async_get_agregado(options: Options) -> list[Result]:
+    """Latency of :meth:`AsyncSidraClient.get_agregado` against levels."""
+
+    async def run_case(transport: Any) -> list[float]:
+        loop = asyncio.get_running_loop()
+        times = []
+        async with AsyncSidraClient(transport=transport) as client:
+            for _ in range(options.repeat + 1):
+                t0 = loop.time()
+                await client.get_agregado(1705)
+                times.append(loop.time() - t0)
+        return times[1:]
+
+    results = []
+    for n in N_NIVEIS:
+        config = MockConfig(latency=options.latency, niveis=NIVEIS[:n])
+        with transports(options, config) as (_, transport):
+            times = asyncio.run(run_case(transport))
+        results.append(
+            Result(
+                name="async_get_agregado",
+                params={"n_niveis": n, "latency": options.latency},
+                times=times,
+            )
+        )
+    return results
+
+
+def bench_flatten(options: Options) -> list[Result]:
+    """Records per second of :func:`flatten_aggregate_metadata`."""
+    results = []
+    for n in N_CATEGORIAS:
+        data = build_metadados(1705, ["N1"], n_categorias=n)
+        n_records = sum(1 for _ in flatten_aggregate_metadata(data))
+        times = measure(
+            lambda: sum(1 for _ in flatten_aggregate_metadata(data)),
+            repeat=options.repeat,
+        )
+        results.append(
+            Result(
+                name="flatten_aggregate_metadata",
+                params={"n_categorias": n},
+                times=times,
+                items=n_records,
+                unit="record",
+            )
+        )
+    return results
+
+
+def bench_save_load(options: Options) -> list[Result]:
+    """Round-trip time of :func:`save_agregado` and :func:`load_agregado`."""
+    results = []
+    for niveis in (["N1", "N3"], ["N1", "N3", "N6"]):
+        agregado = read_metadados(build_metadados(1705, niveis))
+        agregado.periodos = read_periodos(build_periodos())
+        agregado.localidades = [
+            loc
+            for nivel in niveis
+            for loc in read_localidades(build_localidades(nivel))
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "agregado.json"
+
+            def round_trip() -> None:
+                save_agregado(agregado, path)
+                load_agregado(path)
+
+            times = measure(round_trip, repeat=options.repeat)
+        results.append(
+            Result(
+                name="save_load_agregado",
+                params={"n_localidades": len(agregado.localidades)},
+                times=times,
+            )
+        )
+    return results
+
+
+def bench_parse_url(options: Options) -> list[Result]:
+    """URLs per second of :func:`sidra.parse_url`."""
+    urls = URLS * 1000
+    times = measure(
+        lambda: [parse_url(url) for url in urls], repeat=options.repeat
+    )
+    return [
+        Result(
+            name="parse_url",
+            params={"n_urls": len(urls)},
+            times=times,
+            items=len(urls),
+            unit="url",
+        )
+    ]
+
+
+def bench_decode_values(options: Options) -> list[Result]:
+    """Values per second of row-wise against batched ``V`` decoding."""
+    results = []
+    for n in N_VALUES:
+        valores = [row["V"] for row in build_values(n)[1:]]
+        for method, fn in (
+            ("row", lambda: [decode_value(v) for v in valores]),
+            ("batch", lambda: decode_values(valores)),
+        ):
+            times = measure(fn, repeat=options.repeat)
+            results.append(
+                Result(
+                    name="decode_values",
+                    params={"method": method, "n_values": n},
+                    times=times,
+                    items=n,
+                    unit="value",
+                )
+            )
+    return results
+
+
+def bench_catalog_stats(options: Options) -> list[Result]:
+    """Agregados per second of per-agregado against columnar statistics."""
+    results = []
+    for n in N_AGREGADOS:
+        counts = [
+            AgregadoCounts(
+                agregado_id=i,
+                pesquisa_id="",
+                n_periodos=12 + i % 300,
+                stat_localidades={"N1": 1, "N3": 27},
+                n_variaveis=1 + i % 20,
+                n_categorias=[10 + i % 50] * (i % 4),
+            )
+            for i in range(n)
+        ]
+        for method, fn in (
+            ("row", lambda: [calculate_aggregate_counts(c) for c in counts]),
+            ("batch", lambda: calculate_catalog(counts)),
+        ):
+            times = measure(fn, repeat=options.repeat)
+            results.append(
+                Result(
+                    name="catalog_stats",
+                    params={"method": method, "n_agregados": n},
+                    times=times,
+                    items=n,
+                    unit="agregado",
+                )
+            )
+    return results
+
+
+def bench_import_time(options: Options) -> list[Result]:
+    """Import time of the package modules, from ``python -X importtime``.
+
+    Each repetition imports the module in a fresh interpreter and reads
+    its cumulative import time, dependencies included. Modules whose
+    import never reports a time, e.g. because it fails, are skipped.
+    """
+    results = []
+    for module in IMPORT_MODULES:
+        times = []
+        for _ in range(options.repeat):
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode:
+                continue
+            for line in proc.stderr.splitlines():
+                if not line.startswith("import time:"):
+                    continue
+                _, cumulative, name = line.split("|")
+                if name.strip() == module:
+                    times.append(int(cumulative) / 1e6)
+        if not times:
+            error = proc.stderr.strip().splitlines()[-1:] or ["no output"]
+            print(
+                f"Skipping import_time of {module}: {error[0]}",
+                file=sys.stderr,
+            )
+            continue
+        results.append(
+            Result(
+                name="import_time",
+                params={"module": module},
+                times=times,
+                unit="import",
+            )
+        )
+    return results
+
+
+BENCHMARKS: dict[str, Callable[[Options], list[Result]]] = {
+    "client_get": bench_client_get,
+    "async_get_agregado": bench_async_get_agregado,
+    "flatten_aggregate_metadata": bench_flatten,
+    "save_load_agregado": bench_save_load,
+    "parse_url": bench_parse_url,
+    "decode_values": bench_decode_values,
+    "catalog_stats": bench_catalog_stats,
+    "import_time": bench_import_time,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("bench_output.json"),
+        help="Where to write the JSON results (default: %(default)s)",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.005,
+        help="Simulated per-request latency in seconds for async cases",
+    )
+    parser.add_argument(
+        "--server",
+        action="store_true",
+        help="Serve HTTP cases from a local socket instead of in-process",
+    )
+    parser.add_argument(
+        "--fixtures",
+        type=Path,
+        help="Replay HTTP cases from a directory of recorded fixtures",
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=sorted(BENCHMARKS),
+        help="Run only the named benchmarks",
+    )
+    args = parser.parse_args(argv)
+    options = Options(
+        repeat=args.repeat,
+        latency=args.latency,
+        server=args.server,
+        fixtures=args.fixtures,
+    )
+
+    results: list[Result] = []
+    for name in args.only or BENCHMARKS:
+        for result in BENCHMARKS[name](options):
+            summary = result.summary
+            print(
+                f"{result.key:<55} median {summary['median'] * 1e3:10.3f} ms"
+                f"  {summary['throughput']:14.1f} {result.unit}/s",
+                file=sys.stderr,
+            )
+            results.append(result)
+    write_results(results, args.output)
+    print(json.dumps({"output": str(args.output)}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,9 +17,75 @@
 
 Provides a package-level ``logger`` configured with a NullHandler so
 that consumers can opt-in to logging configuration.
+
+Importing the package is cheap: submodules and the names re-exported
+here (``SidraClient``, ``Parametro``, ...) are only imported on first
+access (PEP 562), so ``httpx`` and ``tenacity`` are loaded when a client
+is first used, not by tools that only need :mod:`sidra_fetcher.sidra`
+or :mod:`sidra_fetcher.reader`.
 """
 
+import importlib
 import logging
+from typing import TYPE_CHECKING, Any
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
+
+if TYPE_CHECKING:
+    from .agregados import Agregado, LazyAgregado
+    from .cache import ObjectCache
+    from .fetcher import AsyncSidraClient, SidraClient
+    from .jobs import ExtractionJob
+    from .scheduler import Priority, RequestScheduler
+    from .sidra import Parametro, parameter_from_url
+
+_ATTRIBUTES = {
+    "Agregado": "agregados",
+    "AsyncSidraClient": "fetcher",
+    "ExtractionJob": "jobs",
+    "LazyAgregado": "agregados",
+    "ObjectCache": "cache",
+    "Parametro": "sidra",
+    "Priority": "scheduler",
+    "RequestScheduler": "scheduler",
+    "SidraClient": "fetcher",
+    "parameter_from_url": "sidra",
+}
+
+__all__ = [
+    "Agregado",
+    "AsyncSidraClient",
+    "ExtractionJob",
+    "LazyAgregado",
+    "ObjectCache",
+    "Parametro",
+    "Priority",
+    "RequestScheduler",
+    "SidraClient",
+    "logger",
+    "parameter_from_url",
+]
+
+
+def __getattr__(name: str) -> Any:
+    module = _ATTRIBUTES.get(name)
+    if module is not None:
+        value = getattr(importlib.import_module(f".{module}", __name__), name)
+    elif name.startswith("_"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    else:
+        try:
+            value = importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(
+                f"module {__name__!r} has no attribute {name!r}"
+            ) from None
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
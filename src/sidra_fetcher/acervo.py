@@ -0,0 +1,333 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Index of the acervos: which agregados use each item.
+
+:class:`AcervoIndex` maps every acervo item (variable, classification,
+territorial level, assunto, ...) to the ids of the agregados that use
+it, so "which agregados have variable 93?" is a dictionary lookup::
+
+    index = AcervoIndex("acervos.json")
+    index.refresh(client)                 # Only items not indexed yet
+    index.agregados(AcervoEnum.CLASSIFICACAO, "12896")
+    index.save()
+
+The index is filled from two sources:
+
+- :meth:`refresh` lists the items of each acervo and, for the acervos
+  the API can filter by (:data:`~sidra_fetcher.agregados.ACERVO_FILTROS`),
+  requests the agregados of every item not indexed yet, or indexed more
+  than ``max_age`` seconds ago.
+- :meth:`add_agregado` indexes the variables, classifications, levels
+  and assunto of an agregado already fetched. Variables can only be
+  indexed this way: the API does not filter agregados by variable.
+"""
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from . import logger
+from .agregados import (
+    ACERVO_FILTROS,
+    AcervoEnum,
+    AcervoItem,
+    Agregado,
+    IndicePesquisaAgregados,
+)
+from .reader import read_acervo
+
+Chave = tuple[AcervoEnum, str]
+
+# Acervos indexed from the metadados of an agregado
+_DO_AGREGADO = {
+    AcervoEnum.ASSUNTO,
+    AcervoEnum.CLASSIFICACAO,
+    AcervoEnum.NIVELTERRITORIAL,
+    AcervoEnum.VARIAVEL,
+}
+
+
+def _agregado_ids(indice: list[IndicePesquisaAgregados]) -> set[int]:
+    return {agregado.id for p in indice for agregado in p.agregados}
+
+
+class AcervoIndex:
+    """Persistent map of acervo items to the agregados using them.
+
+    Args:
+        path: JSON file of the index; loaded if it exists.
+        clock: Wall clock of the refresh times, replaceable in tests.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = None if path is None else Path(path)
+        self.clock = clock
+        self._itens: dict[AcervoEnum, dict[str, AcervoItem]] = {}
+        self._agregados: dict[Chave, set[int]] = {}
+        self._chaves: dict[int, set[Chave]] = {}
+        self._atualizado: dict[Chave, float] = {}
+        if self.path is not None and self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._load(json.load(f))
+
+    def _load(self, data: dict[str, Any]) -> None:
+        for acervo, itens in data["itens"].items():
+            self._itens[AcervoEnum(acervo)] = {
+                item.id: item for item in read_acervo(itens)
+            }
+        for acervo, agregados in data["agregados"].items():
+            for item_id, ids in agregados.items():
+                self._set((AcervoEnum(acervo), item_id), ids)
+        for acervo, tempos in data["atualizado"].items():
+            for item_id, tempo in tempos.items():
+                self._atualizado[(AcervoEnum(acervo), item_id)] = tempo
+
+    def save(self, path: str | Path | None = None) -> None:
+        """Write the index to ``path``, by default :attr:`path`."""
+        path = self.path if path is None else Path(path)
+        if path is None:
+            raise ValueError("No path to save the index to")
+        data: dict[str, dict[str, Any]] = {
+            "itens": {},
+            "agregados": {},
+            "atualizado": {},
+        }
+        for acervo, itens in self._itens.items():
+            data["itens"][acervo.value] = [
+                {"id": item.id, "literals": item.literals}
+                for item in itens.values()
+            ]
+        for (acervo, item_id), ids in self._agregados.items():
+            data["agregados"].setdefault(acervo.value, {})[item_id] = sorted(
+                ids
+            )
+        for (acervo, item_id), tempo in self._atualizado.items():
+            data["atualizado"].setdefault(acervo.value, {})[item_id] = tempo
+        # Through a .part file, so a checkpoint interrupted midway
+        # leaves the previous index
+        part = path.with_name(path.name + ".part")
+        with open(part, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(part, path)
+
+    def __len__(self) -> int:
+        return len(self._chaves)
+
+    def __contains__(self, agregado_id: int) -> bool:
+        return agregado_id in self._chaves
+
+    def items(self, acervo: AcervoEnum) -> list[AcervoItem]:
+        """Return the listed items of ``acervo``."""
+        return list(self._itens.get(acervo, {}).values())
+
+    def item(self, acervo: AcervoEnum, item_id: str) -> AcervoItem | None:
+        """Return one item of ``acervo``, if listed."""
+        return self._itens.get(acervo, {}).get(str(item_id))
+
+    def agregados(self, acervo: AcervoEnum, item_id: str | int) -> set[int]:
+        """Return the ids of the agregados using an item."""
+        return set(self._agregados.get((acervo, str(item_id)), ()))
+
+    def keys(self, agregado_id: int) -> set[Chave]:
+        """Return the ``(acervo, item_id)`` indexed for an agregado."""
+        return set(self._chaves.get(agregado_id, ()))
+
+    def _set(self, chave: Chave, ids: Iterable[int]) -> None:
+        for agregado_id in list(self._agregados.get(chave, ())):
+            self._discard(chave, agregado_id)
+        ids = set(ids)
+        if ids:
+            self._agregados[chave] = ids
+        for agregado_id in ids:
+            self._chaves.setdefault(agregado_id, set()).add(chave)
+
+    def _add(self, chave: Chave, agregado_id: int) -> None:
+        self._agregados.setdefault(chave, set()).add(agregado_id)
+        self._chaves.setdefault(agregado_id, set()).add(chave)
+
+    def _discard(self, chave: Chave, agregado_id: int) -> None:
+        ids = self._agregados[chave]
+        ids.discard(agregado_id)
+        if not ids:
+            del self._agregados[chave]
+        chaves = self._chaves[agregado_id]
+        chaves.discard(chave)
+        if not chaves:
+            del self._chaves[agregado_id]
+
+    def remove_agregado(self, agregado_id: int) -> None:
+        """Drop an agregado from every item."""
+        for chave in self.keys(agregado_id):
+            self._discard(chave, agregado_id)
+
+    def add_agregado(self, agregado: Agregado) -> None:
+        """Index the items used by an agregado, replacing previous ones.
+
+        Indexes its variables, classifications and territorial levels,
+        and its assunto when the assunto acervo is listed. Periods and
+        periodicidades indexed by :meth:`refresh` are kept.
+        """
+        for chave in self.keys(agregado.id):
+            if chave[0] in _DO_AGREGADO:
+                self._discard(chave, agregado.id)
+        niveis = agregado.nivel_territorial
+        chaves = [
+            *((AcervoEnum.VARIAVEL, str(v.id)) for v in agregado.variaveis),
+            *(
+                (AcervoEnum.CLASSIFICACAO, str(c.id))
+                for c in agregado.classificacoes
+            ),
+            *(
+                (AcervoEnum.NIVELTERRITORIAL, nivel)
+                for nivel in niveis.administrativo
+                + niveis.especial
+                + niveis.ibge
+            ),
+        ]
+        assuntos = {
+            item.nome: item.id
+            for item in self._itens.get(AcervoEnum.ASSUNTO, {}).values()
+        }
+        if agregado.assunto in assuntos:
+            chaves.append((AcervoEnum.ASSUNTO, assuntos[agregado.assunto]))
+        for chave in chaves:
+            self._add(chave, agregado.id)
+
+    def _list(self, acervo: AcervoEnum, data: Any) -> list[AcervoItem]:
+        """Replace the items of ``acervo``, dropping the removed ones."""
+        itens = {item.id: item for item in read_acervo(data)}
+        for item_id in self._itens.get(acervo, {}).keys() - itens.keys():
+            self._set((acervo, item_id), ())
+            self._atualizado.pop((acervo, item_id), None)
+        self._itens[acervo] = itens
+        return list(itens.values())
+
+    def _stale(
+        self, acervo: AcervoEnum, max_age: float | None
+    ) -> list[AcervoItem]:
+        agora = self.clock()
+        return [
+            item
+            for item in self._itens.get(acervo, {}).values()
+            if (tempo := self._atualizado.get((acervo, item.id))) is None
+            or (max_age is not None and agora - tempo > max_age)
+        ]
+
+    def _filled(
+        self,
+        acervo: AcervoEnum,
+        item: AcervoItem,
+        indice: list[IndicePesquisaAgregados],
+    ) -> None:
+        self._set((acervo, item.id), _agregado_ids(indice))
+        self._atualizado[(acervo, item.id)] = self.clock()
+
+    def _checkpoint(self, n: int, checkpoint: int | None) -> None:
+        if self.path is not None and checkpoint and n % checkpoint == 0:
+            self.save()
+            logger.info(f"Saved the acervo index after {n} requests")
+
+    def refresh(
+        self,
+        client: Any,
+        acervos: Iterable[AcervoEnum] = tuple(AcervoEnum),
+        max_age: float | None = None,
+        checkpoint: int | None = 100,
+    ) -> int:
+        """List the acervos and index the agregados of their items.
+
+        Args:
+            client: A :class:`~sidra_fetcher.fetcher.SidraClient`.
+            acervos: Acervos to refresh.
+            max_age: Seconds after which an indexed item is requested
+                again; by default only new items are requested.
+            checkpoint: With a :attr:`path`, save the index every
+                ``checkpoint`` requests, so an interrupted refresh
+                resumes from there. ``None`` only saves on
+                :meth:`save`.
+
+        Returns:
+            The number of filtered agregados requests made.
+        """
+        n = 0
+        for acervo in acervos:
+            self._list(acervo, client.get_acervo(acervo))
+            filtro = ACERVO_FILTROS.get(acervo)
+            if filtro is None:
+                continue
+            for item in self._stale(acervo, max_age):
+                indice = client.get_indice_pesquisas_agregados(
+                    {filtro: item.id}
+                )
+                self._filled(acervo, item, indice)
+                n += 1
+                self._checkpoint(n, checkpoint)
+            logger.info(f"Indexed acervo {acervo.name}")
+        return n
+
+    async def refresh_async(
+        self,
+        client: Any,
+        acervos: Iterable[AcervoEnum] = tuple(AcervoEnum),
+        max_age: float | None = None,
+        checkpoint: int | None = 100,
+        max_concurrency: int = 4,
+    ) -> int:
+        """Async counterpart of :meth:`refresh`.
+
+        At most ``max_concurrency`` requests run at once. Each item is
+        indexed as soon as its request completes: a failed request is
+        raised once the others are done, keeping their results.
+        """
+        acervos = list(acervos)
+        listagens = await asyncio.gather(
+            *(client.get_acervo(acervo) for acervo in acervos)
+        )
+        pendentes = []
+        for acervo, data in zip(acervos, listagens):
+            self._list(acervo, data)
+            if acervo in ACERVO_FILTROS:
+                pendentes += [
+                    (acervo, item) for item in self._stale(acervo, max_age)
+                ]
+        semaphore = asyncio.Semaphore(max_concurrency)
+        n = 0
+
+        async def fill(acervo: AcervoEnum, item: AcervoItem) -> None:
+            nonlocal n
+            async with semaphore:
+                indice = await client.get_indice_pesquisas_agregados(
+                    {ACERVO_FILTROS[acervo]: item.id}
+                )
+            self._filled(acervo, item, indice)
+            n += 1
+            self._checkpoint(n, checkpoint)
+
+        resultados = await asyncio.gather(
+            *(fill(acervo, item) for acervo, item in pendentes),
+            return_exceptions=True,
+        )
+        for resultado in resultados:
+            if isinstance(resultado, BaseException):
+                raise resultado
+        return n
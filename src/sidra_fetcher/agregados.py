@@ -26,10 +26,14 @@ containers for data downloaded by :class:`sidra_fetcher.fetcher.SidraClient`.
 
 import datetime as dt
 import urllib.parse as urlparse
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field, fields
 from enum import StrEnum
+from typing import TYPE_CHECKING, Any
 from urllib.parse import urlencode
 
+if TYPE_CHECKING:
+    from .categorias import CategoriaTree
+
 BASE_URL = "https://servicodados.ibge.gov.br/api/v3/agregados"
 
 
@@ -207,6 +211,264 @@ class Agregado:
     def asdict(self) -> dict:
         return asdict(self)
 
+    def category_tree(self, classificacao_id: int) -> "CategoriaTree":
+        """Return the category tree of a classification.
+
+        The :class:`~sidra_fetcher.categorias.CategoriaTree` is built on
+        first use and kept on the agregado; a classification replaced
+        since gets a new tree.
+
+        Raises:
+            KeyError: If the agregado has no such classification.
+        """
+        from .categorias import CategoriaTree
+
+        classificacao = next(
+            (c for c in self.classificacoes if c.id == classificacao_id),
+            None,
+        )
+        if classificacao is None:
+            raise KeyError(classificacao_id)
+        arvores = self.__dict__.setdefault("_category_trees", {})
+        cached = arvores.get(classificacao_id)
+        if cached is None or cached[0] is not classificacao:
+            cached = arvores[classificacao_id] = (
+                classificacao,
+                CategoriaTree(classificacao),
+            )
+        return cached[1]
+
+
+_LAZY = ("periodos", "localidades")
+
+
+@dataclass(init=False, repr=False)
+class LazyAgregado(Agregado):
+    """:class:`Agregado` whose periodos and localidades load on demand.
+
+    Built from the metadados by ``get_agregado(..., lazy=True)``. The
+    ``periodos`` and ``localidades`` attributes are fetched with the
+    client on first access and kept afterwards; localidades are fetched
+    one territorial level at a time, so ``localidades_nivel("N3")`` never
+    downloads the municipalities.
+
+    With an :class:`~sidra_fetcher.fetcher.AsyncSidraClient`, load them
+    first with ``await fetch_periodos()`` and ``await
+    fetch_localidades()``; accessing an attribute that is not loaded yet
+    raises :class:`RuntimeError`.
+
+    :meth:`n_periodos` and :meth:`stat_localidades` count without
+    building the lists, from the raw API responses, and are used by
+    :func:`sidra_fetcher.stats.calculate_aggregate`. With an async
+    client, call ``await fetch_counts()`` first. A client with an
+    :class:`~sidra_fetcher.cache.ObjectCache` loads the lists through
+    its cached methods instead, to share them with the cache.
+
+    Comparison only looks at the metadados and ``repr`` at what is
+    loaded, so neither sends a request. :meth:`asdict`, used to save
+    and snapshot the agregado, and :func:`dataclasses.replace`, which
+    keeps the client, load the lists first.
+
+    Args:
+        metadados: The agregado read from the metadados.
+        client: Sync or async client loading the lists.
+        **campos: Fields of the metadados, overriding ``metadados``.
+    """
+
+    client: Any = field(default=None, kw_only=True, compare=False)
+
+    def __init__(
+        self,
+        metadados: Agregado | None = None,
+        client: Any = None,
+        **campos: Any,
+    ) -> None:
+        if metadados is not None:
+            campos = {
+                f.name: getattr(metadados, f.name)
+                for f in fields(Agregado)
+                if f.name not in _LAZY
+            } | campos
+        self.client = client
+        self._periodos: list[Periodo] | None = None
+        self._localidades: dict[str, list[Localidade]] = {}
+        self._n_periodos: int | None = None
+        self._n_localidades: dict[str, int] = {}
+        for name, value in campos.items():
+            setattr(self, name, value)
+
+    def __repr__(self) -> str:
+        return (
+            f"LazyAgregado(id={self.id!r}, nome={self.nome!r}, "
+            f"periodos_loaded={self._periodos is not None}, "
+            f"niveis_loaded={sorted(self._localidades)})"
+        )
+
+    @property
+    def niveis(self) -> list[str]:
+        """Territorial levels declared by the agregado."""
+        return (
+            self.nivel_territorial.administrativo
+            + self.nivel_territorial.especial
+            + self.nivel_territorial.ibge
+        )
+
+    def _check_sync(self, attribute: str) -> None:
+        import inspect
+
+        if inspect.iscoroutinefunction(self.client.get):
+            raise RuntimeError(
+                f"{attribute} of agregado {self.id} is not loaded, "
+                f"await fetch_{attribute}() first"
+            )
+
+    @property
+    def periodos(self) -> list[Periodo]:
+        if self._periodos is None:
+            self._check_sync("periodos")
+            self._periodos = self.client.get_agregado_periodos(self.id)
+        return self._periodos
+
+    @periodos.setter
+    def periodos(self, periodos: list[Periodo]) -> None:
+        self._periodos = periodos
+
+    def localidades_nivel(self, nivel: str) -> list[Localidade]:
+        """Return the localidades of one territorial level."""
+        if nivel not in self._localidades:
+            self._check_sync("localidades")
+            self._localidades[nivel] = self.client.get_agregado_localidades(
+                self.id, nivel
+            )
+        return self._localidades[nivel]
+
+    @property
+    def localidades(self) -> list[Localidade]:
+        return [
+            localidade
+            for nivel in self.niveis
+            for localidade in self.localidades_nivel(nivel)
+        ]
+
+    @localidades.setter
+    def localidades(self, localidades: list[Localidade]) -> None:
+        self._localidades = {nivel: [] for nivel in self.niveis}
+        for localidade in localidades:
+            nivel = localidade.nivel.id
+            self._localidades.setdefault(nivel, []).append(localidade)
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(
+            getattr(self, f.name) == getattr(other, f.name)
+            for f in fields(Agregado)
+            if f.name not in _LAZY
+        )
+
+    def asdict(self) -> dict:
+        """Return the agregado as a dict, loading what is missing.
+
+        Raises:
+            RuntimeError: With an async client, if the periodos or the
+                localidades are not fetched yet.
+        """
+        agregado = Agregado(
+            **{f.name: getattr(self, f.name) for f in fields(Agregado)}
+        )
+        return asdict(agregado)
+
+    async def fetch_periodos(self) -> list[Periodo]:
+        """Load the periodos with an async client."""
+        if self._periodos is None:
+            self._periodos = await self.client.get_agregado_periodos(self.id)
+        return self._periodos
+
+    async def fetch_localidades(
+        self, nivel: str | None = None
+    ) -> list[Localidade]:
+        """Load the localidades of ``nivel``, or all, with an async client."""
+        import asyncio  # Not at module level, it is slow to import
+
+        niveis = self.niveis if nivel is None else [nivel]
+        missing = [n for n in niveis if n not in self._localidades]
+        results = await asyncio.gather(
+            *(
+                self.client.get_agregado_localidades(self.id, n)
+                for n in missing
+            )
+        )
+        self._localidades.update(zip(missing, results))
+        return [loc for n in niveis for loc in self._localidades[n]]
+
+    def _cached(self) -> bool:
+        """Whether the client keeps the lists in an ``ObjectCache``."""
+        from .cache import ObjectCache
+
+        return isinstance(getattr(self.client, "cache", None), ObjectCache)
+
+    def n_periodos(self) -> int:
+        """Return the number of periodos without building them."""
+        if self._periodos is not None:
+            return len(self._periodos)
+        if self._n_periodos is None:
+            self._check_sync("periodos")
+            if self._cached():
+                return len(self.periodos)
+            url = build_url_periodos(self.id)
+            self._n_periodos = len(self.client.get(url))
+        return self._n_periodos
+
+    def stat_localidades(self) -> dict[str, int]:
+        """Count localidades per level without building them.
+
+        Same result as :func:`sidra_fetcher.stats.get_stat_localidades`.
+        """
+        cached = self._cached()
+        stat = {}
+        for nivel in self.niveis:
+            if nivel in self._localidades or cached:
+                n = len(self.localidades_nivel(nivel))
+            else:
+                if nivel not in self._n_localidades:
+                    self._check_sync("localidades")
+                    url = build_url_localidades(self.id, nivel)
+                    self._n_localidades[nivel] = len(self.client.get(url))
+                n = self._n_localidades[nivel]
+            if n:
+                stat[nivel] = n
+        return stat
+
+    async def fetch_counts(self) -> None:
+        """Load the counts of :meth:`n_periodos` and :meth:`stat_localidades`.
+
+        Needed before counting with an async client.
+        """
+        import asyncio
+
+        if self._cached():
+            await asyncio.gather(
+                self.fetch_periodos(), self.fetch_localidades()
+            )
+            return
+        urls = {}
+        if self._periodos is None and self._n_periodos is None:
+            urls["periodos"] = build_url_periodos(self.id)
+        for nivel in self.niveis:
+            if (
+                nivel not in self._localidades
+                and nivel not in self._n_localidades
+            ):
+                urls[nivel] = build_url_localidades(self.id, nivel)
+        results = await asyncio.gather(
+            *(self.client.get(url) for url in urls.values())
+        )
+        for key, data in zip(urls, results):
+            if key == "periodos":
+                self._n_periodos = len(data)
+            else:
+                self._n_localidades[key] = len(data)
+
 
 @dataclass
 class IndiceAgregado:
@@ -251,13 +513,48 @@ class AcervoEnum(StrEnum):
     """
 
 
-def build_url_agregados() -> str:
+@dataclass
+class AcervoItem:
+    """Item of an acervo listing, like a variable or a classification.
+
+    Attributes:
+        id: Item identifier, the value of its filter parameter.
+        literals: Names of the item; the first is the display name.
+    """
+
+    id: str
+    literals: list[str]
+
+    @property
+    def nome(self) -> str:
+        return self.literals[0] if self.literals else ""
+
+
+# Query parameter of the agregados index filtering by each acervo; the
+# API has no filter by variable
+ACERVO_FILTROS: dict[AcervoEnum, str] = {
+    AcervoEnum.ASSUNTO: "assunto",
+    AcervoEnum.CLASSIFICACAO: "classificacao",
+    AcervoEnum.NIVELTERRITORIAL: "nivel",
+    AcervoEnum.PERIODO: "periodo",
+    AcervoEnum.PERIODICIDADE: "periodicidade",
+}
+
+
+def build_url_agregados(filtros: dict[str, str] | None = None) -> str:
     """Return the base URL for listing agregados grouped by pesquisa.
 
+    Args:
+        filtros: Query parameters restricting the agregados listed,
+            like ``{"classificacao": "12896"}`` (see
+            :data:`ACERVO_FILTROS`).
+
     Returns:
         The absolute URL to request the agregados index.
     """
-    return BASE_URL
+    if not filtros:
+        return BASE_URL
+    return BASE_URL + "?" + urlencode(filtros)
 
 
 def build_url_metadados(agregado_id: int) -> str:
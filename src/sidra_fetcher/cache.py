@@ -0,0 +1,342 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""In-memory cache of parsed API objects.
+
+:class:`ObjectCache` keeps the :class:`~sidra_fetcher.agregados.Agregado`
+metadata, periods and localities returned by the clients, so hot
+agregados skip the download, the JSON decoding and the dataclass
+construction. Pass one to a client with ``SidraClient(cache=...)`` or
+``AsyncSidraClient(cache=...)``; entries are keyed by endpoint and
+arguments, e.g. ``("localidades", 1705, "N6")``.
+
+- Eviction is least-recently-used and bounded by ``max_bytes``, using
+  :func:`estimate_size` of each object: an agregado with every N6
+  locality weighs thousands of times more than one without.
+- Entries live ``ttl`` seconds. During the last ``refresh_ahead``
+  seconds of their life they are still served, and a background reload
+  replaces them before they expire.
+- For ``stale_while_revalidate`` seconds after expiring they are served
+  stale while a background reload runs.
+- Concurrent async loads of the same key share one request.
+
+Methods decorated with :func:`cached` return deep copies of the cached
+objects, so a caller changing them cannot corrupt the cache; objects
+read straight from an :class:`ObjectCache` are shared and must not be
+mutated.
+"""
+
+import asyncio
+import functools
+import inspect
+import sys
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+from dataclasses import dataclass, fields, is_dataclass
+from enum import Enum
+from typing import Any, Awaitable, Callable, Hashable
+
+from . import logger
+from .instrumentation import EventType
+
+
+def estimate_size(obj: Any) -> int:
+    """Approximate the memory used by ``obj`` and everything it holds.
+
+    Walks dataclasses, lists, tuples, sets and dicts, counting each
+    object once. Enum members and other module-level singletons are
+    not counted.
+    """
+    seen: set[int] = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, (Enum, type)) or o is None:
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif is_dataclass(o):
+            if hasattr(o, "__dict__"):
+                size += sys.getsizeof(o.__dict__)
+            stack.extend(getattr(o, f.name) for f in fields(o))
+    return size
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    stored: float
+
+
+class ObjectCache:
+    """Size-bounded LRU cache with TTL, refresh-ahead and stale serving.
+
+    Thread-safe, so a cache can be shared by several clients, sync or
+    async.
+
+    Args:
+        max_bytes: Upper bound of the :func:`estimate_size` of the
+            cached objects. Objects larger than this are not cached.
+        ttl: Seconds an entry is fresh.
+        refresh_ahead: Seconds before expiry from which a hit also
+            reloads the entry in the background. ``0`` disables it.
+        stale_while_revalidate: Seconds after expiry an entry is still
+            served while it is reloaded in the background.
+        clock: Monotonic time source, replaceable in tests.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 2**20,
+        ttl: float = 3600.0,
+        refresh_ahead: float = 0.0,
+        stale_while_revalidate: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.stale_while_revalidate = stale_while_revalidate
+        self.clock = clock
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.RLock()
+        self._loading: dict[Hashable, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key)[0] is not None
+
+    def _lookup(self, key: Hashable) -> tuple[_Entry | None, bool]:
+        """Return ``(entry, reload)`` for a servable entry of ``key``.
+
+        ``entry`` is ``None`` when there is no servable entry; ``reload``
+        tells whether it should be refreshed in the background.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            age = self.clock() - entry.stored
+            if age >= self.ttl + self.stale_while_revalidate:
+                self._remove(key)
+                return None, False
+            self._entries.move_to_end(key)
+            return entry, age >= self.ttl - self.refresh_ahead
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value of ``key``, or ``default``."""
+        entry, _ = self._lookup(key)
+        return default if entry is None else entry.value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store ``value``, evicting least recently used entries."""
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                logger.debug(f"Not caching {key!r}: {size} bytes")
+                return
+            while self.bytes + size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+            self._entries[key] = _Entry(value, size, self.clock())
+            self.bytes += size
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop the entry of ``key``, if any."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _record(self, hit: bool, key: Hashable, emit: Callable | None) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if emit is not None:
+            endpoint, *args = key if isinstance(key, tuple) else (key,)
+            emit(
+                EventType.CACHE_HIT if hit else EventType.CACHE_MISS,
+                "/".join(str(a) for a in (endpoint, *args)),
+                endpoint=str(endpoint),
+            )
+
+    def _reload_in_thread(
+        self, key: Hashable, loader: Callable[[], Any]
+    ) -> None:
+        def reload() -> None:
+            try:
+                self.put(key, loader())
+            except Exception:
+                logger.exception(f"Background reload of {key!r} failed")
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+        with self._lock:
+            if key in self._loading:
+                return
+            thread = threading.Thread(target=reload, daemon=True)
+            self._loading[key] = thread
+        thread.start()
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        emit: Callable | None = None,
+    ) -> Any:
+        """Return the value of ``key``, calling ``loader`` on a miss.
+
+        Entries due for refresh or stale are returned at once and
+        reloaded in a background thread.
+
+        Args:
+            key: Cache key.
+            loader: Callable returning the value.
+            emit: ``Instrumentation.emit`` to report hits and misses.
+        """
+        entry, reload = self._lookup(key)
+        self._record(entry is not None, key, emit)
+        if entry is not None:
+            if reload:
+                self._reload_in_thread(key, loader)
+            return entry.value
+        value = loader()
+        self.put(key, value)
+        return value
+
+    async def _load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        try:
+            value = await loader()
+            self.put(key, value)
+            return value
+        finally:
+            self._loading.pop(key, None)
+
+    def _load_task(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        background: bool = False,
+    ) -> asyncio.Task:
+        task = self._loading.get(key)
+        if not isinstance(task, asyncio.Task):
+            task = asyncio.ensure_future(self._load(key, loader))
+            if background:
+                task.add_done_callback(functools.partial(_log_failure, key))
+            self._loading[key] = task
+        return task
+
+    async def aget_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        emit: Callable | None = None,
+    ) -> Any:
+        """Async counterpart of :meth:`get_or_load`.
+
+        Background reloads run as tasks, and concurrent misses of the
+        same key await a single call of ``loader``.
+        """
+        entry, reload = self._lookup(key)
+        self._record(entry is not None, key, emit)
+        if entry is not None:
+            if reload:
+                self._load_task(key, loader, background=True)
+            return entry.value
+        return await asyncio.shield(self._load_task(key, loader))
+
+
+def _log_failure(key: Hashable, task: asyncio.Task) -> None:
+    if not task.cancelled() and (e := task.exception()) is not None:
+        logger.error(f"Background reload of {key!r} failed: {e!r}")
+
+
+def cached(endpoint: str) -> Callable:
+    """Cache a client method returning a parsed object.
+
+    The result is stored in ``self.cache`` under ``(endpoint, *args)``,
+    with keyword and default arguments in signature order, and each call
+    returns a deep copy of it; methods of clients created without a
+    cache are not affected.
+    """
+
+    def decorator(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+
+        def key(self: Any, args: tuple, kwargs: dict) -> tuple:
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            return (endpoint, *list(bound.arguments.values())[1:])
+
+        if inspect.iscoroutinefunction(method):
+
+            @functools.wraps(method)
+            async def async_wrapper(self, *args: Any, **kwargs: Any) -> Any:
+                if self.cache is None:
+                    return await method(self, *args, **kwargs)
+                return deepcopy(
+                    await self.cache.aget_or_load(
+                        key(self, args, kwargs),
+                        lambda: method(self, *args, **kwargs),
+                        self.instrumentation.emit,
+                    )
+                )
+
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+            if self.cache is None:
+                return method(self, *args, **kwargs)
+            return deepcopy(
+                self.cache.get_or_load(
+                    key(self, args, kwargs),
+                    lambda: method(self, *args, **kwargs),
+                    self.instrumentation.emit,
+                )
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,154 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Hierarchy of the categories of a classification.
+
+The API lists the categories of a classification flat, in pre-order:
+each category is followed by its subcategories, whose
+:attr:`~sidra_fetcher.agregados.Categoria.nivel` is greater. The
+:class:`CategoriaTree` of a classification keeps that order and stores
+the parent and the end of the subtree of each category in arrays, so
+subtrees are contiguous ranges and leaves are a mask::
+
+    tree = agregado.category_tree(81)
+    tree.select(2711, leaves=True)   # Leaf products under 2711
+    parametro.assign("classificacoes", {"81": tree.select(2711)})
+
+Trees are built once per :class:`~sidra_fetcher.agregados.Agregado` by
+:meth:`~sidra_fetcher.agregados.Agregado.category_tree` and kept on it.
+"""
+
+from array import array
+
+from .agregados import Classificacao
+
+
+class CategoriaTree:
+    """Array-backed tree of the categories of one classification.
+
+    Positions follow the order of ``classificacao.categorias``; the
+    subtree of the category at position ``i`` is ``range(i, fim[i])``.
+
+    Attributes:
+        classificacao_id: Id of the classification.
+        ids: Category id of each position.
+        niveis: ``nivel`` of each position.
+        pais: Position of the parent of each position, ``-1`` for roots.
+        fim: Position after the subtree of each position.
+        folhas: ``1`` at the positions of leaves, ``0`` elsewhere.
+    """
+
+    def __init__(self, classificacao: Classificacao) -> None:
+        self.classificacao_id = classificacao.id
+        categorias = classificacao.categorias
+        n = len(categorias)
+        self.ids = array("q", (c.id for c in categorias))
+        self.niveis = array("i", (c.nivel for c in categorias))
+        self.pais = array("i", [-1] * n)
+        self.fim = array("i", [n] * n)
+        self._posicao = {c.id: i for i, c in enumerate(categorias)}
+
+        # Ancestors of the current position, a subtree ends at the first
+        # category that is not deeper
+        pilha: list[int] = []
+        for i, nivel in enumerate(self.niveis):
+            while pilha and self.niveis[pilha[-1]] >= nivel:
+                self.fim[pilha.pop()] = i
+            if pilha:
+                self.pais[i] = pilha[-1]
+            pilha.append(i)
+        self.folhas = array("b", (int(self.fim[i] == i + 1) for i in range(n)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, categoria_id: int) -> bool:
+        return categoria_id in self._posicao
+
+    def position(self, categoria_id: int) -> int:
+        """Return the position of a category.
+
+        Raises:
+            KeyError: If the category is not in the classification.
+        """
+        return self._posicao[categoria_id]
+
+    def parent(self, categoria_id: int) -> int | None:
+        """Return the id of the parent, ``None`` for roots."""
+        pai = self.pais[self.position(categoria_id)]
+        return None if pai < 0 else self.ids[pai]
+
+    def children(self, categoria_id: int) -> list[int]:
+        """Return the ids of the direct subcategories."""
+        posicao = self.position(categoria_id)
+        return [
+            self.ids[i]
+            for i in range(posicao + 1, self.fim[posicao])
+            if self.pais[i] == posicao
+        ]
+
+    def roots(self) -> list[int]:
+        """Return the ids of the categories without a parent."""
+        return [self.ids[i] for i, pai in enumerate(self.pais) if pai < 0]
+
+    def is_leaf(self, categoria_id: int) -> bool:
+        """Whether the category has no subcategories."""
+        return bool(self.folhas[self.position(categoria_id)])
+
+    def span(self, categoria_id: int) -> tuple[int, int]:
+        """Return the range of positions of the subtree of a category."""
+        posicao = self.position(categoria_id)
+        return posicao, self.fim[posicao]
+
+    def subtree(
+        self, categoria_id: int | None = None, leaves: bool = False
+    ) -> list[int]:
+        """Return the ids of a category and its descendants.
+
+        Args:
+            categoria_id: Root of the subtree, ``None`` for every
+                category.
+            leaves: Only return the leaves of the subtree.
+        """
+        if categoria_id is None:
+            inicio, fim = 0, len(self.ids)
+        else:
+            inicio, fim = self.span(categoria_id)
+        return [
+            self.ids[i]
+            for i in range(inicio, fim)
+            if not leaves or self.folhas[i]
+        ]
+
+    def select(
+        self, categoria_id: int | None = None, leaves: bool = False
+    ) -> list[str]:
+        """Return :meth:`subtree` as a ``Parametro.classificacoes`` value.
+
+        A selection of every category is ``["all"]``.
+        """
+        if categoria_id is None and not leaves:
+            return ["all"]
+        return [str(c) for c in self.subtree(categoria_id, leaves)]
+
+    def parents(self) -> list[int]:
+        """Return the ids of the categories with subcategories.
+
+        Deepest first, the order in which they can be summed from their
+        children.
+        """
+        posicoes = [i for i, folha in enumerate(self.folhas) if not folha]
+        posicoes.sort(key=lambda i: -self.niveis[i])
+        return [self.ids[i] for i in posicoes]
@@ -0,0 +1,478 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Structural diffs and an append-only snapshot log of agregados.
+
+Re-fetching an agregado usually adds a few periods, moves some
+``modificacao`` dates or renames a category. :func:`diff_agregados`
+describes such changes as an :class:`AgregadoDiff`, item by item:
+
+- periodos, variaveis and classificacoes are matched by ``id``;
+- localidades by level and ``id``, since ids repeat across levels;
+- categorias by ``id`` within their classification.
+
+:func:`apply_diff` turns the old version into the new one.
+
+:class:`SnapshotLog` stores successive versions of agregados in a JSON
+Lines file: a full ``base`` record the first time, then only ``delta``
+records, so a new version costs the size of its changes. Every
+``compact_every`` deltas a new base is written to bound the replay, and
+:meth:`SnapshotLog.compact` rewrites the file with the latest version
+of each agregado only. The deltas double as a change feed::
+
+    log = SnapshotLog("snapshots.jsonl")
+    diff = log.append(client.get_agregado(1705))
+    if diff:
+        print([item["id"] for _, item in diff.periodos.added])
+"""
+
+import datetime as dt
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Hashable, Iterator
+
+from . import logger
+from .agregados import Agregado
+from .reader import DateEncoder, agregado_from_dict
+
+_ATRIBUTOS = (
+    "nome",
+    "url",
+    "pesquisa",
+    "assunto",
+    "periodicidade",
+    "nivel_territorial",
+)
+
+
+def _key_id(item: dict[str, Any]) -> Hashable:
+    return item["id"]
+
+
+def _key_localidade(item: dict[str, Any]) -> Hashable:
+    return (item["nivel"]["id"], item["id"])
+
+
+def _sem_categorias(item: dict[str, Any]) -> dict[str, Any]:
+    return {k: v for k, v in item.items() if k != "categorias"}
+
+
+def _com_categorias(
+    anterior: dict[str, Any], item: dict[str, Any]
+) -> dict[str, Any]:
+    return {**item, "categorias": anterior["categorias"]}
+
+
+def _chave(key: Any) -> Hashable:
+    # Tuple keys come back from JSON as lists
+    return tuple(key) if isinstance(key, list) else key
+
+
+@dataclass
+class Changes:
+    """Changes of a list of items identified by a key.
+
+    Attributes:
+        added: ``(position, item)`` of the new items, by ascending
+            position in the new list.
+        removed: Keys of the removed items.
+        changed: New version of the kept items whose content changed.
+        order: Keys of the kept items in their new order, only set when
+            they were reordered.
+    """
+
+    added: list[tuple[int, dict[str, Any]]] = field(default_factory=list)
+    removed: list[Any] = field(default_factory=list)
+    changed: list[dict[str, Any]] = field(default_factory=list)
+    order: list[Any] | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed) or (
+            self.order is not None
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Changes":
+        order = data.get("order")
+        return cls(
+            added=[(posicao, item) for posicao, item in data["added"]],
+            removed=[_chave(k) for k in data["removed"]],
+            changed=data["changed"],
+            order=None if order is None else [_chave(k) for k in order],
+        )
+
+
+def _diff_items(
+    old: list[dict[str, Any]],
+    new: list[dict[str, Any]],
+    key: Callable[[dict[str, Any]], Hashable],
+    project: Callable[[dict[str, Any]], dict[str, Any]] | None = None,
+) -> Changes:
+    """Compare two lists of items, matching them by ``key``.
+
+    ``project`` selects the part of the kept items that is compared and
+    stored in :attr:`Changes.changed`.
+    """
+    anteriores = {key(item): item for item in old}
+    chaves = [key(item) for item in new]
+    novas = set(chaves)
+    changes = Changes(removed=[k for k in anteriores if k not in novas])
+    mantidas = []
+    for posicao, (k, item) in enumerate(zip(chaves, new)):
+        anterior = anteriores.get(k)
+        if anterior is None:
+            changes.added.append((posicao, item))
+            continue
+        mantidas.append(k)
+        if project is not None:
+            anterior, item = project(anterior), project(item)
+        if anterior != item:
+            changes.changed.append(item)
+    if mantidas != [k for k in anteriores if k in novas]:
+        changes.order = mantidas
+    return changes
+
+
+def _apply_items(
+    items: list[dict[str, Any]],
+    changes: Changes,
+    key: Callable[[dict[str, Any]], Hashable],
+    merge: Callable[[dict, dict], dict] | None = None,
+) -> list[dict[str, Any]]:
+    por_chave = {key(item): item for item in items}
+    try:
+        for k in changes.removed:
+            del por_chave[k]
+        for item in changes.changed:
+            k = key(item)
+            anterior = por_chave[k]
+            por_chave[k] = item if merge is None else merge(anterior, item)
+        if changes.order is None:
+            resultado = list(por_chave.values())
+        else:
+            resultado = [por_chave[k] for k in changes.order]
+    except KeyError as e:
+        raise ValueError(f"Diff does not apply: no item {e}") from None
+    for posicao, item in changes.added:
+        resultado.insert(posicao, item)
+    return resultado
+
+
+_COLECOES: dict[str, Callable[[dict[str, Any]], Hashable]] = {
+    "periodos": _key_id,
+    "localidades": _key_localidade,
+    "variaveis": _key_id,
+    "classificacoes": _key_id,
+}
+
+
+@dataclass
+class AgregadoDiff:
+    """Structural changes between two versions of an agregado.
+
+    Attributes:
+        agregado_id: Aggregate id.
+        atributos: New value of the changed top-level attributes
+            (``nome``, ``periodicidade``, ``nivel_territorial``, ...).
+        periodos: Changes of the periods.
+        localidades: Changes of the localidades, keyed by
+            ``(nivel id, id)``.
+        variaveis: Changes of the variables.
+        classificacoes: Changes of the classifications. Changed items
+            do not include their categorias.
+        categorias: Changes of the categorias of each classification
+            present in both versions, by classification id.
+    """
+
+    agregado_id: int
+    atributos: dict[str, Any] = field(default_factory=dict)
+    periodos: Changes = field(default_factory=Changes)
+    localidades: Changes = field(default_factory=Changes)
+    variaveis: Changes = field(default_factory=Changes)
+    classificacoes: Changes = field(default_factory=Changes)
+    categorias: dict[int, Changes] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.atributos or self.categorias) or any(
+            getattr(self, colecao) for colecao in _COLECOES
+        )
+
+    def asdict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "AgregadoDiff":
+        """Build a diff from its :meth:`asdict` form, e.g. read from JSON."""
+        return cls(
+            agregado_id=data["agregado_id"],
+            atributos=data["atributos"],
+            categorias={
+                int(classificacao_id): Changes.from_dict(changes)
+                for classificacao_id, changes in data["categorias"].items()
+            },
+            **{
+                colecao: Changes.from_dict(data[colecao])
+                for colecao in _COLECOES
+            },
+        )
+
+
+def _as_json(agregado: Agregado) -> dict[str, Any]:
+    """Return the JSON form of ``agregado``, as written to disk."""
+    return json.loads(json.dumps(agregado.asdict(), cls=DateEncoder))
+
+
+def _diff(old: dict[str, Any], new: dict[str, Any]) -> AgregadoDiff:
+    if old["id"] != new["id"]:
+        raise ValueError(
+            f"Cannot diff agregado {old['id']} against {new['id']}"
+        )
+    diff = AgregadoDiff(
+        agregado_id=new["id"],
+        atributos={a: new[a] for a in _ATRIBUTOS if old[a] != new[a]},
+    )
+    for colecao, key in _COLECOES.items():
+        project = _sem_categorias if colecao == "classificacoes" else None
+        changes = _diff_items(old[colecao], new[colecao], key, project)
+        setattr(diff, colecao, changes)
+    anteriores = {c["id"]: c for c in old["classificacoes"]}
+    for classificacao in new["classificacoes"]:
+        anterior = anteriores.get(classificacao["id"])
+        if anterior is None:
+            continue
+        changes = _diff_items(
+            anterior["categorias"], classificacao["categorias"], _key_id
+        )
+        if changes:
+            diff.categorias[classificacao["id"]] = changes
+    return diff
+
+
+def _apply(data: dict[str, Any], diff: AgregadoDiff) -> dict[str, Any]:
+    if data["id"] != diff.agregado_id:
+        raise ValueError(
+            f"Diff of agregado {diff.agregado_id} does not apply to "
+            f"agregado {data['id']}"
+        )
+    data = {**data, **diff.atributos}
+    for colecao, key in _COLECOES.items():
+        merge = _com_categorias if colecao == "classificacoes" else None
+        data[colecao] = _apply_items(
+            data[colecao], getattr(diff, colecao), key, merge
+        )
+    if diff.categorias:
+        classificacoes = []
+        for classificacao in data["classificacoes"]:
+            changes = diff.categorias.get(classificacao["id"])
+            if changes is not None:
+                categorias = _apply_items(
+                    classificacao["categorias"], changes, _key_id
+                )
+                classificacao = {**classificacao, "categorias": categorias}
+            classificacoes.append(classificacao)
+        data["classificacoes"] = classificacoes
+    return data
+
+
+def diff_agregados(old: Agregado, new: Agregado) -> AgregadoDiff:
+    """Compare two versions of an agregado.
+
+    Args:
+        old: Previous version.
+        new: Current version, with the same ``id``.
+
+    Returns:
+        The changes from ``old`` to ``new``; falsy when there are none.
+
+    Raises:
+        ValueError: If the agregados have different ids.
+    """
+    return _diff(_as_json(old), _as_json(new))
+
+
+def apply_diff(agregado: Agregado, diff: AgregadoDiff) -> Agregado:
+    """Apply the changes of ``diff`` to ``agregado``.
+
+    ``apply_diff(old, diff_agregados(old, new))`` equals ``new``.
+
+    Raises:
+        ValueError: If the diff was not computed from this version of
+            the agregado.
+    """
+    return agregado_from_dict(_apply(_as_json(agregado), diff))
+
+
+@dataclass
+class _Estado:
+    data: dict[str, Any]
+    versao: int
+    deltas: int
+
+
+class SnapshotLog:
+    """Append-only JSON Lines log of agregado versions.
+
+    Every line is a record with the ``agregado_id``, its ``versao``
+    (1, 2, ...), a ``timestamp`` and either the full ``agregado`` (type
+    ``base``) or the ``diff`` from the previous version (type
+    ``delta``). Bases written by compaction also carry the ``diff``,
+    so :meth:`changes` sees every change. A truncated last line, left by
+    an interrupted write, is ignored.
+
+    Args:
+        path: JSON Lines file; replayed if it exists.
+        compact_every: Number of deltas of an agregado after which its
+            next version is written as a new base.
+    """
+
+    def __init__(self, path: str | Path, compact_every: int = 50) -> None:
+        self.path = Path(path)
+        self.compact_every = compact_every
+        self._estados: dict[int, _Estado] = {}
+        for record in self._records():
+            self._replay(record)
+
+    def _records(self) -> Iterator[dict[str, Any]]:
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt line {n} of {self.path}")
+
+    def _replay(self, record: dict[str, Any]) -> None:
+        agregado_id = record["agregado_id"]
+        if record["tipo"] == "base":
+            self._estados[agregado_id] = _Estado(
+                record["agregado"], record["versao"], 0
+            )
+            return
+        estado = self._estados[agregado_id]
+        diff = AgregadoDiff.from_dict(record["diff"])
+        estado.data = _apply(estado.data, diff)
+        estado.versao = record["versao"]
+        estado.deltas += 1
+
+    def _write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with open(self.path, "ab+") as f:
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")  # Terminate a truncated line
+            f.write(line.encode("utf-8"))
+
+    def __contains__(self, agregado_id: int) -> bool:
+        return agregado_id in self._estados
+
+    def agregado_ids(self) -> list[int]:
+        """Return the ids of the logged agregados."""
+        return list(self._estados)
+
+    def version(self, agregado_id: int) -> int:
+        """Return the latest version number of an agregado, 0 if absent."""
+        estado = self._estados.get(agregado_id)
+        return 0 if estado is None else estado.versao
+
+    def latest(self, agregado_id: int) -> Agregado | None:
+        """Return the latest logged version of an agregado."""
+        estado = self._estados.get(agregado_id)
+        if estado is None:
+            return None
+        return agregado_from_dict(estado.data)
+
+    def append(self, agregado: Agregado) -> AgregadoDiff | None:
+        """Log a new version of ``agregado`` if it changed.
+
+        Returns:
+            The changes from the previous version, falsy when there were
+            none (and nothing was written), or ``None`` for the first
+            version of the agregado.
+        """
+        data = _as_json(agregado)
+        record: dict[str, Any] = {
+            "agregado_id": agregado.id,
+            "timestamp": dt.datetime.now(dt.UTC).isoformat(),
+        }
+        estado = self._estados.get(agregado.id)
+        if estado is None:
+            diff = None
+            estado = self._estados[agregado.id] = _Estado(data, 0, 0)
+        else:
+            diff = _diff(estado.data, data)
+            if not diff:
+                return diff
+            record["diff"] = diff.asdict()
+        estado.versao += 1
+        record["versao"] = estado.versao
+        if diff is None or estado.deltas >= self.compact_every:
+            record["tipo"] = "base"
+            record["agregado"] = data
+            estado.deltas = 0
+        else:
+            record["tipo"] = "delta"
+            estado.deltas += 1
+        estado.data = data
+        self._write(record)
+        return diff
+
+    def changes(
+        self, agregado_id: int | None = None, since: int = 0
+    ) -> Iterator[tuple[int, int, AgregadoDiff]]:
+        """Iterate over the logged changes, oldest first.
+
+        Args:
+            agregado_id: Only the changes of this agregado.
+            since: Only the changes to versions after this one, e.g. the
+                last version a consumer of ``agregado_id`` has seen.
+
+        Yields:
+            ``(agregado_id, versao, diff)`` tuples.
+        """
+        for record in self._records():
+            if "diff" not in record or record["versao"] <= since:
+                continue
+            if agregado_id not in (None, record["agregado_id"]):
+                continue
+            yield (
+                record["agregado_id"],
+                record["versao"],
+                AgregadoDiff.from_dict(record["diff"]),
+            )
+
+    def compact(self) -> None:
+        """Rewrite the log with only the latest version of each agregado.
+
+        The history, and so the change feed, is dropped. The file is
+        replaced atomically.
+        """
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        timestamp = dt.datetime.now(dt.UTC).isoformat()
+        with open(tmp, "w", encoding="utf-8") as f:
+            for agregado_id, estado in self._estados.items():
+                record = {
+                    "agregado_id": agregado_id,
+                    "timestamp": timestamp,
+                    "versao": estado.versao,
+                    "tipo": "base",
+                    "agregado": estado.data,
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                estado.deltas = 0
+        os.replace(tmp, self.path)
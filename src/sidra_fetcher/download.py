@@ -0,0 +1,164 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""File sinks used to stream SIDRA ``/values`` responses to disk.
+
+The ``download_values`` methods of the clients write the raw response
+body straight to a file instead of decoding it into Python objects.
+This module holds the parts shared by the sync and async clients:
+
+- :func:`plan_downloads` turns a :class:`~sidra_fetcher.sidra.Parametro`
+  and a destination into ``(url, path)`` pairs, one per partition.
+- :class:`Sink` writes a body to ``<dest>.part`` with optional gzip or
+  zstd compression and atomically renames it to ``<dest>`` when the
+  download completes. Uncompressed partial files are resumed with an
+  HTTP ``Range`` request.
+"""
+
+import gzip
+import os
+import re
+from pathlib import Path
+from typing import BinaryIO, Literal
+
+from .sidra import Parametro
+
+BUFFER_SIZE = 1 << 16
+
+Format = Literal["json", "json.gz", "json.zst"]
+FORMATS: tuple[str, ...] = ("json", "json.gz", "json.zst")
+
+_PERIODO_RE = re.compile(r"\d+(-\d+)?")
+
+
+def _open_zstd(path: Path, mode: str) -> BinaryIO:
+    try:
+        from compression import zstd  # Python >= 3.14
+    except ImportError:
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(
+                "format='json.zst' requires the zstandard package"
+            ) from e
+        return zstandard.ZstdCompressor().stream_writer(open(path, mode))
+    return zstd.open(path, mode)
+
+
+class Sink:
+    """Write a response body to ``dest`` through a ``.part`` file.
+
+    Args:
+        dest: Final path of the file.
+        format: ``"json"`` writes the body as received; ``"json.gz"`` and
+            ``"json.zst"`` compress it on the fly.
+    """
+
+    def __init__(self, dest: str | Path, format: Format = "json") -> None:
+        if format not in FORMATS:
+            raise ValueError(f"Invalid format {format!r}, use {FORMATS}")
+        self.dest = Path(dest)
+        self.part = self.dest.with_name(self.dest.name + ".part")
+        self.format = format
+        self.written = 0
+
+    def resume_offset(self) -> int:
+        """Return the byte offset a previous partial download reached.
+
+        Only uncompressed downloads are resumable: the compressed stream
+        of an interrupted run may end in the middle of a frame.
+        """
+        if self.format != "json" or not self.part.exists():
+            return 0
+        return self.part.stat().st_size
+
+    def recover(self, content_range: str | None) -> Path | None:
+        """Handle a ``416`` answer to a resumed download.
+
+        The server answers ``Content-Range: bytes */<size>``. A ``.part``
+        file of that size holds the whole body of a run interrupted
+        before :meth:`commit`, so it is committed. Any other ``.part``
+        is stale and deleted, for the next attempt to start over.
+
+        Returns:
+            The committed path, or None when the ``.part`` was deleted.
+        """
+        size = self.resume_offset()
+        total = (content_range or "").rpartition("/")[2]
+        if size and total.isdigit() and int(total) == size:
+            self.written = size
+            return self.commit()
+        self.part.unlink(missing_ok=True)
+        return None
+
+    def open(self, append: bool = False) -> BinaryIO:
+        """Open the ``.part`` file, appending to it when ``append``."""
+        self.part.parent.mkdir(parents=True, exist_ok=True)
+        mode = "ab" if append else "wb"
+        self.written = self.part.stat().st_size if append else 0
+        if self.format == "json.gz":
+            return gzip.open(self.part, mode)
+        if self.format == "json.zst":
+            return _open_zstd(self.part, mode)
+        return open(self.part, mode, buffering=BUFFER_SIZE)
+
+    def write(self, f: BinaryIO, chunk: bytes) -> None:
+        """Write one chunk of the response body."""
+        f.write(chunk)
+        self.written += len(chunk)
+
+    def commit(self) -> Path:
+        """Atomically move the completed ``.part`` file to ``dest``."""
+        if self.written == 0:
+            raise ConnectionError("Data returned is None!")
+        os.replace(self.part, self.dest)
+        return self.dest
+
+
+def plan_downloads(
+    parametro: Parametro | str,
+    dest: str | Path,
+    format: Format = "json",
+    partition_by: Literal["periodos"] | None = None,
+) -> list[tuple[str, Path]]:
+    """Return the ``(url, path)`` pairs needed to download ``parametro``.
+
+    ``parametro`` may also be a ``/values`` URL, which cannot be
+    partitioned. Without ``partition_by``, ``dest`` is the output file.
+    With ``partition_by="periodos"``, ``dest`` is a directory receiving
+    one ``periodo=<id>.<format>`` file per period of ``parametro``, which
+    must then list explicit period ids or ranges (``"202001-202012"``).
+    """
+    dest = Path(dest)
+    if partition_by is None:
+        url = parametro if isinstance(parametro, str) else parametro.url()
+        return [(url, dest)]
+    if partition_by != "periodos":
+        raise ValueError(f"Cannot partition by {partition_by!r}")
+    if isinstance(parametro, str):
+        raise ValueError("Cannot partition a URL, use a Parametro")
+    periodos = parametro.periodos
+    if not periodos or not all(_PERIODO_RE.fullmatch(p) for p in periodos):
+        raise ValueError(
+            "Partitioning by periodos needs explicit period ids, "
+            f"got {periodos!r}"
+        )
+    return [
+        (
+            parametro.assign("periodos", [p]).url(),
+            dest / f"periodo={p}.{format}",
+        )
+        for p in periodos
+    ]
@@ -0,0 +1,257 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Export SIDRA ``/values`` rows to Arrow record batches and Parquet.
+
+Every descriptor column of a ``/values`` response (territorial level,
+unit, variable, classification categories, locality, period) repeats a
+handful of distinct strings over and over. They are exported as Arrow
+dictionary arrays, so each distinct code and name is stored once. When
+the :class:`~sidra_fetcher.agregados.Agregado` of the table is given,
+its variables, classifications, localities and periods seed the
+dictionaries, which keeps them stable across batches and files.
+
+The ``V`` column is decoded to ``float64`` with
+:func:`~sidra_fetcher.values.decode_rows`. Special symbols become nulls,
+except ``"-"`` (absolute zero) which becomes ``0.0``, and a ``status``
+column keeps the :class:`~sidra_fetcher.values.Status` of every value.
+
+Column names are the SIDRA keys (``NC``, ``MN``, ``D1C``, ...); their
+labels from the header row are kept in the field metadata under
+``label``.
+
+This module requires the optional ``pyarrow`` dependency
+(``pip install sidra-fetcher[arrow]``).
+"""
+
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+from .agregados import Agregado
+from .sidra import Parametro
+from .values import Status, decode_rows, split_header
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+_SUFIXO_CODIGO = " (Código)"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError(
+            "sidra_fetcher.export requires pyarrow, install it with "
+            "`pip install sidra-fetcher[arrow]`"
+        ) from e
+    return pa
+
+
+def _vocabularios(agregado: Agregado | None) -> dict[str, dict[str, str]]:
+    """Map descriptor labels to ``{code: name}`` from the metadata.
+
+    Periods are stored under the empty label: their labels ("Mês",
+    "Ano", "Trimestre", ...) depend on the periodicity, so period columns
+    are recognized by their codes instead.
+    """
+    if agregado is None:
+        return {}
+    vocabularios = {
+        "": {p.id: p.literals[0] for p in agregado.periodos},
+        "Variável": {str(v.id): v.nome for v in agregado.variaveis},
+    }
+    for classificacao in agregado.classificacoes:
+        vocabularios[classificacao.nome] = {
+            str(c.id): c.nome for c in classificacao.categorias
+        }
+    for localidade in agregado.localidades:
+        nivel = vocabularios.setdefault(localidade.nivel.nome, {})
+        nivel[localidade.id] = localidade.nome
+    return vocabularios
+
+
+def _vocabulario(
+    label: str,
+    codigos: list[str | None],
+    vocabularios: dict[str, dict[str, str]],
+) -> dict[str, str]:
+    label = label.removesuffix(_SUFIXO_CODIGO)
+    if label in vocabularios:
+        return vocabularios[label]
+    periodos = vocabularios.get("")
+    if periodos and all(c in periodos for c in codigos if c is not None):
+        return periodos
+    return {}
+
+
+def _encode_pair(
+    pa,
+    codigos: list[str | None],
+    nomes: list[str | None] | None,
+    vocabulario: dict[str, str],
+) -> tuple["pa.Array", "pa.Array | None"]:
+    """Dictionary-encode a code column and its name column together.
+
+    Both arrays share the same indices: the dictionary starts with the
+    metadata vocabulary, in metadata order, followed by codes only seen
+    in the data.
+    """
+    posicoes = {codigo: i for i, codigo in enumerate(vocabulario)}
+    dicionario_nomes: list[str | None] = list(vocabulario.values())
+    indices: list[int | None] = []
+    for i, codigo in enumerate(codigos):
+        if codigo is None:
+            indices.append(None)
+            continue
+        posicao = posicoes.get(codigo)
+        if posicao is None:
+            posicao = posicoes[codigo] = len(posicoes)
+            dicionario_nomes.append(None)
+        if nomes is not None and dicionario_nomes[posicao] is None:
+            dicionario_nomes[posicao] = nomes[i]
+        indices.append(posicao)
+    indices_array = pa.array(indices, type=pa.int32())
+    codigos_array = pa.DictionaryArray.from_arrays(
+        indices_array, pa.array(list(posicoes), type=pa.string())
+    )
+    if nomes is None:
+        return codigos_array, None
+    nomes_array = pa.DictionaryArray.from_arrays(
+        indices_array, pa.array(dicionario_nomes, type=pa.string())
+    )
+    return codigos_array, nomes_array
+
+
+def to_record_batch(
+    rows: list[dict[str, str]],
+    agregado: Agregado | None = None,
+    parametro: Parametro | None = None,
+) -> "pa.RecordBatch":
+    """Convert the rows of a ``/values`` response to an Arrow batch.
+
+    Args:
+        rows: Rows as returned by ``get_values`` or read with
+            :func:`~sidra_fetcher.values.read_values`, with or without
+            the header row.
+        agregado: Metadata of the table, used to seed the dictionaries
+            of the variable, classification, locality and period columns.
+        parametro: The request that produced ``rows``, used to round
+            values to the requested decimals.
+
+    Returns:
+        A record batch with one dictionary-encoded column per descriptor
+        key, plus the decoded ``V`` (``float64``) and ``status``
+        (``int8``) columns.
+    """
+    pa = _import_pyarrow()
+    header, data = split_header(rows)
+    vocabularios = _vocabularios(agregado)
+    fields, arrays = [], []
+
+    def add(key: str, array: "pa.Array") -> None:
+        label = header.get(key, key)
+        fields.append(
+            pa.field(key, array.type, metadata={"label": label})
+        )
+        arrays.append(array)
+
+    for key in header:
+        if key == "V":
+            continue
+        if not key.endswith("C"):
+            if key[:-1] + "C" not in header:
+                # Names requested without codes (formato "n")
+                valores = [row.get(key) for row in data]
+                add(key, _encode_pair(pa, valores, None, {})[0])
+            continue
+        nome_key = key[:-1] + "N"
+        codigos = [row.get(key) for row in data]
+        nomes = (
+            [row.get(nome_key) for row in data] if nome_key in header else None
+        )
+        vocabulario = (
+            _vocabulario(header[key], codigos, vocabularios)
+            if key.startswith("D")
+            else {}
+        )
+        codigos_array, nomes_array = _encode_pair(
+            pa, codigos, nomes, vocabulario
+        )
+        add(key, codigos_array)
+        if nomes_array is not None:
+            add(nome_key, nomes_array)
+
+    valores, status = decode_rows(rows, parametro)
+    nulos = (status != Status.OK) & (status != Status.ZERO)
+    add("V", pa.array(valores, type=pa.float64(), mask=nulos))
+    add("status", pa.array(status, type=pa.int8()))
+
+    metadata = {"sidra:header": json.dumps(header, ensure_ascii=False)}
+    return pa.RecordBatch.from_arrays(
+        arrays, schema=pa.schema(fields, metadata=metadata)
+    )
+
+
+def write_parquet(
+    responses: Iterable[list[dict[str, str]]],
+    path: str | Path,
+    agregado: Agregado | None = None,
+    parametro: Parametro | None = None,
+    compression: str = "zstd",
+) -> Path:
+    """Write one or more ``/values`` responses to a Parquet file.
+
+    Responses are converted and written one at a time, so only one of
+    them is held in memory::
+
+        paths = client.download_values(
+            parametro, "out", partition_by="periodos"
+        )
+        responses = (read_values(p) for p in paths)
+        write_parquet(responses, "out.parquet", agregado)
+
+    Args:
+        responses: Iterable of ``/values`` responses, all from the same
+            table and with the same columns.
+        path: Output Parquet file.
+        agregado: Metadata of the table, see :func:`to_record_batch`.
+        parametro: The request of the responses, see
+            :func:`to_record_batch`.
+        compression: Parquet compression codec.
+
+    Returns:
+        The path of the written file.
+    """
+    _import_pyarrow()
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    writer = None
+    try:
+        for rows in responses:
+            batch = to_record_batch(rows, agregado, parametro)
+            if writer is None:
+                writer = pq.ParquetWriter(
+                    path, batch.schema, compression=compression
+                )
+            writer.write_batch(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError("No responses to write")
+    return path
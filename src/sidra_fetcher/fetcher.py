@@ -28,7 +28,10 @@ import asyncio
 import datetime as dt
 import json
 import time
-from typing import Any
+from dataclasses import replace
+from functools import partial
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Literal
 
 import httpx
 from tenacity import retry
@@ -45,6 +48,7 @@ from .agregados import (
     ClassificacaoSumarizacao,
     IndiceAgregado,
     IndicePesquisaAgregados,
+    LazyAgregado,
     Localidade,
     NivelTerritorial,
     Periodicidade,
@@ -57,6 +61,85 @@ from .agregados import (
     build_url_metadados,
     build_url_periodos,
 )
+from .cache import ObjectCache, cached
+from .download import BUFFER_SIZE, Format, Sink, plan_downloads
+from .instrumentation import EventType, Hook, Instrumentation, retry_hook
+from .jobs import split_parametro
+from .pesquisas import PesquisaIndex
+from .sidra import Parametro
+
+# Levels declared by most agregados, see AsyncSidraClient.get_agregado
+NIVEIS_PROVAVEIS = ("N1", "N2", "N3", "N6")
+
+
+def _por_nivel(
+    localidades: list[Localidade], niveis: list[str]
+) -> list[Localidade]:
+    """Group ``localidades`` by level, in the order of ``niveis``.
+
+    The same order as requesting each level separately.
+    """
+    grupos: dict[str, list[Localidade]] = {nivel: [] for nivel in niveis}
+    for localidade in localidades:
+        grupos.setdefault(localidade.nivel.id, []).append(localidade)
+    return [localidade for grupo in grupos.values() for localidade in grupo]
+
+
+# Statuses of the API rejecting a combined list of levels. Throttling
+# (429) and outages (502-504) are raised instead: splitting the request
+# would only send more of them to an overloaded server.
+NIVEIS_REJEITADOS = frozenset({400, 404, 414, 500})
+
+
+def _rejeitado(error: httpx.HTTPStatusError, niveis: list[str]) -> bool:
+    return len(niveis) > 1 and (
+        error.response.status_code in NIVEIS_REJEITADOS
+    )
+
+
+def fetch_niveis(get: Callable[[str], list], niveis: list[str]) -> list:
+    """Call ``get`` for ``niveis`` in as few requests as possible.
+
+    All the levels are requested at once, joined by ``|``. When the API
+    rejects the combined request (see :data:`NIVEIS_REJEITADOS`), the
+    levels are split in halves, recursively, down to one call per level.
+
+    Args:
+        get: Called with the ``"N1|N3"`` level list of a request.
+        niveis: Territorial levels.
+
+    Returns:
+        The concatenated results of the calls.
+    """
+    try:
+        return get("|".join(niveis))
+    except httpx.HTTPStatusError as e:
+        if not _rejeitado(e, niveis):
+            raise
+    logger.info(f"Splitting the localidades request of {niveis}")
+    meio = len(niveis) // 2
+    return fetch_niveis(get, niveis[:meio]) + fetch_niveis(get, niveis[meio:])
+
+
+async def fetch_niveis_async(
+    get: Callable[[str], Awaitable[list]], niveis: list[str]
+) -> list:
+    """Async counterpart of :func:`fetch_niveis`.
+
+    The halves of a rejected request are requested concurrently.
+    """
+    try:
+        return await get("|".join(niveis))
+    except httpx.HTTPStatusError as e:
+        if not _rejeitado(e, niveis):
+            raise
+    logger.info(f"Splitting the localidades request of {niveis}")
+    meio = len(niveis) // 2
+    primeira, segunda = await asyncio.gather(
+        fetch_niveis_async(get, niveis[:meio]),
+        fetch_niveis_async(get, niveis[meio:]),
+    )
+    return primeira + segunda
 
 
 class SidraClient:
@@ -65,9 +148,30 @@ class SidraClient:
     The class provides convenience methods to fetch agregados index,
     metadata, periods and localidades and to build higher level
     aggregate objects from the API responses.
+
+    Pass an :class:`~sidra_fetcher.cache.ObjectCache` as ``cache`` to
+    keep the parsed metadados, periods and localidades in memory.
+
+    The pesquisa of the metadados read is filled from ``pesquisas``, a
+    :class:`~sidra_fetcher.pesquisas.PesquisaIndex` replaced on every
+    unfiltered :meth:`get_indice_pesquisas_agregados` call.
     """
-    def __init__(self, timeout: int = 60) -> None:
-        self.client = httpx.Client(timeout=timeout, follow_redirects=True)
+    def __init__(
+        self,
+        timeout: int = 60,
+        transport: httpx.BaseTransport | None = None,
+        hooks: Iterable[Hook] | None = None,
+        cache: ObjectCache | None = None,
+        pesquisas: PesquisaIndex | None = None,
+    ) -> None:
+        self.client = httpx.Client(
+            timeout=timeout,
+            follow_redirects=True,
+            transport=transport,
+        )
+        self.instrumentation = Instrumentation(hooks)
+        self.cache = cache
+        self.pesquisas = pesquisas
 
     def get(self, url: str) -> Any:
         """Fetch data from the given URL.
@@ -79,33 +183,45 @@ class SidraClient:
             ConnectionError: If the data returned is None or if the request fails.
         """
         logger.info(f"Downloading DATA {url}")
-        t0 = time.time()
-        data = b""
-        with self.client.stream("GET", url) as r:
-            r.raise_for_status()
-            for chunk in r.iter_bytes():
-                data += chunk
-        if not data:
-            raise ConnectionError("Data returned is None!")
-        t1 = time.time()
-        logger.debug(f"Download of {url} took {t1 - t0:.2f} seconds")
+        chunks: list[bytes] = []
+        with self.instrumentation.request(url) as request:
+            with self.client.stream("GET", url) as r:
+                request.first_byte(r.status_code)
+                r.raise_for_status()
+                for chunk in r.iter_bytes():
+                    chunks.append(chunk)
+            data = b"".join(chunks)
+            if not data:
+                raise ConnectionError("Data returned is None!")
+            request.size = len(data)
+        t1 = time.perf_counter()
+        logger.debug(f"Download of {url} took {request.elapsed:.2f} seconds")
         data = json.loads(data.decode("utf-8"))
+        self.instrumentation.emit(
+            EventType.PARSE, url, time.perf_counter() - t1
+        )
         return data
 
-    @retry(stop=stop_after_attempt(3))
-    def get_indice_pesquisas_agregados(self) -> list[IndicePesquisaAgregados]:
+    @retry(stop=stop_after_attempt(3), before_sleep=retry_hook)
+    def get_indice_pesquisas_agregados(
+        self, filtros: dict[str, str] | None = None
+    ) -> list[IndicePesquisaAgregados]:
         """Fetch the index of agregados grouped by pesquisa.
 
+        Args:
+            filtros: Query parameters restricting the agregados listed,
+                see :func:`~sidra_fetcher.agregados.build_url_agregados`.
+
         Returns:
             A list of :class:`IndicePesquisaAgregados` objects representing
             the surveys and their contained agregados.
         Raises:
             ConnectionError: If downloading or parsing the response fails.
         """
-        url_agregados = build_url_agregados()
+        url_agregados = build_url_agregados(filtros)
         logger.info(f"Downloading list of agregados metadata {url_agregados}")
         data = self.get(url_agregados)
-        data = [
+        indice = [
             IndicePesquisaAgregados(
                 id=item["id"],
                 nome=item["nome"],
@@ -119,12 +235,22 @@ class SidraClient:
             )
             for item in data
         ]
-        return data
+        if not filtros:
+            self.pesquisas = PesquisaIndex(indice)
+        return indice
+
+    def pesquisa_index(self) -> PesquisaIndex:
+        """Return :attr:`pesquisas`, fetching the agregados index once."""
+        if self.pesquisas is None:
+            self.get_indice_pesquisas_agregados()
+        return self.pesquisas
 
-    @retry(stop=stop_after_attempt(3))
     def get_agregado_metadados(self, agregado_id: int) -> Agregado:
         """Fetch metadata for a specific agregado.
 
+        The pesquisa is filled from :attr:`pesquisas` on every call, so
+        metadados cached before the index was fetched get it too.
+
         Args:
             agregado_id: Numeric id of the aggregate to request.
 
@@ -135,6 +261,14 @@ class SidraClient:
         Raises:
             ConnectionError: If the HTTP request fails or the response is invalid.
         """
+        agregado = self._get_agregado_metadados(agregado_id)
+        if self.pesquisas is not None:
+            agregado = self.pesquisas.fill(agregado)
+        return agregado
+
+    @cached("metadados")
+    @retry(stop=stop_after_attempt(3), before_sleep=retry_hook)
+    def _get_agregado_metadados(self, agregado_id: int) -> Agregado:
         url_metadados = build_url_metadados(agregado_id)
         logger.info(f"Downloading agregado metadados {url_metadados}")
         data = self.get(url_metadados)
@@ -187,9 +321,11 @@ class SidraClient:
         )
         return agregado
 
+    @cached("periodos")
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=3, max=30),
+        before_sleep=retry_hook,
     )
     def get_agregado_periodos(self, agregado_id: int) -> list[Periodo]:
         """Fetch available periods for an aggregate.
@@ -215,6 +351,7 @@ class SidraClient:
         ]
         return data
 
+    @cached("localidades")
     def get_agregado_localidades(
         self, agregado_id: int, localidades_nivel: str
     ) -> list[Localidade]:
@@ -222,7 +359,8 @@ class SidraClient:
 
         Args:
             agregado_id: Aggregate id.
-            localidades_nivel: Comma separated territorial level ids to request.
+            localidades_nivel: Territorial level ids to request, separated
+                by ``|`` (e.g. ``"N1|N3"``).
 
         Returns:
             A list of :class:`Localidade` objects.
@@ -242,35 +380,54 @@ class SidraClient:
             for localidade in data
         ]
 
-    def get_agregado(self, agregado_id: int) -> Agregado:
+    def get_agregado(self, agregado_id: int, lazy: bool = False) -> Agregado:
         """Fetch a complete :class:`Agregado` including periods and localidades.
 
         This method composes the full aggregate metadata by calling the
         lower-level helpers to retrieve metadados, periods and all
-        declared localidades for the aggregate's territorial levels.
+        declared localidades for the aggregate's territorial levels. The
+        localidades of every level are requested at once, falling back
+        to smaller requests for levels the API rejects.
 
         Args:
             agregado_id: Aggregate id to fetch.
+            lazy: Only fetch the metadados and return a
+                :class:`LazyAgregado` loading periods and localidades on
+                first access.
 
         Returns:
             The populated :class:`Agregado` object.
         """
         logger.info(f"Downloading agregado {agregado_id}")
         agregado_metadados = self.get_agregado_metadados(agregado_id)
+        if lazy:
+            return LazyAgregado(agregado_metadados, self)
         agregado_periodos = self.get_agregado_periodos(agregado_id)
-        agregado_localidades: list[Localidade] = []
-        for nivel in agregado_metadados.nivel_territorial.administrativo:
-            localidades = self.get_agregado_localidades(agregado_id, nivel)
-            agregado_localidades.extend(localidades)
-        for nivel in agregado_metadados.nivel_territorial.especial:
-            localidades = self.get_agregado_localidades(agregado_id, nivel)
-            agregado_localidades.extend(localidades)
-        for nivel in agregado_metadados.nivel_territorial.ibge:
-            localidades = self.get_agregado_localidades(agregado_id, nivel)
-            agregado_localidades.extend(localidades)
-        agregado_metadados.periodos = agregado_periodos
-        agregado_metadados.localidades = agregado_localidades
-        return agregado_metadados
+        niveis = (
+            agregado_metadados.nivel_territorial.administrativo
+            + agregado_metadados.nivel_territorial.especial
+            + agregado_metadados.nivel_territorial.ibge
+        )
+        agregado_localidades = (
+            self._get_localidades(agregado_id, niveis) if niveis else []
+        )
+        return replace(
+            agregado_metadados,
+            periodos=agregado_periodos,
+            localidades=agregado_localidades,
+        )
+
+    def _get_localidades(
+        self, agregado_id: int, niveis: list[str]
+    ) -> list[Localidade]:
+        """Fetch the localidades of ``niveis`` in as few requests as possible.
+
+        See :func:`fetch_niveis`.
+        """
+        localidades = fetch_niveis(
+            partial(self.get_agregado_localidades, agregado_id), niveis
+        )
+        return _por_nivel(localidades, niveis)
 
     def get_acervo(self, acervo: AcervoEnum) -> Any:
         """Fetch an `acervo` (collection) listing from the agregados API.
@@ -287,6 +444,88 @@ class SidraClient:
         data = self.get(url_acervo)
         return data
 
+    @retry(stop=stop_after_attempt(3), before_sleep=retry_hook)
+    def get_values(self, parametro: Parametro) -> list[dict[str, str]]:
+        """Fetch the rows of a SIDRA ``/values`` request.
+
+        Args:
+            parametro: The SIDRA request to fetch.
+
+        Returns:
+            The rows as returned by the API, starting with the header row
+            when ``parametro.cabecalho`` is set. See
+            :mod:`sidra_fetcher.values` and :mod:`sidra_fetcher.export`.
+        """
+        url = parametro.url()
+        logger.info(f"Downloading values {url}")
+        return self.get(url)
+
+    def download_values(
+        self,
+        parametro: Parametro | str,
+        dest: str | Path,
+        format: Format = "json",
+        partition_by: Literal["periodos"] | None = None,
+    ) -> list[Path]:
+        """Stream SIDRA ``/values`` responses straight to disk.
+
+        The response body is written as received, without JSON
+        decoding, through a ``.part`` file that is atomically renamed
+        when complete. Interrupted uncompressed downloads resume from
+        where they stopped, and partitions whose file already exists are
+        skipped, so calling this again after a crash is cheap.
+
+        Args:
+            parametro: The SIDRA request to download, or its URL.
+            dest: Output file, or output directory when partitioned.
+            format: ``"json"``, or ``"json.gz"``/``"json.zst"`` to
+                compress on the fly.
+            partition_by: ``"periodos"`` writes one file per period.
+
+        Returns:
+            The paths of the downloaded files.
+        """
+        paths = []
+        for url, path in plan_downloads(parametro, dest, format, partition_by):
+            if path.exists():
+                logger.info(f"Skipping {url}, {path} already exists")
+            else:
+                self._download_file(url, Sink(path, format))
+            paths.append(path)
+        return paths
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=3, max=30),
+        before_sleep=retry_hook,
+    )
+    def _download_file(self, url: str, sink: Sink) -> Path:
+        """Download ``url`` into ``sink``, resuming a partial file."""
+        logger.info(f"Downloading DATA {url} to {sink.dest}")
+        offset = sink.resume_offset()
+        headers = {"Range": f"bytes={offset}-"} if offset else None
+        with self.instrumentation.request(url) as request:
+            with self.client.stream("GET", url, headers=headers) as r:
+                request.first_byte(r.status_code)
+                if offset and r.status_code == 416:
+                    # The .part may hold the whole body already
+                    path = sink.recover(r.headers.get("Content-Range"))
+                    if path is None:
+                        raise ConnectionError(
+                            f"Discarded the partial download of {url}"
+                        )
+                    return path
+                r.raise_for_status()
+                # A server ignoring the Range header answers 200 with the
+                # whole body, so the partial file must be rewritten.
+                append = offset > 0 and r.status_code == 206
+                with sink.open(append=append) as f:
+                    for chunk in r.iter_bytes(BUFFER_SIZE):
+                        sink.write(f, chunk)
+            path = sink.commit()
+            request.size = sink.written
+        return path
+
     def __enter__(self) -> "SidraClient":
         """Context manager enter: return the client instance."""
         return self
@@ -304,6 +543,50 @@ class SidraClient:
         logger.info("Fetcher closed.")
 
 
+_FIM = object()
+
+
+async def _as_completed(
+    calls: Iterable[tuple[Any, Callable[[], Awaitable[Any]]]],
+    max_concurrency: int,
+    buffer: int,
+) -> AsyncIterator[tuple[Any, Any]]:
+    """Yield ``(key, result)`` of ``calls`` as they complete.
+
+    ``max_concurrency`` workers take the calls in order. A worker that
+    finished a call waits for room in a queue of ``buffer`` results
+    before starting the next one, so a slow consumer throttles the
+    requests. Remaining calls are cancelled when the consumer stops or a
+    call fails.
+    """
+    calls = iter(calls)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=buffer)
+    ativos = max_concurrency
+
+    async def worker() -> None:
+        nonlocal ativos
+        try:
+            for key, call in calls:
+                await queue.put((key, await call()))
+        except Exception as e:
+            await queue.put(e)
+            return
+        ativos -= 1
+        if ativos == 0:
+            await queue.put(_FIM)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max_concurrency)]
+    try:
+        while (item := await queue.get()) is not _FIM:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
 class AsyncSidraClient:
     """Async HTTP client for interacting with IBGE's agregados and SIDRA APIs.
 
@@ -317,8 +600,22 @@ class AsyncSidraClient:
             data = await client.get(url)
     """
 
-    def __init__(self, timeout: int = 60) -> None:
-        self.client = httpx.AsyncClient(timeout=timeout, follow_redirects=True)
+    def __init__(
+        self,
+        timeout: int = 60,
+        transport: httpx.AsyncBaseTransport | None = None,
+        hooks: Iterable[Hook] | None = None,
+        cache: ObjectCache | None = None,
+        pesquisas: PesquisaIndex | None = None,
+    ) -> None:
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            transport=transport,
+        )
+        self.instrumentation = Instrumentation(hooks)
+        self.cache = cache
+        self.pesquisas = pesquisas
 
     async def get(self, url: str) -> Any:
         """Fetch data from the given URL asynchronously.
@@ -333,25 +630,34 @@ class AsyncSidraClient:
             ConnectionError: If the data returned is empty or the request fails.
         """
         logger.info(f"Downloading DATA {url}")
-        t0 = time.time()
-        data = b""
-        async with self.client.stream("GET", url) as r:
-            r.raise_for_status()
-            async for chunk in r.aiter_bytes():
-                data += chunk
-        if not data:
-            raise ConnectionError("Data returned is None!")
-        t1 = time.time()
-        logger.debug(f"Download of {url} took {t1 - t0:.2f} seconds")
-        return json.loads(data.decode("utf-8"))
-
-    @retry(stop=stop_after_attempt(3))
-    async def get_indice_pesquisas_agregados(self) -> list[IndicePesquisaAgregados]:
+        chunks: list[bytes] = []
+        with self.instrumentation.request(url) as request:
+            async with self.client.stream("GET", url) as r:
+                request.first_byte(r.status_code)
+                r.raise_for_status()
+                async for chunk in r.aiter_bytes():
+                    chunks.append(chunk)
+            data = b"".join(chunks)
+            if not data:
+                raise ConnectionError("Data returned is None!")
+            request.size = len(data)
+        t1 = time.perf_counter()
+        logger.debug(f"Download of {url} took {request.elapsed:.2f} seconds")
+        data = json.loads(data.decode("utf-8"))
+        self.instrumentation.emit(
+            EventType.PARSE, url, time.perf_counter() - t1
+        )
+        return data
+
+    @retry(stop=stop_after_attempt(3), before_sleep=retry_hook)
+    async def get_indice_pesquisas_agregados(
+        self, filtros: dict[str, str] | None = None
+    ) -> list[IndicePesquisaAgregados]:
         """Fetch the index of agregados grouped by pesquisa."""
-        url_agregados = build_url_agregados()
+        url_agregados = build_url_agregados(filtros)
         logger.info(f"Downloading list of agregados metadata {url_agregados}")
         data = await self.get(url_agregados)
-        return [
+        indice = [
             IndicePesquisaAgregados(
                 id=item["id"],
                 nome=item["nome"],
@@ -365,10 +671,29 @@ class AsyncSidraClient:
             )
             for item in data
         ]
+        if not filtros:
+            self.pesquisas = PesquisaIndex(indice)
+        return indice
+
+    async def pesquisa_index(self) -> PesquisaIndex:
+        """Return :attr:`pesquisas`, fetching the agregados index once."""
+        if self.pesquisas is None:
+            await self.get_indice_pesquisas_agregados()
+        return self.pesquisas
 
-    @retry(stop=stop_after_attempt(3))
     async def get_agregado_metadados(self, agregado_id: int) -> Agregado:
-        """Fetch metadata for a specific agregado."""
+        """Fetch metadata for a specific agregado.
+
+        The pesquisa is filled from :attr:`pesquisas` on every call.
+        """
+        agregado = await self._get_agregado_metadados(agregado_id)
+        if self.pesquisas is not None:
+            agregado = self.pesquisas.fill(agregado)
+        return agregado
+
+    @cached("metadados")
+    @retry(stop=stop_after_attempt(3), before_sleep=retry_hook)
+    async def _get_agregado_metadados(self, agregado_id: int) -> Agregado:
         url_metadados = build_url_metadados(agregado_id)
         logger.info(f"Downloading agregado metadados {url_metadados}")
         data = await self.get(url_metadados)
@@ -420,9 +745,11 @@ class AsyncSidraClient:
             localidades=[],
         )
 
+    @cached("periodos")
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=3, max=30),
+        before_sleep=retry_hook,
     )
     async def get_agregado_periodos(self, agregado_id: int) -> list[Periodo]:
         """Fetch available periods for an aggregate."""
@@ -440,6 +767,7 @@ class AsyncSidraClient:
             for periodo in data
         ]
 
+    @cached("localidades")
     async def get_agregado_localidades(
         self, agregado_id: int, localidades_nivel: str
     ) -> list[Localidade]:
@@ -459,32 +787,111 @@ class AsyncSidraClient:
             for localidade in data
         ]
 
-    async def get_agregado(self, agregado_id: int) -> Agregado:
+    async def get_agregado(
+        self,
+        agregado_id: int,
+        lazy: bool = False,
+        speculate: bool | Iterable[str] = False,
+    ) -> Agregado:
         """Fetch a complete :class:`Agregado` including periods and localidades.
 
         Metadados and periods are fetched concurrently.  Localidades for
-        all territorial levels are also requested concurrently via
-        ``asyncio.gather``.
+        all territorial levels are then requested at once, falling back
+        to smaller requests for levels the API rejects. With ``lazy``,
+        only the metadados are fetched and a :class:`LazyAgregado` is
+        returned.
+
+        With ``speculate``, the localidades of the likely levels
+        (:data:`NIVEIS_PROVAVEIS`, or the given levels) are requested
+        together with the metadados, saving a round trip when the guess
+        is right. Guessed levels the agregado does not declare are
+        discarded, and declared levels that were not guessed are fetched
+        once the metadados arrive.
         """
         logger.info(f"Downloading agregado {agregado_id}")
-        agregado_metadados, agregado_periodos = await asyncio.gather(
-            self.get_agregado_metadados(agregado_id),
-            self.get_agregado_periodos(agregado_id),
-        )
+        if lazy:
+            agregado_metadados = await self.get_agregado_metadados(agregado_id)
+            return LazyAgregado(agregado_metadados, self)
+        especulacao = None
+        if speculate:
+            especulados = list(
+                NIVEIS_PROVAVEIS if speculate is True else speculate
+            )
+            especulacao = asyncio.ensure_future(
+                self.get_agregado_localidades(
+                    agregado_id, "|".join(especulados)
+                )
+            )
+        try:
+            agregado_metadados, agregado_periodos = await asyncio.gather(
+                self.get_agregado_metadados(agregado_id),
+                self.get_agregado_periodos(agregado_id),
+            )
+        except BaseException:
+            if especulacao is not None:
+                especulacao.cancel()
+            raise
         niveis = (
             agregado_metadados.nivel_territorial.administrativo
             + agregado_metadados.nivel_territorial.especial
             + agregado_metadados.nivel_territorial.ibge
         )
-        localidades_lists = await asyncio.gather(
-            *(self.get_agregado_localidades(agregado_id, nivel) for nivel in niveis)
+        if especulacao is not None:
+            agregado_localidades = await self._complete_speculation(
+                agregado_id, niveis, especulados, especulacao
+            )
+        elif niveis:
+            agregado_localidades = await self._get_localidades(
+                agregado_id, niveis
+            )
+        else:
+            agregado_localidades = []
+        return replace(
+            agregado_metadados,
+            periodos=agregado_periodos,
+            localidades=agregado_localidades,
         )
-        agregado_localidades: list[Localidade] = [
-            loc for locs in localidades_lists for loc in locs
-        ]
-        agregado_metadados.periodos = agregado_periodos
-        agregado_metadados.localidades = agregado_localidades
-        return agregado_metadados
+
+    async def _complete_speculation(
+        self,
+        agregado_id: int,
+        niveis: list[str],
+        especulados: list[str],
+        especulacao: asyncio.Future,
+    ) -> list[Localidade]:
+        """Keep what a speculative localidades request got right.
+
+        The request is cancelled when none of ``especulados`` is in
+        ``niveis``, and ignored when the API rejected it.
+        """
+        localidades: list[Localidade] = []
+        if set(especulados).isdisjoint(niveis):
+            especulacao.cancel()
+        else:
+            try:
+                localidades = await especulacao
+            except httpx.HTTPStatusError as e:
+                if not _rejeitado(e, especulados):
+                    raise
+                logger.info(f"Speculative request of {especulados} failed")
+                especulados = []
+        faltantes = [nivel for nivel in niveis if nivel not in especulados]
+        if faltantes:
+            localidades = localidades + await self._get_localidades(
+                agregado_id, faltantes
+            )
+        return _por_nivel(
+            [loc for loc in localidades if loc.nivel.id in niveis], niveis
+        )
+
+    async def _get_localidades(
+        self, agregado_id: int, niveis: list[str]
+    ) -> list[Localidade]:
+        """Async counterpart of :meth:`SidraClient._get_localidades`."""
+        localidades = await fetch_niveis_async(
+            partial(self.get_agregado_localidades, agregado_id), niveis
+        )
+        return _por_nivel(localidades, niveis)
 
     async def get_acervo(self, acervo: AcervoEnum) -> Any:
         """Fetch an `acervo` (collection) listing from the agregados API."""
@@ -492,6 +899,158 @@ class AsyncSidraClient:
         logger.info(f"Downloading acervo {url_acervo}")
         return await self.get(url_acervo)
 
+    async def stream_agregado_localidades(
+        self,
+        agregado_id: int,
+        niveis: Iterable[str] | None = None,
+        max_concurrency: int = 4,
+        buffer: int = 1,
+    ) -> AsyncIterator[tuple[str, list[Localidade]]]:
+        """Yield the localidades of each level as soon as they arrive.
+
+        Levels are requested concurrently and yielded in completion
+        order. At most ``max_concurrency`` requests run at once, and
+        once ``buffer`` levels wait for the consumer no new request
+        starts::
+
+            async for nivel, localidades in client.stream_agregado_localidades(
+                1705
+            ):
+                write(nivel, localidades)
+
+        Args:
+            agregado_id: Aggregate id.
+            niveis: Territorial levels to fetch; all the levels of the
+                aggregate by default, which costs a metadados request.
+            max_concurrency: Maximum number of concurrent requests.
+            buffer: Number of levels fetched ahead of the consumer.
+
+        Yields:
+            ``(nivel, localidades)`` pairs.
+        """
+        if niveis is None:
+            metadados = await self.get_agregado_metadados(agregado_id)
+            niveis = (
+                metadados.nivel_territorial.administrativo
+                + metadados.nivel_territorial.especial
+                + metadados.nivel_territorial.ibge
+            )
+        calls = (
+            (
+                nivel,
+                partial(self.get_agregado_localidades, agregado_id, nivel),
+            )
+            for nivel in niveis
+        )
+        async for item in _as_completed(calls, max_concurrency, buffer):
+            yield item
+
+    @retry(stop=stop_after_attempt(3), before_sleep=retry_hook)
+    async def get_values(self, parametro: Parametro) -> list[dict[str, str]]:
+        """Fetch the rows of a SIDRA ``/values`` request."""
+        url = parametro.url()
+        logger.info(f"Downloading values {url}")
+        return await self.get(url)
+
+    async def stream_values(
+        self,
+        parametro: Parametro,
+        agregado: Agregado | None = None,
+        periodos_por_tarefa: int = 1,
+        localidades_por_tarefa: int | None = None,
+        max_concurrency: int = 4,
+        buffer: int = 1,
+    ) -> AsyncIterator[tuple[Parametro, list[dict[str, str]]]]:
+        """Yield the rows of a SIDRA request slice by slice.
+
+        ``parametro`` is split with :func:`~sidra_fetcher.jobs.split_parametro`
+        and the slices are requested concurrently, yielded in completion
+        order with the same backpressure as
+        :meth:`stream_agregado_localidades`::
+
+            async for fatia, rows in client.stream_values(parametro):
+                write_batch(to_record_batch(rows, parametro=fatia))
+
+        Args:
+            parametro: The request to split.
+            agregado: Metadata used to expand ``"all"`` and period ranges,
+                see :func:`~sidra_fetcher.jobs.split_parametro`.
+            periodos_por_tarefa: Periods per slice.
+            localidades_por_tarefa: Localities per slice.
+            max_concurrency: Maximum number of concurrent requests.
+            buffer: Number of slices fetched ahead of the consumer.
+
+        Yields:
+            ``(slice, rows)`` pairs, ``slice`` being the
+            :class:`~sidra_fetcher.sidra.Parametro` of the rows.
+        """
+        fatias = split_parametro(
+            parametro, agregado, periodos_por_tarefa, localidades_por_tarefa
+        )
+        calls = (
+            (fatia, partial(self.get_values, fatia)) for _, fatia in fatias
+        )
+        async for item in _as_completed(calls, max_concurrency, buffer):
+            yield item
+
+    async def download_values(
+        self,
+        parametro: Parametro | str,
+        dest: str | Path,
+        format: Format = "json",
+        partition_by: Literal["periodos"] | None = None,
+        max_concurrency: int = 4,
+    ) -> list[Path]:
+        """Stream SIDRA ``/values`` responses straight to disk.
+
+        Async counterpart of :meth:`SidraClient.download_values`;
+        partitions are downloaded concurrently, at most
+        ``max_concurrency`` at a time.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def download(url: str, path: Path) -> Path:
+            if path.exists():
+                logger.info(f"Skipping {url}, {path} already exists")
+                return path
+            async with semaphore:
+                return await self._download_file(url, Sink(path, format))
+
+        plan = plan_downloads(parametro, dest, format, partition_by)
+        return list(
+            await asyncio.gather(*(download(url, path) for url, path in plan))
+        )
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=3, max=30),
+        before_sleep=retry_hook,
+    )
+    async def _download_file(self, url: str, sink: Sink) -> Path:
+        """Download ``url`` into ``sink``, resuming a partial file."""
+        logger.info(f"Downloading DATA {url} to {sink.dest}")
+        offset = sink.resume_offset()
+        headers = {"Range": f"bytes={offset}-"} if offset else None
+        with self.instrumentation.request(url) as request:
+            async with self.client.stream("GET", url, headers=headers) as r:
+                request.first_byte(r.status_code)
+                if offset and r.status_code == 416:
+                    # The .part may hold the whole body already
+                    path = sink.recover(r.headers.get("Content-Range"))
+                    if path is None:
+                        raise ConnectionError(
+                            f"Discarded the partial download of {url}"
+                        )
+                    return path
+                r.raise_for_status()
+                append = offset > 0 and r.status_code == 206
+                with sink.open(append=append) as f:
+                    async for chunk in r.aiter_bytes(BUFFER_SIZE):
+                        sink.write(f, chunk)
+            path = sink.commit()
+            request.size = sink.written
+        return path
+
     async def __aenter__(self) -> "AsyncSidraClient":
         """Async context manager enter: return the client instance."""
         return self
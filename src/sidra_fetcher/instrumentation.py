@@ -0,0 +1,462 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Instrumentation hooks and metrics for the HTTP clients.
+
+The clients report what happens on their hot path as :class:`Event`
+objects passed to plain callables ("hooks"). An event carries its
+:class:`EventType`, the URL, the endpoint it belongs to (see
+:func:`endpoint_name`) and a numeric ``value`` whose meaning depends on
+the type (seconds for timings, bytes for :attr:`EventType.BYTES`).
+
+:class:`MetricsRecorder` is a ready-made hook that aggregates events in
+per-endpoint counters and histograms and renders them in the Prometheus
+text exposition format. :class:`OpenTelemetryHook` forwards the same
+measurements to an OpenTelemetry meter when ``opentelemetry-api`` is
+installed::
+
+    >>> metrics = MetricsRecorder()
+    >>> client = SidraClient(hooks=[metrics])
+    >>> client.get_agregado(1705)
+    >>> print(metrics.render())
+"""
+
+import bisect
+import re
+import threading
+import time
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Any, Callable, Iterable
+
+from . import logger
+
+
+class EventType(StrEnum):
+    """Kinds of events emitted by the clients."""
+
+    REQUEST_START = "request_start"  # value: 0
+    FIRST_BYTE = "first_byte"  # value: seconds until response headers
+    BYTES = "bytes"  # value: bytes received in the response body
+    REQUEST_END = "request_end"  # value: seconds of the whole download
+    PARSE = "parse"  # value: seconds spent decoding the body
+    RETRY = "retry"  # value: seconds until the next attempt
+    CACHE_HIT = "cache_hit"  # value: 0
+    CACHE_MISS = "cache_miss"  # value: 0
+    QUEUE_WAIT = "queue_wait"  # value: seconds waited for a slot
+
+
+@dataclass
+class Event:
+    """A single measurement reported by a client.
+
+    Attributes:
+        type: What happened.
+        url: URL of the request; the retried method name for retries
+            and the cache or queue key for events that are not HTTP.
+        endpoint: Endpoint family of the URL (see :func:`endpoint_name`).
+        value: Measurement, in seconds or bytes depending on ``type``.
+        status: HTTP status code, when known.
+        error: Exception class name when the operation failed.
+        attempt: Attempt number for :attr:`EventType.RETRY` events.
+        timestamp: ``time.time()`` when the event was emitted.
+    """
+
+    type: EventType
+    url: str
+    endpoint: str
+    value: float = 0.0
+    status: int | None = None
+    error: str | None = None
+    attempt: int | None = None
+    timestamp: float = 0.0
+
+
+Hook = Callable[[Event], Any]
+
+_AGREGADO_PATH_RE = re.compile(
+    r"/agregados/\d+/(metadados|periodos|localidades)"
+)
+
+
+def endpoint_name(url: str) -> str:
+    """Return the endpoint family of an IBGE URL.
+
+    One of ``"values"``, ``"metadados"``, ``"periodos"``,
+    ``"localidades"``, ``"acervo"``, ``"agregados"`` or ``"other"``.
+    Used as the label of the per-endpoint metrics.
+    """
+    if "/values" in url:
+        return "values"
+    if m := _AGREGADO_PATH_RE.search(url):
+        return m.group(1)
+    if "acervo=" in url:
+        return "acervo"
+    if "/agregados" in url:
+        return "agregados"
+    return "other"
+
+
+class Instrumentation:
+    """Dispatch :class:`Event` objects to the registered hooks.
+
+    Hooks run synchronously on the calling thread, so they should be
+    cheap. A hook raising an exception is logged and otherwise ignored;
+    instrumentation must never break a download.
+    """
+
+    def __init__(self, hooks: Iterable[Hook] | None = None) -> None:
+        self.hooks: list[Hook] = list(hooks or [])
+
+    def add_hook(self, hook: Hook) -> None:
+        """Register ``hook`` to receive every subsequent event."""
+        self.hooks.append(hook)
+
+    def emit(
+        self,
+        type: EventType,
+        url: str,
+        value: float = 0.0,
+        endpoint: str | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Build an :class:`Event` and pass it to every hook."""
+        if not self.hooks:
+            return
+        event = Event(
+            type=type,
+            url=url,
+            endpoint=endpoint or endpoint_name(url),
+            value=value,
+            timestamp=time.time(),
+            **kwargs,
+        )
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception:
+                logger.exception(f"Instrumentation hook {hook!r} failed")
+
+    def request(self, url: str) -> "RequestTracker":
+        """Return a :class:`RequestTracker` for one request of ``url``."""
+        return RequestTracker(self, url)
+
+
+class RequestTracker:
+    """Emit the events of one HTTP request around the code running it.
+
+    Returned by :meth:`Instrumentation.request`. Entering emits
+    :attr:`EventType.REQUEST_START`; :meth:`first_byte` is called when
+    the response headers arrive. Leaving emits
+    :attr:`EventType.BYTES` (from :attr:`size`) and
+    :attr:`EventType.REQUEST_END`, or only a failed
+    :attr:`EventType.REQUEST_END` when an exception escapes.
+
+    Attributes:
+        status: HTTP status code, once known.
+        size: Bytes received, set by the caller before leaving.
+        elapsed: Seconds of the whole request, once left.
+    """
+
+    def __init__(self, instrumentation: "Instrumentation", url: str) -> None:
+        self.instrumentation = instrumentation
+        self.url = url
+        self.status: int | None = None
+        self.size = 0
+        self.elapsed = 0.0
+        self._t0 = 0.0
+
+    def __enter__(self) -> "RequestTracker":
+        self.instrumentation.emit(EventType.REQUEST_START, self.url)
+        self._t0 = time.perf_counter()
+        return self
+
+    def first_byte(self, status: int) -> None:
+        """Record the status of the response whose headers arrived."""
+        self.status = status
+        self.instrumentation.emit(
+            EventType.FIRST_BYTE, self.url, time.perf_counter() - self._t0
+        )
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.elapsed = time.perf_counter() - self._t0
+        emit = self.instrumentation.emit
+        if exc_type is not None:
+            if issubclass(exc_type, Exception):
+                emit(
+                    EventType.REQUEST_END,
+                    self.url,
+                    self.elapsed,
+                    status=self.status,
+                    error=exc_type.__name__,
+                )
+            return
+        emit(EventType.BYTES, self.url, self.size)
+        emit(
+            EventType.REQUEST_END, self.url, self.elapsed, status=self.status
+        )
+
+
+_RETRY_ENDPOINTS = {
+    "get_indice_pesquisas_agregados": "agregados",
+    "_get_agregado_metadados": "metadados",
+    "get_agregado_periodos": "periodos",
+    "get_agregado_localidades": "localidades",
+    "get_acervo": "acervo",
+    "get_values": "values",
+    "_download_file": "values",
+}
+
+
+def retry_hook(retry_state: Any) -> None:
+    """``tenacity`` ``before_sleep`` callback emitting a retry event.
+
+    The decorated methods are client methods, so the client instance is
+    the first positional argument of the retried call.
+    """
+    if not retry_state.args:
+        return
+    instrumentation = getattr(retry_state.args[0], "instrumentation", None)
+    if instrumentation is None:
+        return
+    outcome = retry_state.outcome
+    error = None
+    if outcome is not None and outcome.failed:
+        error = type(outcome.exception()).__name__
+    method = retry_state.fn.__name__
+    instrumentation.emit(
+        EventType.RETRY,
+        url=method,
+        endpoint=_RETRY_ENDPOINTS.get(method, "other"),
+        value=retry_state.upcoming_sleep or 0.0,
+        error=error,
+        attempt=retry_state.attempt_number,
+    )
+
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, as in Prometheus."""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Add one observation."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """Return ``(upper_bound, count)`` pairs, ending with ``+Inf``."""
+        total = 0
+        out = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            out.append((bound, total))
+        return out
+
+    def quantile(self, q: float) -> float:
+        """Estimate quantile ``q`` as the upper bound of its bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+_HISTOGRAMS = {
+    EventType.REQUEST_END: (
+        "request_duration_seconds",
+        "Time to download a response body.",
+        LATENCY_BUCKETS,
+    ),
+    EventType.FIRST_BYTE: (
+        "time_to_first_byte_seconds",
+        "Time until the response headers were received.",
+        LATENCY_BUCKETS,
+    ),
+    EventType.PARSE: (
+        "parse_duration_seconds",
+        "Time spent decoding response bodies.",
+        LATENCY_BUCKETS,
+    ),
+    EventType.BYTES: (
+        "response_size_bytes",
+        "Size of response bodies.",
+        SIZE_BUCKETS,
+    ),
+    EventType.QUEUE_WAIT: (
+        "queue_wait_seconds",
+        "Time requests waited for a scheduler slot.",
+        LATENCY_BUCKETS,
+    ),
+}
+_COUNTERS = {
+    EventType.REQUEST_START: ("requests_total", "Requests started."),
+    EventType.RETRY: ("retries_total", "Retried calls."),
+    EventType.CACHE_HIT: ("cache_hits_total", "Cache hits."),
+    EventType.CACHE_MISS: ("cache_misses_total", "Cache misses."),
+}
+
+
+class MetricsRecorder:
+    """Hook aggregating events into per-endpoint counters and histograms.
+
+    Thread-safe, so one recorder can be shared by several clients. Use
+    :meth:`render` to export the metrics in the Prometheus text format.
+    """
+
+    def __init__(self, namespace: str = "sidra_fetcher") -> None:
+        self.namespace = namespace
+        self.histograms: dict[tuple[EventType, str], Histogram] = {}
+        self.counters: dict[tuple[EventType, str], int] = {}
+        self.errors: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event) -> None:
+        with self._lock:
+            if event.type in _HISTOGRAMS:
+                key = (event.type, event.endpoint)
+                if key not in self.histograms:
+                    buckets = _HISTOGRAMS[event.type][2]
+                    self.histograms[key] = Histogram(buckets)
+                self.histograms[key].observe(event.value)
+            if event.type in _COUNTERS:
+                key = (event.type, event.endpoint)
+                self.counters[key] = self.counters.get(key, 0) + 1
+            if event.type == EventType.REQUEST_END and event.error:
+                key = (event.endpoint, event.error)
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def histogram(self, type: EventType, endpoint: str) -> Histogram:
+        """Return the histogram of ``type`` for ``endpoint``."""
+        with self._lock:
+            buckets = _HISTOGRAMS[type][2]
+            return self.histograms.get((type, endpoint), Histogram(buckets))
+
+    def counter(self, type: EventType, endpoint: str) -> int:
+        """Return the counter of ``type`` for ``endpoint``."""
+        with self._lock:
+            return self.counters.get((type, endpoint), 0)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        ns = self.namespace
+        lines: list[str] = []
+        with self._lock:
+            for type, (name, help, _) in _HISTOGRAMS.items():
+                series = [
+                    (endpoint, h)
+                    for (t, endpoint), h in sorted(self.histograms.items())
+                    if t == type
+                ]
+                if not series:
+                    continue
+                lines.append(f"# HELP {ns}_{name} {help}")
+                lines.append(f"# TYPE {ns}_{name} histogram")
+                for endpoint, h in series:
+                    label = f'endpoint="{endpoint}"'
+                    for bound, total in h.cumulative():
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(
+                            f'{ns}_{name}_bucket{{{label},le="{le}"}} {total}'
+                        )
+                    lines.append(f"{ns}_{name}_sum{{{label}}} {h.sum!r}")
+                    lines.append(f"{ns}_{name}_count{{{label}}} {h.count}")
+            for type, (name, help) in _COUNTERS.items():
+                series = [
+                    (endpoint, n)
+                    for (t, endpoint), n in sorted(self.counters.items())
+                    if t == type
+                ]
+                if not series:
+                    continue
+                lines.append(f"# HELP {ns}_{name} {help}")
+                lines.append(f"# TYPE {ns}_{name} counter")
+                for endpoint, n in series:
+                    lines.append(f'{ns}_{name}{{endpoint="{endpoint}"}} {n}')
+            if self.errors:
+                name = f"{ns}_request_errors_total"
+                lines.append(f"# HELP {name} Failed requests.")
+                lines.append(f"# TYPE {name} counter")
+                for (endpoint, error), n in sorted(self.errors.items()):
+                    lines.append(
+                        f'{name}{{endpoint="{endpoint}",error="{error}"}} {n}'
+                    )
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetryHook:
+    """Hook recording events on an OpenTelemetry meter.
+
+    Requires the ``opentelemetry-api`` package. When ``meter`` is not
+    given, the global meter provider is used.
+    """
+
+    def __init__(self, meter: Any = None) -> None:
+        if meter is None:
+            try:
+                from opentelemetry import metrics
+            except ImportError as e:
+                raise ImportError(
+                    "OpenTelemetryHook requires the opentelemetry-api package"
+                ) from e
+            meter = metrics.get_meter("sidra_fetcher")
+        self.histograms = {
+            type: meter.create_histogram(
+                f"sidra_fetcher.{name}",
+                unit="By" if type == EventType.BYTES else "s",
+                description=help,
+            )
+            for type, (name, help, _) in _HISTOGRAMS.items()
+        }
+        self.counters = {
+            type: meter.create_counter(
+                f"sidra_fetcher.{name}", description=help
+            )
+            for type, (name, help) in _COUNTERS.items()
+        }
+
+    def __call__(self, event: Event) -> None:
+        attributes = {"endpoint": event.endpoint}
+        if event.error:
+            attributes["error"] = event.error
+        if event.type in self.histograms:
+            self.histograms[event.type].record(event.value, attributes)
+        if event.type in self.counters:
+            self.counters[event.type].add(1, attributes)
@@ -0,0 +1,327 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Catalog-wide inventory of variables and classifications.
+
+Listing the variables and classifications of the whole catalog from the
+metadados of every agregado takes thousands of requests. The variable
+and classification acervos list all of them, with their names, in two::
+
+    inventario = Inventario(client, AcervoIndex("acervos.json"))
+    inventario.build()                    # Two acervo requests
+    inventario.variaveis[93].nome
+
+The acervos lack the unit and sumarizacao of the variables and the
+categories and sumarizacao of the classifications. Those are filled from
+the metadados of an agregado using them, fetched only when asked for:
+:meth:`Inventario.variavel` and :meth:`Inventario.classificacao`
+complete one entry, and :meth:`Inventario.complete` completes many with
+as few metadados requests as it can, choosing first the agregados that
+use the most incomplete entries. Which agregados use an entry comes from
+the :class:`~sidra_fetcher.acervo.AcervoIndex`, and every metadados
+fetched is added to it.
+
+The API cannot list the agregados of a variable, so the index only
+knows the variables of agregados already read. Entries the index does
+not place are searched in the metadados of the agregados not read yet,
+from the client's :meth:`~sidra_fetcher.fetcher.SidraClient.pesquisa_index`,
+until every one is found; this scans the whole catalog for an entry no
+agregado uses, once.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from . import logger
+from .acervo import AcervoIndex
+from .agregados import (
+    AcervoEnum,
+    Agregado,
+    Categoria,
+    ClassificacaoSumarizacao,
+)
+from .pesquisas import PesquisaIndex
+from .reader import read_acervo
+
+
+@dataclass
+class InventarioVariavel:
+    """A variable of the catalog.
+
+    ``unidade`` and ``sumarizacao`` are ``None`` until completed from
+    the metadados of an agregado.
+    """
+
+    id: int
+    nome: str
+    unidade: str | None = None
+    sumarizacao: list[str] | None = None
+
+    @property
+    def completo(self) -> bool:
+        return self.unidade is not None
+
+
+@dataclass
+class InventarioClassificacao:
+    """A classification of the catalog.
+
+    ``sumarizacao`` and ``categorias`` are ``None`` until completed from
+    the metadados of an agregado.
+    """
+
+    id: int
+    nome: str
+    sumarizacao: ClassificacaoSumarizacao | None = None
+    categorias: list[Categoria] | None = field(default=None, repr=False)
+
+    @property
+    def completo(self) -> bool:
+        return self.categorias is not None
+
+
+_ACERVOS = {
+    AcervoEnum.VARIAVEL: "variaveis",
+    AcervoEnum.CLASSIFICACAO: "classificacoes",
+}
+
+
+class Inventario:
+    """Variables and classifications of the catalog, from the acervos.
+
+    Args:
+        client: A :class:`~sidra_fetcher.fetcher.SidraClient` or
+            :class:`~sidra_fetcher.fetcher.AsyncSidraClient`. With an
+            async client use :meth:`build_async` and
+            :meth:`complete_async`.
+        indice: Index of the agregados using each entry. A new, empty
+            one by default.
+
+    Attributes:
+        variaveis: Entries by variable id.
+        classificacoes: Entries by classification id.
+        requests: Metadados requests made to complete entries.
+    """
+
+    def __init__(self, client: Any, indice: AcervoIndex | None = None) -> None:
+        self._client = client
+        self.indice = AcervoIndex() if indice is None else indice
+        self.variaveis: dict[int, InventarioVariavel] = {}
+        self.classificacoes: dict[int, InventarioClassificacao] = {}
+        self.requests = 0
+        self._lidos: set[int] = set()
+
+    def _read(self, acervo: AcervoEnum, data: Any) -> None:
+        entradas = getattr(self, _ACERVOS[acervo])
+        tipo = (
+            InventarioVariavel
+            if acervo is AcervoEnum.VARIAVEL
+            else InventarioClassificacao
+        )
+        for item in read_acervo(data):
+            item_id = int(item.id)
+            if item_id not in entradas:
+                entradas[item_id] = tipo(id=item_id, nome=item.nome)
+
+    def build(self) -> None:
+        """List the variables and classifications from the acervos."""
+        for acervo in _ACERVOS:
+            self._read(acervo, self._client.get_acervo(acervo))
+
+    async def build_async(self) -> None:
+        """Async counterpart of :meth:`build`."""
+        acervos = list(_ACERVOS)
+        listagens = await asyncio.gather(
+            *(self._client.get_acervo(acervo) for acervo in acervos)
+        )
+        for acervo, data in zip(acervos, listagens):
+            self._read(acervo, data)
+
+    def add_agregado(self, agregado: Agregado) -> None:
+        """Complete the entries used by an agregado from its metadados."""
+        self.indice.add_agregado(agregado)
+        self._lidos.add(agregado.id)
+        for v in agregado.variaveis:
+            entrada = self.variaveis.setdefault(
+                v.id, InventarioVariavel(id=v.id, nome=v.nome)
+            )
+            if not entrada.completo:
+                entrada.unidade = v.unidade
+                entrada.sumarizacao = v.sumarizacao
+        for c in agregado.classificacoes:
+            entrada = self.classificacoes.setdefault(
+                c.id, InventarioClassificacao(id=c.id, nome=c.nome)
+            )
+            if not entrada.completo:
+                entrada.sumarizacao = c.sumarizacao
+                entrada.categorias = c.categorias
+
+    def incomplete(self) -> list[tuple[AcervoEnum, int]]:
+        """Return the ``(acervo, id)`` of the entries not completed yet."""
+        return [
+            (acervo, entrada.id)
+            for acervo, nome in _ACERVOS.items()
+            for entrada in getattr(self, nome).values()
+            if not entrada.completo
+        ]
+
+    def _plan(self, chaves: Iterable[tuple[AcervoEnum, int]]) -> list[int]:
+        """Choose agregados whose metadados complete the ``chaves``.
+
+        Greedy set cover: the agregado using the most incomplete entries
+        first. Entries used by no indexed agregado are left out.
+        """
+        faltando = {(acervo, str(item_id)) for acervo, item_id in chaves}
+        cobertura: dict[int, set[tuple[AcervoEnum, str]]] = {}
+        for chave in faltando:
+            for agregado_id in self.indice.agregados(*chave):
+                cobertura.setdefault(agregado_id, set()).add(chave)
+        plano = []
+        while cobertura:
+            agregado_id = max(cobertura, key=lambda a: (len(cobertura[a]), -a))
+            cobertas = cobertura.pop(agregado_id)
+            plano.append(agregado_id)
+            for agregado in list(cobertura):
+                cobertura[agregado] -= cobertas
+                if not cobertura[agregado]:
+                    del cobertura[agregado]
+        return plano
+
+    def _pending(
+        self, chaves: Iterable[tuple[AcervoEnum, int]] | None
+    ) -> list[tuple[AcervoEnum, int]]:
+        if chaves is None:
+            return self.incomplete()
+        return [
+            (acervo, item_id)
+            for acervo, item_id in chaves
+            if not self._entrada(acervo, item_id).completo
+        ]
+
+    def _entrada(
+        self, acervo: AcervoEnum, item_id: int
+    ) -> InventarioVariavel | InventarioClassificacao:
+        return getattr(self, _ACERVOS[acervo])[item_id]
+
+    def _candidatas(self, pesquisas: PesquisaIndex) -> list[int]:
+        """Agregados not read yet, to search for entries not indexed."""
+        return [a for a in pesquisas if a not in self._lidos]
+
+    def _not_found(self, faltando: list[tuple[AcervoEnum, int]]) -> None:
+        if faltando:
+            logger.warning(f"No agregado of the catalog uses {faltando}")
+
+    def complete(
+        self, chaves: Iterable[tuple[AcervoEnum, int]] | None = None
+    ) -> int:
+        """Complete entries from the metadados of the agregados using them.
+
+        Entries the index does not place are then searched in the
+        agregados not read yet, one metadados at a time.
+
+        Args:
+            chaves: ``(acervo, id)`` of the entries to complete, every
+                incomplete entry by default.
+
+        Returns:
+            The number of metadados requests made.
+        """
+        pendentes = self._pending(chaves)
+        plano = self._plan(pendentes)
+        for agregado_id in plano:
+            self.add_agregado(self._client.get_agregado_metadados(agregado_id))
+        n = len(plano)
+        faltando = self._pending(pendentes)
+        if faltando:
+            pesquisas = self._client.pesquisa_index()
+            for agregado_id in self._candidatas(pesquisas):
+                self.add_agregado(
+                    self._client.get_agregado_metadados(agregado_id)
+                )
+                n += 1
+                faltando = self._pending(faltando)
+                if not faltando:
+                    break
+        self._not_found(faltando)
+        self.requests += n
+        logger.info(f"Completed the inventory with {n} metadados")
+        return n
+
+    async def complete_async(
+        self,
+        chaves: Iterable[tuple[AcervoEnum, int]] | None = None,
+        max_concurrency: int = 4,
+    ) -> int:
+        """Async counterpart of :meth:`complete`.
+
+        At most ``max_concurrency`` metadados are requested at a time,
+        and the agregados not indexed are searched ``max_concurrency``
+        at a time.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def get(agregado_id: int) -> Agregado:
+            async with semaphore:
+                return await self._client.get_agregado_metadados(agregado_id)
+
+        pendentes = self._pending(chaves)
+        plano = self._plan(pendentes)
+        agregados = await asyncio.gather(*(get(a) for a in plano))
+        for agregado in agregados:
+            self.add_agregado(agregado)
+        n = len(plano)
+        faltando = self._pending(pendentes)
+        if faltando:
+            pesquisas = await self._client.pesquisa_index()
+            candidatas = self._candidatas(pesquisas)
+            for inicio in range(0, len(candidatas), max_concurrency):
+                lote = candidatas[inicio : inicio + max_concurrency]
+                agregados = await asyncio.gather(*(get(a) for a in lote))
+                for agregado in agregados:
+                    self.add_agregado(agregado)
+                n += len(lote)
+                faltando = self._pending(faltando)
+                if not faltando:
+                    break
+        self._not_found(faltando)
+        self.requests += n
+        return n
+
+    def variavel(self, variavel_id: int) -> InventarioVariavel:
+        """Return a variable, completing it first if needed.
+
+        It stays incomplete when no agregado of the catalog uses it.
+
+        Raises:
+            KeyError: If the variable is not in the inventory.
+        """
+        entrada = self.variaveis[variavel_id]
+        if not entrada.completo:
+            self.complete([(AcervoEnum.VARIAVEL, variavel_id)])
+        return entrada
+
+    def classificacao(self, classificacao_id: int) -> InventarioClassificacao:
+        """Return a classification, completing it first if needed.
+
+        It stays incomplete when no agregado of the catalog uses it.
+
+        Raises:
+            KeyError: If the classification is not in the inventory.
+        """
+        entrada = self.classificacoes[classificacao_id]
+        if not entrada.completo:
+            self.complete([(AcervoEnum.CLASSIFICACAO, classificacao_id)])
+        return entrada
@@ -0,0 +1,391 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Resumable extraction jobs backed by a SQLite work list.
+
+A large extraction (every municipality × period × category of a table)
+is split into many small SIDRA ``/values`` requests with
+:func:`split_parametro`. :class:`ExtractionJob` stores them in a SQLite
+database as tasks with a state, an attempt count and the time of the
+next attempt, then downloads them one partition file each with the
+clients' ``download_values``.
+
+Every state change is committed before moving on, so a job killed at
+any point resumes where it stopped: tasks left ``running`` by a crash go
+back to ``pending`` when the database is reopened, planning the same
+request twice does not duplicate tasks, and output files that already
+exist are not downloaded again. Failed tasks are retried with
+exponential backoff until ``max_attempts``.
+
+Typical usage::
+
+    with ExtractionJob("pam.db") as job, SidraClient() as client:
+        job.plan(parametro, "pam/", agregado=agregado, format="json.gz")
+        job.run(client)
+"""
+
+import asyncio
+import re
+import sqlite3
+import time
+from enum import StrEnum
+from pathlib import Path
+from typing import Any
+
+from . import logger
+from .agregados import Agregado
+from .download import FORMATS, Format
+from .sidra import Parametro
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    format TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, next_attempt);
+"""
+
+_PERIODO_RE = re.compile(r"\d+")
+_RANGE_RE = re.compile(r"(\d+)-(\d+)")
+
+
+class TaskState(StrEnum):
+    """State of a task of an :class:`ExtractionJob`."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+def _chunks(items: list[str], size: int) -> list[list[str]]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _resolve_periodos(
+    periodos: list[str],
+    agregado: Agregado | None,
+) -> list[str] | None:
+    """Expand ``periodos`` to explicit ids, or ``None`` if impossible."""
+    ids = [p.id for p in agregado.periodos] if agregado else []
+    if not periodos or periodos == ["all"]:
+        return ids or None
+    resolved = []
+    for periodo in periodos:
+        if _PERIODO_RE.fullmatch(periodo):
+            resolved.append(periodo)
+        elif (match := _RANGE_RE.fullmatch(periodo)) and ids:
+            inicio, fim = match.groups()
+            resolved.extend(i for i in ids if inicio <= i <= fim)
+        elif _RANGE_RE.fullmatch(periodo):
+            resolved.append(periodo)
+        else:
+            return None
+    return resolved
+
+
+def _resolve_localidades(
+    nivel: str,
+    localidades: list[str],
+    agregado: Agregado | None,
+) -> list[str]:
+    if localidades and localidades != ["all"]:
+        # Including selections by parent, like "in%20n3%2033,35"
+        return localidades
+    if agregado is not None:
+        ids = [
+            loc.id
+            for loc in agregado.localidades
+            if loc.nivel.id == f"N{nivel}"
+        ]
+        if ids:
+            return ids
+    return ["all"]
+
+
+def split_parametro(
+    parametro: Parametro,
+    agregado: Agregado | None = None,
+    periodos_por_tarefa: int = 1,
+    localidades_por_tarefa: int | None = None,
+) -> list[tuple[str, Parametro]]:
+    """Split a SIDRA request into smaller requests.
+
+    Periods are split into groups of ``periodos_por_tarefa``. With
+    ``localidades_por_tarefa``, each territorial level is requested
+    separately, in groups of that many localities. ``"all"`` and period
+    ranges are expanded with the periods and localities of ``agregado``
+    when given; otherwise they are kept as a single group.
+
+    Returns:
+        ``(partition, parametro)`` pairs, where ``partition`` is a
+        relative path naming the slice, like ``"periodo=202001/n6-00002"``.
+    """
+    periodos = _resolve_periodos(parametro.periodos, agregado)
+    if periodos is None:
+        grupos_periodos = [(None, parametro.periodos)]
+    else:
+        grupos_periodos = [
+            (chunk[0] if len(chunk) == 1 else f"{chunk[0]}_{chunk[-1]}", chunk)
+            for chunk in _chunks(periodos, periodos_por_tarefa)
+        ]
+
+    if localidades_por_tarefa is None:
+        grupos_territorios = [("part", parametro.territorios)]
+    else:
+        grupos_territorios = []
+        for nivel, localidades in parametro.territorios.items():
+            ids = _resolve_localidades(nivel, localidades, agregado)
+            for i, chunk in enumerate(_chunks(ids, localidades_por_tarefa)):
+                nome = f"n{nivel}-{i:05d}"
+                grupos_territorios.append((nome, {nivel: chunk}))
+
+    partes = []
+    for nome_periodo, periodos_grupo in grupos_periodos:
+        p = parametro.assign("periodos", periodos_grupo)
+        for nome_territorio, territorios in grupos_territorios:
+            nome = nome_territorio
+            if nome_periodo is not None:
+                nome = f"periodo={nome_periodo}/{nome}"
+            partes.append((nome, p.assign("territorios", territorios)))
+    return partes
+
+
+class ExtractionJob:
+    """Durable work list of SIDRA sub-requests stored in SQLite.
+
+    Args:
+        path: Path of the SQLite database, created if missing.
+        max_attempts: Attempts before a task is marked ``failed``.
+        backoff: Delay in seconds before the first retry of a task,
+            doubled on each further attempt.
+        max_backoff: Upper bound of the retry delay in seconds.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_attempts: int = 5,
+        backoff: float = 30.0,
+        max_backoff: float = 3600.0,
+    ) -> None:
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.db = sqlite3.connect(self.path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        # Tasks left running belong to a process that died
+        n = self.db.execute(
+            "UPDATE tasks SET state = ? WHERE state = ?",
+            (TaskState.PENDING, TaskState.RUNNING),
+        ).rowcount
+        self.db.commit()
+        if n:
+            logger.info(f"Resuming {n} interrupted tasks of {self.path}")
+
+    def plan(
+        self,
+        parametro: Parametro,
+        dest: str | Path,
+        agregado: Agregado | None = None,
+        format: Format = "json",
+        periodos_por_tarefa: int = 1,
+        localidades_por_tarefa: int | None = None,
+    ) -> int:
+        """Add the tasks needed to download ``parametro`` into ``dest``.
+
+        ``parametro`` is split with :func:`split_parametro` and each part
+        is written to ``dest/<partition>.<format>``. Tasks already in the
+        job are left untouched, so planning again is harmless.
+
+        Returns:
+            The number of new tasks.
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Invalid format {format!r}, use {FORMATS}")
+        dest = Path(dest)
+        pending = TaskState.PENDING.value
+        partes = split_parametro(
+            parametro, agregado, periodos_por_tarefa, localidades_por_tarefa
+        )
+        with self.db:
+            cursor = self.db.executemany(
+                "INSERT OR IGNORE INTO tasks (url, path, format, state)"
+                " VALUES (?, ?, ?, ?)",
+                [
+                    (p.url(), str(dest / f"{nome}.{format}"), format, pending)
+                    for nome, p in partes
+                ],
+            )
+        return cursor.rowcount
+
+    def progress(self) -> dict[str, int]:
+        """Return the number of tasks in each :class:`TaskState`."""
+        counts = {state.value: 0 for state in TaskState}
+        for row in self.db.execute(
+            "SELECT state, COUNT(*) FROM tasks GROUP BY state"
+        ):
+            counts[row[0]] = row[1]
+        return counts
+
+    def failed(self) -> list[dict[str, Any]]:
+        """Return the tasks that exhausted their attempts."""
+        return [
+            dict(row)
+            for row in self.db.execute(
+                "SELECT * FROM tasks WHERE state = ? ORDER BY id",
+                (TaskState.FAILED,),
+            )
+        ]
+
+    def retry_failed(self) -> int:
+        """Put failed tasks back in the queue with a fresh attempt count."""
+        with self.db:
+            return self.db.execute(
+                "UPDATE tasks SET state = ?, attempts = 0, next_attempt = 0"
+                " WHERE state = ?",
+                (TaskState.PENDING, TaskState.FAILED),
+            ).rowcount
+
+    def _claim(self) -> sqlite3.Row | None:
+        """Mark the next due pending task as running and return it."""
+        with self.db:
+            task = self.db.execute(
+                "SELECT * FROM tasks WHERE state = ? AND next_attempt <= ?"
+                " ORDER BY id LIMIT 1",
+                (TaskState.PENDING, time.time()),
+            ).fetchone()
+            if task is not None:
+                self.db.execute(
+                    "UPDATE tasks SET state = ? WHERE id = ?",
+                    (TaskState.RUNNING, task["id"]),
+                )
+        return task
+
+    def _wait(self) -> float | None:
+        """Return seconds until a pending task is due, ``None`` if none."""
+        (next_attempt,) = self.db.execute(
+            "SELECT MIN(next_attempt) FROM tasks WHERE state = ?",
+            (TaskState.PENDING,),
+        ).fetchone()
+        if next_attempt is None:
+            return None
+        return max(next_attempt - time.time(), 0.0)
+
+    def _finish(
+        self, task: sqlite3.Row, error: BaseException | None = None
+    ) -> None:
+        if error is None:
+            with self.db:
+                self.db.execute(
+                    "UPDATE tasks SET state = ?, error = NULL WHERE id = ?",
+                    (TaskState.DONE, task["id"]),
+                )
+            return
+        attempts = task["attempts"] + 1
+        if attempts >= self.max_attempts:
+            state = TaskState.FAILED
+            logger.error(f"Giving up {task['url']}: {error!r}")
+        else:
+            state = TaskState.PENDING
+            logger.warning(f"Attempt {attempts} of {task['url']}: {error!r}")
+        delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+        with self.db:
+            self.db.execute(
+                "UPDATE tasks SET state = ?, attempts = ?, next_attempt = ?,"
+                " error = ? WHERE id = ?",
+                (
+                    state,
+                    attempts,
+                    time.time() + delay,
+                    repr(error),
+                    task["id"],
+                ),
+            )
+
+    def run(self, client: Any) -> dict[str, int]:
+        """Run the pending tasks with a :class:`SidraClient`.
+
+        Returns when every task is done or failed, sleeping while the
+        remaining tasks wait for their backoff.
+
+        Returns:
+            The final :meth:`progress`.
+        """
+        while True:
+            task = self._claim()
+            if task is None:
+                wait = self._wait()
+                if wait is None:
+                    return self.progress()
+                time.sleep(wait)
+                continue
+            try:
+                client.download_values(
+                    task["url"], task["path"], task["format"]
+                )
+            except Exception as e:
+                self._finish(task, e)
+            else:
+                self._finish(task)
+
+    async def run_async(
+        self, client: Any, max_concurrency: int = 4
+    ) -> dict[str, int]:
+        """Run the pending tasks with an :class:`AsyncSidraClient`.
+
+        Async counterpart of :meth:`run` downloading at most
+        ``max_concurrency`` tasks at a time.
+        """
+
+        async def worker() -> None:
+            while True:
+                task = self._claim()
+                if task is None:
+                    wait = self._wait()
+                    if wait is None:
+                        return
+                    await asyncio.sleep(wait)
+                    continue
+                try:
+                    await client.download_values(
+                        task["url"], task["path"], task["format"]
+                    )
+                except Exception as e:
+                    self._finish(task, e)
+                else:
+                    self._finish(task)
+
+        await asyncio.gather(*(worker() for _ in range(max_concurrency)))
+        return self.progress()
+
+    def close(self) -> None:
+        """Close the database."""
+        self.db.close()
+
+    def __enter__(self) -> "ExtractionJob":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,459 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Local fake of the IBGE agregados and SIDRA APIs for offline testing.
+
+:class:`MockIBGE` answers the same paths as the real services
+(``/api/v3/agregados``, ``.../metadados``, ``.../periodos``,
+``.../localidades/{niveis}``, ``?acervo=`` and SIDRA ``/values``) with
+deterministic synthetic payloads whose sizes are set by
+:class:`MockConfig`. It can also inject latency, random server errors
+and ``429`` throttling so the clients can be load tested offline.
+
+The application can be used in-process through an ``httpx`` transport
+or served over a real socket by :class:`MockIBGEServer`::
+
+    >>> app = MockIBGE(MockConfig(latency=0.05, error_rate=0.01))
+    >>> client = SidraClient(transport=app.transport())
+    >>> with MockIBGEServer(app) as server:
+    ...     client = SidraClient(transport=server.transport())
+"""
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from . import logger
+
+NIVEIS: dict[str, tuple[str, int]] = {
+    "N1": ("Brasil", 1),
+    "N2": ("Grande Região", 5),
+    "N3": ("Unidade da Federação", 27),
+    "N6": ("Município", 5570),
+    "N7": ("Região Metropolitana", 80),
+    "N8": ("Mesorregião Geográfica", 137),
+    "N9": ("Microrregião Geográfica", 558),
+    "N13": ("Região Metropolitana e Subdivisão", 100),
+    "N14": ("Região Integrada de Desenvolvimento", 3),
+    "N15": ("Aglomeração Urbana", 22),
+}
+
+
+@dataclass
+class MockConfig:
+    """Behaviour and payload sizes of the fake IBGE service.
+
+    Attributes:
+        latency: Fixed delay, in seconds, added to every response.
+        jitter: Upper bound of an extra uniformly random delay.
+        error_rate: Fraction of requests answered with ``503``.
+        throttle_rps: Sustained requests per second allowed before
+            answering ``429``; ``None`` disables throttling.
+        throttle_burst: Bucket size of the throttling token bucket.
+        niveis: Territorial levels declared by every agregado.
+        n_agregados: Agregados listed in the index.
+        n_variaveis: Variables per agregado.
+        n_classificacoes: Classifications per agregado.
+        n_categorias: Categories per classification.
+        n_periodos: Periods per agregado.
+        n_localidades: Per-level override of the number of localidades.
+        values_rows: Rows returned by SIDRA ``/values``.
+        seed: Seed of the random generator used for faults.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    throttle_rps: float | None = None
+    throttle_burst: int = 10
+    niveis: list[str] = field(default_factory=lambda: ["N1", "N2", "N3"])
+    n_agregados: int = 20
+    n_variaveis: int = 5
+    n_classificacoes: int = 2
+    n_categorias: int = 20
+    n_periodos: int = 300
+    n_localidades: dict[str, int] = field(default_factory=dict)
+    values_rows: int = 1000
+    seed: int = 0
+
+
+# -----------------------------------------------------------------------------
+# PAYLOADS ====================================================================
+# _____________________________________________________________________________
+def build_indice(n_agregados: int, per_pesquisa: int = 5) -> list[dict]:
+    """Return an agregados index payload grouped in pesquisas."""
+    return [
+        {
+            "id": f"P{p}",
+            "nome": f"Pesquisa sintética {p}",
+            "agregados": [
+                {"id": i, "nome": f"Agregado sintético {i}"}
+                for i in range(
+                    1000 + p * per_pesquisa,
+                    1000 + min((p + 1) * per_pesquisa, n_agregados),
+                )
+            ],
+        }
+        for p in range((n_agregados + per_pesquisa - 1) // per_pesquisa)
+    ]
+
+
+def build_metadados(
+    agregado_id: int,
+    niveis: list[str],
+    n_variaveis: int = 5,
+    n_classificacoes: int = 2,
+    n_categorias: int = 20,
+) -> dict:
+    """Return an agregado metadados payload."""
+    return {
+        "id": agregado_id,
+        "nome": f"Agregado sintético {agregado_id}",
+        "URL": f"https://sidra.ibge.gov.br/tabela/{agregado_id}",
+        "pesquisa": "Pesquisa sintética",
+        "assunto": "Benchmark",
+        "periodicidade": {
+            "frequencia": "mensal",
+            "inicio": "200001",
+            "fim": "202412",
+        },
+        "nivelTerritorial": {
+            "Administrativo": niveis,
+            "Especial": [],
+            "IBGE": [],
+        },
+        "variaveis": [
+            {
+                "id": 1000 + v,
+                "nome": f"Variável {v}",
+                "unidade": "Unidades",
+                "sumarizacao": ["nivelTerritorial"],
+            }
+            for v in range(n_variaveis)
+        ],
+        "classificacoes": [
+            {
+                "id": 100 + c,
+                "nome": f"Classificação {c}",
+                "sumarizacao": {"status": True, "excecao": []},
+                "categorias": [
+                    {
+                        "id": 10000 * (c + 1) + k,
+                        "nome": f"Categoria {c}.{k}",
+                        "unidade": None,
+                        "nivel": 0 if k == 0 else 1,
+                    }
+                    for k in range(n_categorias)
+                ],
+            }
+            for c in range(n_classificacoes)
+        ],
+    }
+
+
+def build_periodos(n: int = 300) -> list[dict]:
+    """Return a periodos payload with ``n`` monthly periods."""
+    return [
+        {
+            "id": f"{2000 + i // 12}{i % 12 + 1:02d}",
+            "literals": [f"{i % 12 + 1:02d}/{2000 + i // 12}"],
+            "modificacao": "15/01/2025",
+        }
+        for i in range(n)
+    ]
+
+
+def build_localidades(nivel: str, n: int | None = None) -> list[dict]:
+    """Return the localidades payload for one territorial level."""
+    nome, default = NIVEIS.get(nivel, (f"Nível {nivel}", 10))
+    return [
+        {
+            "id": str(i + 1),
+            "nome": f"{nome} {i + 1}",
+            "nivel": {"id": nivel, "nome": nome},
+        }
+        for i in range(default if n is None else n)
+    ]
+
+
+def build_acervo(n: int = 50) -> list[dict]:
+    """Return an acervo listing payload."""
+    return [{"id": str(i), "literals": [f"Item {i}"]} for i in range(n)]
+
+
+def build_values(n_rows: int) -> list[dict]:
+    """Return a SIDRA ``/values`` payload with a header and ``n_rows``."""
+    header = {
+        "NC": "Nível Territorial (Código)",
+        "NN": "Nível Territorial",
+        "MC": "Unidade de Medida (Código)",
+        "MN": "Unidade de Medida",
+        "V": "Valor",
+        "D1C": "Município (Código)",
+        "D1N": "Município",
+        "D2C": "Variável (Código)",
+        "D2N": "Variável",
+        "D3C": "Mês (Código)",
+        "D3N": "Mês",
+    }
+    rows = [header]
+    for i in range(n_rows):
+        rows.append(
+            {
+                "NC": "6",
+                "NN": "Município",
+                "MC": "45",
+                "MN": "Unidades",
+                "V": "-" if i % 97 == 0 else f"{i * 1.25:.2f}",
+                "D1C": str(1100015 + i % 5570),
+                "D1N": f"Município {i % 5570}",
+                "D2C": "1000",
+                "D2N": "Variável 0",
+                "D3C": "202401",
+                "D3N": "janeiro 2024",
+            }
+        )
+    return rows
+
+
+def values_rows_for_size(n_bytes: int) -> int:
+    """Return how many ``/values`` rows encode to roughly ``n_bytes``."""
+    row_size = len(json.dumps(build_values(1)[1]).encode("utf-8")) + 2
+    return max(n_bytes // row_size, 1)
+
+
+# -----------------------------------------------------------------------------
+# APPLICATION =================================================================
+# _____________________________________________________________________________
+_METADADOS_RE = re.compile(r"/api/v3/agregados/(\d+)/metadados/?$")
+_PERIODOS_RE = re.compile(r"/api/v3/agregados/(\d+)/periodos/?$")
+_LOCALIDADES_RE = re.compile(r"/api/v3/agregados/(\d+)/localidades/([^/]+)$")
+_AGREGADOS_RE = re.compile(r"/api/v3/agregados/?$")
+_VALUES_RE = re.compile(r"/values(/|$)")
+
+
+class MockIBGE:
+    """Routing, payload generation and fault injection of the fake API.
+
+    The object is thread-safe; the same instance can back several
+    transports and a :class:`MockIBGEServer` at once. :attr:`requests`
+    counts the requests received per endpoint.
+    """
+
+    def __init__(self, config: MockConfig | None = None) -> None:
+        self.config = config or MockConfig()
+        self.requests: Counter[str] = Counter()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._tokens = float(self.config.throttle_burst)
+        self._last_refill = time.monotonic()
+
+    def delay(self) -> float:
+        """Return the latency to apply to the next response."""
+        if self.config.jitter <= 0:
+            return self.config.latency
+        with self._lock:
+            return self.config.latency + self._rng.uniform(
+                0, self.config.jitter
+            )
+
+    def _throttled(self) -> bool:
+        rps = self.config.throttle_rps
+        if rps is None:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                float(self.config.throttle_burst),
+                self._tokens + (now - self._last_refill) * rps,
+            )
+            self._last_refill = now
+            if self._tokens < 1:
+                return True
+            self._tokens -= 1
+            return False
+
+    def _failed(self) -> bool:
+        if self.config.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.config.error_rate
+
+    def route(self, path: str, query: str = "") -> tuple[str, Any]:
+        """Return ``(endpoint, payload)`` for a request path.
+
+        ``payload`` is ``None`` when the path is not served.
+        """
+        cfg = self.config
+        if m := _METADADOS_RE.search(path):
+            return "metadados", build_metadados(
+                int(m.group(1)),
+                cfg.niveis,
+                cfg.n_variaveis,
+                cfg.n_classificacoes,
+                cfg.n_categorias,
+            )
+        if _PERIODOS_RE.search(path):
+            return "periodos", build_periodos(cfg.n_periodos)
+        if m := _LOCALIDADES_RE.search(path):
+            niveis = m.group(2).split("|")
+            return "localidades", [
+                loc
+                for nivel in niveis
+                for loc in build_localidades(
+                    nivel, cfg.n_localidades.get(nivel)
+                )
+            ]
+        if _AGREGADOS_RE.search(path):
+            if "acervo" in parse_qs(query):
+                return "acervo", build_acervo()
+            return "agregados", build_indice(cfg.n_agregados)
+        if _VALUES_RE.search(path):
+            return "values", build_values(cfg.values_rows)
+        return "unknown", None
+
+    def respond(self, url: str) -> tuple[int, dict[str, str], bytes]:
+        """Return ``(status, headers, body)`` for a GET on ``url``.
+
+        Latency is not applied here so that synchronous and asynchronous
+        front-ends can each wait in their own way (see :meth:`delay`).
+        """
+        parts = urlsplit(url)
+        endpoint, payload = self.route(parts.path, parts.query)
+        with self._lock:
+            self.requests[endpoint] += 1
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        if self._throttled():
+            return 429, headers | {"Retry-After": "1"}, b'{"erro": 429}'
+        if self._failed():
+            return 503, headers, b'{"erro": 503}'
+        if payload is None:
+            return 404, headers, b'{"erro": 404}'
+        return 200, headers, json.dumps(payload).encode("utf-8")
+
+    def transport(self) -> Any:
+        """Return an in-process ``httpx`` transport backed by this app."""
+        import httpx
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            time.sleep(self.delay())
+            status, headers, body = self.respond(str(request.url))
+            return httpx.Response(status, headers=headers, content=body)
+
+        return httpx.MockTransport(handler)
+
+    def async_transport(self) -> Any:
+        """Return an in-process async ``httpx`` transport for this app."""
+        import httpx
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(self.delay())
+            status, headers, body = self.respond(str(request.url))
+            return httpx.Response(status, headers=headers, content=body)
+
+        return httpx.MockTransport(handler)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def do_GET(self) -> None:
+        app = self.server.app
+        time.sleep(app.delay())
+        status, headers, body = app.respond(self.path)
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("MockIBGEServer " + format % args)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], app: MockIBGE) -> None:
+        super().__init__(address, _Handler)
+        self.app = app
+
+
+class MockIBGEServer:
+    """Serve a :class:`MockIBGE` on a local socket in a background thread.
+
+    Use as a context manager; the server listens on an ephemeral port
+    of ``127.0.0.1`` unless ``port`` is given.
+    """
+
+    def __init__(
+        self,
+        app: MockIBGE | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.app = app or MockIBGE()
+        self._server = _Server((host, port), self.app)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """Root URL of the running server, e.g. ``http://127.0.0.1:8000``."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockIBGEServer":
+        """Start serving in a daemon thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        logger.info(f"MockIBGEServer listening on {self.base_url}")
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and wait for the serving thread."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        logger.info("MockIBGEServer stopped.")
+
+    def transport(self) -> Any:
+        """Return an ``httpx`` transport redirecting IBGE hosts here."""
+        from .replay import RedirectTransport
+
+        return RedirectTransport(self.base_url)
+
+    def async_transport(self) -> Any:
+        """Return an async ``httpx`` transport redirecting IBGE hosts here."""
+        from .replay import AsyncRedirectTransport
+
+        return AsyncRedirectTransport(self.base_url)
+
+    def __enter__(self) -> "MockIBGEServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
@@ -0,0 +1,140 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Lookup of the pesquisa of each agregado.
+
+The metadados of an agregado only name its pesquisa, so
+:class:`~sidra_fetcher.agregados.Pesquisa` objects read from them have
+an empty ``id``. The agregados index lists every pesquisa with its
+agregados; :class:`PesquisaIndex` inverts it once into a dictionary::
+
+    pesquisas = PesquisaIndex(client.get_indice_pesquisas_agregados())
+    pesquisas[1705]                       # Pesquisa(id="XX", nome=...)
+    agregado = pesquisas.fill(agregado)
+
+The clients keep the index of their last unfiltered
+``get_indice_pesquisas_agregados`` call, or one passed as ``pesquisas``,
+and fill the pesquisa of the metadados they read with it.
+"""
+
+import json
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from .agregados import Agregado, IndicePesquisaAgregados, Pesquisa
+
+
+class PesquisaIndex:
+    """Pesquisa of each agregado id.
+
+    Each pesquisa is stored once and shared by the entries of its
+    agregados.
+
+    Args:
+        indice: :class:`~sidra_fetcher.agregados.IndicePesquisaAgregados`
+            objects or the raw agregados index payload.
+
+    Attributes:
+        pesquisas: The pesquisas, in the order of the index.
+    """
+
+    def __init__(
+        self, indice: Iterable[IndicePesquisaAgregados | dict[str, Any]]
+    ) -> None:
+        self.pesquisas: list[Pesquisa] = []
+        self._agregados: list[list[int]] = []
+        self._posicao: dict[int, int] = {}
+        self._pesquisa: dict[str, int] = {}
+        for item in indice:
+            if isinstance(item, dict):
+                pesquisa = Pesquisa(id=item["id"], nome=item["nome"])
+                ids = [int(a["id"]) for a in item["agregados"]]
+            else:
+                pesquisa = Pesquisa(id=item.id, nome=item.nome)
+                ids = [int(a.id) for a in item.agregados]
+            posicao = len(self.pesquisas)
+            self.pesquisas.append(pesquisa)
+            self._agregados.append(ids)
+            self._pesquisa[pesquisa.id] = posicao
+            for agregado_id in ids:
+                self._posicao[agregado_id] = posicao
+
+    @classmethod
+    def load(cls, path: Path | str) -> "PesquisaIndex":
+        """Load an index saved with :meth:`save`."""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def save(self, path: Path | str) -> None:
+        """Save the index as an agregados index payload.
+
+        The agregados are saved by id only, without their names.
+        """
+        data = [
+            {
+                "id": pesquisa.id,
+                "nome": pesquisa.nome,
+                "agregados": [{"id": i} for i in ids],
+            }
+            for pesquisa, ids in zip(self.pesquisas, self._agregados)
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def __len__(self) -> int:
+        return len(self._posicao)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._posicao)
+
+    def __contains__(self, agregado_id: int) -> bool:
+        return agregado_id in self._posicao
+
+    def __getitem__(self, agregado_id: int) -> Pesquisa:
+        """Return the pesquisa of an agregado.
+
+        Raises:
+            KeyError: If the agregado is not in the index.
+        """
+        return self.pesquisas[self._posicao[agregado_id]]
+
+    def get(self, agregado_id: int) -> Pesquisa | None:
+        """Return the pesquisa of an agregado, if indexed."""
+        posicao = self._posicao.get(agregado_id)
+        return None if posicao is None else self.pesquisas[posicao]
+
+    def agregados(self, pesquisa_id: str) -> list[int]:
+        """Return the ids of the agregados of a pesquisa.
+
+        Raises:
+            KeyError: If the pesquisa is not in the index.
+        """
+        return list(self._agregados[self._pesquisa[pesquisa_id]])
+
+    def fill(self, agregado: Agregado) -> Agregado:
+        """Return ``agregado`` with its pesquisa from the index.
+
+        ``agregado`` itself is not changed, as it may be shared by a
+        cache.
+
+        Returns:
+            A copy with the pesquisa of the index, or the same agregado
+            if it is missing from the index.
+        """
+        pesquisa = self.get(agregado.id)
+        if pesquisa is None:
+            return agregado
+        return replace(agregado, pesquisa=pesquisa)
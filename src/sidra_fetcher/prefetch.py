@@ -0,0 +1,279 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Predictive prefetching of agregados into the client cache.
+
+Users browsing agregados tend to open them in predictable sequences,
+mostly siblings of the same pesquisa. A :class:`Prefetcher` attached to
+a client with an :class:`~sidra_fetcher.cache.ObjectCache` watches which
+agregados are opened and loads the most likely next ones into the cache
+in the background, so that opening them is a cache hit::
+
+    client = SidraClient(cache=ObjectCache())
+    prefetcher = Prefetcher(client, client.get_indice_pesquisas_agregados())
+    client.get_agregado(1705)   # Starts prefetching 1712, 1719, ...
+
+The likelihood of ``b`` following ``a`` is the number of times ``b`` was
+opened right after ``a``, plus a prior for the siblings of ``a`` in the
+pesquisa index: ``prior_weight / distance`` between their positions in
+the pesquisa.
+
+Prefetching never competes with the requests of the user: it only runs
+once the client had no request in flight for ``idle_delay`` seconds, and
+stops once the prefetched responses reach ``budget_bytes`` within the
+last ``window`` seconds. With :class:`~sidra_fetcher.fetcher.SidraClient`
+it runs in a daemon thread, with
+:class:`~sidra_fetcher.fetcher.AsyncSidraClient` in a task of the event
+loop.
+"""
+
+import asyncio
+import inspect
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+from typing import Any, Callable
+
+from . import logger
+from .agregados import IndicePesquisaAgregados
+from .instrumentation import Event, EventType
+
+# Set while prefetching, to tell the prefetcher's requests from the user's
+_PREFETCHING: ContextVar[bool] = ContextVar(
+    "sidra_fetcher_prefetching", default=False
+)
+
+
+class Prefetcher:
+    """Warm the cache of a client with the agregados likely opened next.
+
+    The prefetcher registers itself as an instrumentation hook of
+    ``client`` and follows the ``metadados`` cache lookups, which every
+    ``get_agregado`` call makes.
+
+    Args:
+        client: A :class:`~sidra_fetcher.fetcher.SidraClient` or
+            :class:`~sidra_fetcher.fetcher.AsyncSidraClient` with a cache.
+        indice: Pesquisa index used as a prior, as returned by
+            ``get_indice_pesquisas_agregados``.
+        max_prefetch: Agregados prefetched after each access.
+        budget_bytes: Maximum bytes downloaded by prefetching per
+            ``window``.
+        window: Seconds of the bandwidth budget window.
+        idle_delay: Seconds without requests of the user after which the
+            client is idle.
+        prior_weight: Weight of the pesquisa prior against one observed
+            transition.
+        clock: Monotonic time source, replaceable in tests.
+
+    Raises:
+        ValueError: If the client has no cache to warm.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        indice: list[IndicePesquisaAgregados] | None = None,
+        max_prefetch: int = 3,
+        budget_bytes: int = 64 * 2**20,
+        window: float = 60.0,
+        idle_delay: float = 0.5,
+        prior_weight: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if client.cache is None:
+            raise ValueError("Prefetching needs a client with an ObjectCache")
+        self._client = client
+        self.max_prefetch = max_prefetch
+        self.budget_bytes = budget_bytes
+        self.window = window
+        self.idle_delay = idle_delay
+        self.prior_weight = prior_weight
+        self.clock = clock
+        self.prefetched = 0
+        self._async = inspect.iscoroutinefunction(client.get_agregado)
+        self._pesquisas: dict[int, tuple[int, list[int]]] = {}
+        self._transicoes: defaultdict[int, Counter[int]] = defaultdict(
+            Counter
+        )
+        self._anterior: int | None = None
+        self._fila: list[int] = []
+        self._gastos: deque[tuple[float, float]] = deque()
+        self._em_curso = 0
+        self._atividade = clock()
+        self._fechado = False
+        self._lock = threading.Condition()
+        self._worker: threading.Thread | asyncio.Task | None = None
+        if indice is not None:
+            self.set_indice(indice)
+        client.instrumentation.add_hook(self)
+
+    def set_indice(self, indice: list[IndicePesquisaAgregados]) -> None:
+        """Use the pesquisa index ``indice`` as the prior."""
+        pesquisas = {}
+        for pesquisa in indice:
+            ids = [agregado.id for agregado in pesquisa.agregados]
+            for posicao, agregado_id in enumerate(ids):
+                pesquisas[agregado_id] = (posicao, ids)
+        with self._lock:
+            self._pesquisas = pesquisas
+
+    def predict(self, agregado_id: int, n: int | None = None) -> list[int]:
+        """Return the ``n`` agregados most likely opened after this one."""
+        with self._lock:
+            scores = Counter(self._transicoes.get(agregado_id, {}))
+            pesquisa = self._pesquisas.get(agregado_id)
+        if pesquisa is not None:
+            posicao, ids = pesquisa
+            for i, irmao in enumerate(ids):
+                if irmao != agregado_id:
+                    scores[irmao] += self.prior_weight / abs(i - posicao)
+        scores.pop(agregado_id, None)
+        n = self.max_prefetch if n is None else n
+        return [irmao for irmao, _ in scores.most_common(n)]
+
+    def record(self, agregado_id: int) -> None:
+        """Record that ``agregado_id`` was opened and prefetch what follows.
+
+        Called by the hook; only needed to feed accesses the client did
+        not see.
+        """
+        with self._lock:
+            if self._anterior not in (None, agregado_id):
+                self._transicoes[self._anterior][agregado_id] += 1
+            self._anterior = agregado_id
+            self._atividade = self.clock()
+        candidatos = [
+            c for c in self.predict(agregado_id) if not self._cached(c)
+        ]
+        with self._lock:
+            # The latest prediction replaces the pending one
+            self._fila = candidatos
+            self._lock.notify_all()
+        if candidatos:
+            self._start()
+
+    def __call__(self, event: Event) -> None:
+        if _PREFETCHING.get():
+            if event.type is EventType.BYTES:
+                with self._lock:
+                    self._gastos.append((self.clock(), event.value))
+            return
+        if event.type is EventType.REQUEST_START:
+            with self._lock:
+                self._em_curso += 1
+                self._atividade = self.clock()
+        elif event.type is EventType.REQUEST_END:
+            with self._lock:
+                self._em_curso = max(self._em_curso - 1, 0)
+                self._atividade = self.clock()
+                self._lock.notify_all()
+        elif event.type in (EventType.CACHE_HIT, EventType.CACHE_MISS):
+            if event.endpoint == "metadados":
+                self.record(int(event.url.rsplit("/", 1)[1]))
+
+    def _cached(self, agregado_id: int) -> bool:
+        return ("metadados", agregado_id) in self._client.cache
+
+    def _idle_in(self) -> float:
+        """Seconds until the client is idle, ``0`` when it is."""
+        with self._lock:
+            if self._em_curso:
+                return self.idle_delay
+            return max(self._atividade + self.idle_delay - self.clock(), 0)
+
+    def _next(self) -> int | None:
+        """Pop the next agregado to prefetch, if the budget allows."""
+        with self._lock:
+            limite = self.clock() - self.window
+            while self._gastos and self._gastos[0][0] < limite:
+                self._gastos.popleft()
+            if sum(gasto for _, gasto in self._gastos) >= self.budget_bytes:
+                if self._fila:
+                    logger.debug("Prefetch budget exhausted")
+                self._fila.clear()
+                return None
+            while self._fila:
+                agregado_id = self._fila.pop(0)
+                if not self._cached(agregado_id):
+                    return agregado_id
+        return None
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._fechado:
+                return
+            if self._async:
+                if self._worker is None or self._worker.done():
+                    loop = asyncio.get_running_loop()
+                    self._worker = loop.create_task(self._run_async())
+            elif self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        _PREFETCHING.set(True)
+        while True:
+            with self._lock:
+                while not self._fila and not self._fechado:
+                    self._lock.wait()
+                if self._fechado:
+                    return
+            if (espera := self._idle_in()) > 0:
+                with self._lock:
+                    self._lock.wait(espera)
+                continue
+            agregado_id = self._next()
+            if agregado_id is None:
+                continue
+            try:
+                self._client.get_agregado(agregado_id)
+                self.prefetched += 1
+            except Exception:
+                logger.exception(f"Prefetch of agregado {agregado_id} failed")
+
+    async def _run_async(self) -> None:
+        _PREFETCHING.set(True)
+        while self._fila and not self._fechado:
+            if (espera := self._idle_in()) > 0:
+                await asyncio.sleep(espera)
+                continue
+            agregado_id = self._next()
+            if agregado_id is None:
+                continue
+            try:
+                await self._client.get_agregado(agregado_id)
+                self.prefetched += 1
+            except Exception:
+                logger.exception(f"Prefetch of agregado {agregado_id} failed")
+
+    def close(self) -> None:
+        """Stop prefetching and detach from the client."""
+        with self._lock:
+            self._fechado = True
+            self._fila.clear()
+            self._lock.notify_all()
+        hooks = self._client.instrumentation.hooks
+        if self in hooks:
+            hooks.remove(self)
+        if isinstance(self._worker, asyncio.Task):
+            self._worker.cancel()
+
+    def __enter__(self) -> "Prefetcher":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
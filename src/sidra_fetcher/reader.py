@@ -44,6 +44,7 @@ from pathlib import Path
 from typing import Any, Generator
 
 from .agregados import (
+    AcervoItem,
     Agregado,
     AgregadoNivelTerritorial,
     Categoria,
@@ -56,6 +57,7 @@ from .agregados import (
     Pesquisa,
     Variavel,
 )
+from .pesquisas import PesquisaIndex
 
 
 class DateEncoder(json.JSONEncoder):
@@ -337,7 +339,9 @@ def flatten_surveys_metadata(
     ]
 
 
-def read_metadados(data: dict[str, Any]) -> Agregado:
+def read_metadados(
+    data: dict[str, Any], pesquisas: PesquisaIndex | None = None
+) -> Agregado:
     """Parse raw aggregate metadata JSON into an Agregado dataclass instance.
 
     This function transforms the raw metadata dictionary returned by the IBGE
@@ -367,6 +371,8 @@ def read_metadados(data: dict[str, Any]) -> Agregado:
             - 'nivelTerritorial': Dict with 'Administrativo', 'Especial', 'IBGE' keys
             - 'variaveis': List of variable dicts
             - 'classificacoes': List of classification dicts
+        pesquisas: Index filling the survey id, which the metadata lacks.
+            Without it the id of the Pesquisa is an empty string.
 
     Returns:
         Agregado: A fully instantiated Agregado dataclass with typed nested structures.
@@ -427,6 +433,8 @@ def read_metadados(data: dict[str, Any]) -> Agregado:
         periodos=[],
         localidades=[],
     )
+    if pesquisas is not None:
+        agregado = pesquisas.fill(agregado)
     return agregado
 
 
@@ -476,6 +484,22 @@ def read_periodos(data: list[dict[str, Any]]) -> list[Periodo]:
     ]
 
 
+def read_acervo(data: list[dict[str, Any]]) -> list[AcervoItem]:
+    """Parse an acervo listing, as returned by ``get_acervo``.
+
+    Args:
+        data: A list of item dictionaries, each with an ``'id'`` and a
+            list of names under ``'literals'``.
+
+    Returns:
+        list[AcervoItem]: The items, with their ids as strings.
+    """
+    return [
+        AcervoItem(id=str(item["id"]), literals=list(item["literals"]))
+        for item in data
+    ]
+
+
 def read_localidades(data: list[dict[str, Any]]) -> list[Localidade]:
     """Parse raw localities data into a list of Localidade dataclass instances.
 
@@ -553,7 +577,21 @@ def load_agregado(path: str | Path) -> Agregado:
     """
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
+    return agregado_from_dict(data)
+
+
+def agregado_from_dict(data: dict[str, Any]) -> Agregado:
+    """Build an Agregado instance from its :meth:`Agregado.asdict` form.
+
+    Dates may be :class:`datetime.date` objects or ISO 8601 strings, as
+    written by :func:`save_agregado`.
 
+    Args:
+        data: Dictionary with the fields of an Agregado.
+
+    Returns:
+        The Agregado instance.
+    """
     nivel_territorial = AgregadoNivelTerritorial(**data["nivel_territorial"])
     pesquisa = Pesquisa(**data["pesquisa"])
     periodicidade = Periodicidade(**data["periodicidade"])
@@ -575,12 +613,13 @@ def load_agregado(path: str | Path) -> Agregado:
 
     periodos = []
     for p in data.get("periodos", []):
-        modificacao_str = p["modificacao"]
-        try:
-            modificacao = dt.date.fromisoformat(modificacao_str)
-        except ValueError:
-            modificacao = dt.datetime.strptime(modificacao_str, "%d/%m/%Y")
-            modificacao = modificacao.date()
+        modificacao = p["modificacao"]
+        if isinstance(modificacao, str):
+            try:
+                modificacao = dt.date.fromisoformat(modificacao)
+            except ValueError:
+                modificacao = dt.datetime.strptime(modificacao, "%d/%m/%Y")
+                modificacao = modificacao.date()
         periodos.append(
             Periodo(
                 id=p["id"],
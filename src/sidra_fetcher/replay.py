@@ -0,0 +1,222 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""``httpx`` transports to record, replay and redirect IBGE traffic.
+
+:class:`RecordReplayTransport` stores every response it sees as a JSON
+fixture named after the request, and serves those fixtures back without
+touching the network. Together with :class:`RedirectTransport`, which
+sends requests for the IBGE hosts to a local
+:class:`~sidra_fetcher.mock.MockIBGEServer`, it lets the clients be
+exercised deterministically in CI::
+
+    >>> transport = RecordReplayTransport("fixtures", mode="record")
+    >>> with SidraClient(transport=transport) as client:
+    ...     client.get_agregado(1705)  # hits the API, writes fixtures
+    >>> transport = RecordReplayTransport("fixtures")
+    >>> with SidraClient(transport=transport) as client:
+    ...     client.get_agregado(1705)  # served from disk
+"""
+
+import base64
+import hashlib
+import json
+from pathlib import Path
+from typing import Literal
+
+import httpx
+
+from . import logger
+
+Mode = Literal["record", "replay", "auto"]
+
+
+def fixture_name(method: str, url: str) -> str:
+    """Return the fixture file name used for a request."""
+    key = f"{method} {url}".encode("utf-8")
+    return hashlib.sha1(key).hexdigest() + ".json"
+
+
+def _dump(method: str, url: str, response: httpx.Response) -> dict:
+    content = response.content
+    try:
+        body, encoding = content.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        body, encoding = base64.b64encode(content).decode("ascii"), "base64"
+    headers = {
+        k: v
+        for k, v in response.headers.items()
+        if k.lower() not in ("content-encoding", "content-length")
+    }
+    return {
+        "method": method,
+        "url": url,
+        "status": response.status_code,
+        "headers": headers,
+        "encoding": encoding,
+        "body": body,
+    }
+
+
+def _load(fixture: dict, request: httpx.Request) -> httpx.Response:
+    if fixture["encoding"] == "base64":
+        content = base64.b64decode(fixture["body"])
+    else:
+        content = fixture["body"].encode("utf-8")
+    return httpx.Response(
+        fixture["status"],
+        headers=fixture["headers"],
+        content=content,
+        request=request,
+    )
+
+
+class _FixtureStore:
+    def __init__(self, directory: str | Path, mode: Mode) -> None:
+        if mode not in ("record", "replay", "auto"):
+            raise ValueError(f"Invalid mode {mode!r}")
+        self.directory = Path(directory)
+        self.mode = mode
+
+    def path(self, request: httpx.Request) -> Path:
+        name = fixture_name(request.method, str(request.url))
+        return self.directory / name
+
+    def lookup(self, request: httpx.Request) -> httpx.Response | None:
+        path = self.path(request)
+        if self.mode == "record" or not path.exists():
+            if self.mode == "replay":
+                raise FileNotFoundError(
+                    f"No recorded fixture for {request.method} {request.url}"
+                )
+            return None
+        logger.debug(f"Replaying {request.url} from {path}")
+        with open(path, "r", encoding="utf-8") as f:
+            return _load(json.load(f), request)
+
+    def save(
+        self,
+        request: httpx.Request,
+        url: str,
+        response: httpx.Response,
+    ) -> dict:
+        # Forwarding transports may rewrite the request, so the fixture
+        # is keyed by the URL taken before the request was sent.
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / fixture_name(request.method, url)
+        logger.debug(f"Recording {url} to {path}")
+        fixture = _dump(request.method, url, response)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False)
+        return fixture
+
+
+class RecordReplayTransport(httpx.BaseTransport):
+    """Record responses to, or replay them from, a fixtures directory.
+
+    Args:
+        directory: Where fixtures are read from and written to.
+        mode: ``"replay"`` serves fixtures only and raises
+            :class:`FileNotFoundError` for unknown requests,
+            ``"record"`` always forwards to ``transport`` and saves the
+            response, ``"auto"`` replays when a fixture exists and
+            records otherwise.
+        transport: Transport used to reach the network when recording.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        mode: Mode = "replay",
+        transport: httpx.BaseTransport | None = None,
+    ) -> None:
+        self.store = _FixtureStore(directory, mode)
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        response = self.store.lookup(request)
+        if response is not None:
+            return response
+        url = str(request.url)
+        response = self.transport.handle_request(request)
+        response.read()
+        return _load(self.store.save(request, url, response), request)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncRecordReplayTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of :class:`RecordReplayTransport`."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        mode: Mode = "replay",
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.store = _FixtureStore(directory, mode)
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(
+        self, request: httpx.Request
+    ) -> httpx.Response:
+        response = self.store.lookup(request)
+        if response is not None:
+            return response
+        url = str(request.url)
+        response = await self.transport.handle_async_request(request)
+        await response.aread()
+        return _load(self.store.save(request, url, response), request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def _redirect(request: httpx.Request, base_url: httpx.URL) -> None:
+    request.url = request.url.copy_with(
+        scheme=base_url.scheme, host=base_url.host, port=base_url.port
+    )
+    request.headers["Host"] = request.url.netloc.decode("ascii")
+
+
+class RedirectTransport(httpx.HTTPTransport):
+    """Send every request to ``base_url``, keeping path and query.
+
+    Used to point the clients, whose URL builders always target the
+    IBGE hosts, at a local :class:`~sidra_fetcher.mock.MockIBGEServer`.
+    """
+
+    def __init__(self, base_url: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.base_url = httpx.URL(base_url)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        _redirect(request, self.base_url)
+        return super().handle_request(request)
+
+
+class AsyncRedirectTransport(httpx.AsyncHTTPTransport):
+    """Async counterpart of :class:`RedirectTransport`."""
+
+    def __init__(self, base_url: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.base_url = httpx.URL(base_url)
+
+    async def handle_async_request(
+        self, request: httpx.Request
+    ) -> httpx.Response:
+        _redirect(request, self.base_url)
+        return await super().handle_async_request(request)
@@ -0,0 +1,393 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Derive totals locally from already fetched ``/values`` rows.
+
+State, region and national figures are sums of municipality figures, and
+the total of a classification is the sum of its categories, so once the
+fine-grained rows are downloaded most totals need no further request::
+
+    rows = client.get_values(parametro)          # n6, with header
+    ufs = rollup_territorios(rows, agregado, indice, "N3")
+    brasil = rollup_categorias(ufs.rows, agregado, 81)
+
+Sums are only derived when the metadata allows them:
+
+- The variable lists ``"nivelTerritorial"`` in
+  :attr:`~sidra_fetcher.agregados.Variavel.sumarizacao`; percentages,
+  averages and indexes do not.
+- For categories, the classification has ``sumarizacao.status`` and
+  neither the category nor its subcategories are in
+  ``sumarizacao.excecao``.
+
+A derived cell also needs every one of its components to be present and
+numeric: municipalities suppressed with ``"X"`` (sigilo) do not add up to
+the published state figure. Every cell that could not be derived is
+reported in :attr:`Rollup.underivable` with the :class:`Reason`, ready
+to be requested from SIDRA instead.
+
+Derived rows have the format of the input rows, header included, so they
+can be decoded, exported or rolled up again.
+
+This module requires the optional ``numpy`` dependency
+(``pip install sidra-fetcher[numpy]``).
+"""
+
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Callable, Iterable
+
+from .agregados import Agregado, Variavel
+from .territorio import NIVEIS, TerritorioIndex
+from .values import Status, decode_rows, split_header
+
+_SUFIXO_CODIGO = " (Código)"
+
+
+class Reason(StrEnum):
+    """Why a cell could not be derived."""
+
+    NOT_SUMMABLE = "not_summable"  # Variable or classification not additive
+    EXCEPTION = "exception"  # Category in sumarizacao.excecao
+    INCOMPLETE = "incomplete"  # Components missing from the rows
+    SYMBOL = "symbol"  # Components with "X", "..", "..." or invalid
+
+
+@dataclass
+class Rollup:
+    """Cells derived by a rollup.
+
+    Attributes:
+        rows: Header row followed by the derived rows.
+        underivable: ``(row, reason)`` of the cells that could not be
+            derived, ``row`` holding their descriptors but no ``V``.
+    """
+
+    rows: list[dict[str, str]] = field(default_factory=list)
+    underivable: list[tuple[dict[str, str], Reason]] = field(
+        default_factory=list
+    )
+
+
+def _import_numpy():
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError(
+            "sidra_fetcher.rollup requires numpy, install it with "
+            "`pip install sidra-fetcher[numpy]`"
+        ) from e
+    return np
+
+
+def is_summable(variavel: Variavel) -> bool:
+    """Whether the values of ``variavel`` can be added up."""
+    return "nivelTerritorial" in variavel.sumarizacao
+
+
+def _coluna(header: dict[str, str], label: str) -> str:
+    for key, value in header.items():
+        if key.startswith("D") and value == label + _SUFIXO_CODIGO:
+            return key
+    raise ValueError(f"No {label!r} column in the rows")
+
+
+def _split(rows: list[dict[str, str]]):
+    header, data = split_header(rows)
+    if data and header.get("V") != "Valor":
+        raise ValueError("Rollups need the header row, request /h/y")
+    return header, data
+
+
+def _format(np, valor: float, casas: int) -> str:
+    return np.format_float_positional(round(valor, casas), trim="-")
+
+
+def _casas(np, valores, grupo, n_grupos: int):
+    """Largest number of decimals of ``valores`` in each group."""
+    unicos, inverso = np.unique(valores, return_inverse=True)
+    casas = np.fromiter(
+        (len(v.partition(".")[2]) for v in unicos), np.int64, len(unicos)
+    )
+    maximo = np.zeros(n_grupos, np.int64)
+    np.maximum.at(maximo, grupo, casas[inverso.ravel()])
+    return maximo
+
+
+def _somar(
+    header: dict[str, str],
+    data: list[dict[str, str]],
+    chave: str,
+    variavel: str,
+    pai_de: Callable[[str], str | None],
+    esperados: Callable[[str], int],
+    motivo: Callable[[dict[str, str]], Reason | None],
+    nome_de: Callable[[str], str],
+    cabecalho: dict[str, str] | None = None,
+    fixos: dict[str, str] | None = None,
+) -> Rollup:
+    """Sum the rows of each parent of the codes in column ``chave``.
+
+    Args:
+        header: Header row of the rows.
+        data: Rows to sum.
+        chave: Code column being rolled up.
+        variavel: Variable column, whose values share their decimals.
+        pai_de: Parent of a code, ``None`` for rows to ignore.
+        esperados: Number of components of a parent.
+        motivo: Why the value of a derived row cannot be computed, or
+            ``None``.
+        nome_de: Name of a parent.
+        cabecalho: Labels replaced in the header row.
+        fixos: Other fields replaced in the derived rows.
+    """
+    np = _import_numpy()
+    resultado = Rollup(rows=[{**header, **(cabecalho or {})}])
+    if not data:
+        return resultado
+    valores, status = decode_rows([header, *data])
+    codigos = np.asarray([row.get(chave) for row in data], dtype=object)
+    unicos, inverso = np.unique(codigos, return_inverse=True)
+    pais = np.asarray([pai_de(c) or "" for c in unicos], dtype=object)
+    pai = pais[inverso]
+    linhas = np.flatnonzero(pai != "")
+    if not len(linhas):
+        return resultado
+
+    # One integer per distinct combination of the other descriptors
+    outras = [
+        k
+        for k in header
+        if k.startswith("D") and k.endswith("C") and k != chave
+    ]
+    colunas = [np.unique(pai[linhas], return_inverse=True)[1]]
+    for key in outras:
+        coluna = np.asarray([data[i].get(key) for i in linhas], dtype=object)
+        colunas.append(np.unique(coluna, return_inverse=True)[1])
+    _, primeiro, grupo = np.unique(
+        np.stack(colunas, axis=1),
+        axis=0,
+        return_index=True,
+        return_inverse=True,
+    )
+    grupo = grupo.ravel()
+    n_grupos = len(primeiro)
+
+    ok = (status[linhas] == Status.OK) | (status[linhas] == Status.ZERO)
+    somas = np.bincount(
+        grupo, weights=np.where(ok, valores[linhas], 0.0), minlength=n_grupos
+    )
+    n = np.bincount(grupo, minlength=n_grupos)
+    # Distinct codes, so a duplicate row cannot hide a missing one
+    componentes = np.bincount(
+        np.unique(np.stack([grupo, inverso[linhas]], axis=1), axis=0)[:, 0],
+        minlength=n_grupos,
+    )
+    simbolos = np.bincount(grupo, weights=~ok, minlength=n_grupos)
+    zeros = np.bincount(
+        grupo, weights=status[linhas] == Status.ZERO, minlength=n_grupos
+    )
+    _, por_variavel = np.unique(
+        np.asarray([data[i].get(variavel) for i in linhas], dtype=object),
+        return_inverse=True,
+    )
+    por_variavel = por_variavel.ravel()
+    casas = _casas(
+        np,
+        np.asarray([data[i]["V"] if o else "" for i, o in zip(linhas, ok)]),
+        por_variavel,
+        por_variavel.max() + 1,
+    )[por_variavel[primeiro]]
+
+    for g, i in enumerate(linhas[primeiro]):
+        codigo = pai[i]
+        row = {**data[i], chave: codigo, **(fixos or {})}
+        if chave[:-1] + "N" in header:
+            row[chave[:-1] + "N"] = nome_de(codigo)
+        razao = motivo(row)
+        if razao is None and componentes[g] < esperados(codigo):
+            razao = Reason.INCOMPLETE
+        if razao is None and simbolos[g]:
+            razao = Reason.SYMBOL
+        if razao is not None:
+            row.pop("V", None)
+            resultado.underivable.append((row, razao))
+        elif zeros[g] == n[g]:
+            resultado.rows.append({**row, "V": "-"})
+        else:
+            valor = _format(np, somas[g], casas[g])
+            resultado.rows.append({**row, "V": valor})
+    return resultado
+
+
+def _variaveis_somaveis(agregado: Agregado) -> set[str]:
+    return {str(v.id) for v in agregado.variaveis if is_summable(v)}
+
+
+def rollup_territorios(
+    rows: list[dict[str, str]],
+    agregado: Agregado,
+    indice: TerritorioIndex,
+    nivel: str = "N3",
+    de: str = "N6",
+) -> Rollup:
+    """Derive the values of a territorial level from a finer one.
+
+    Args:
+        rows: ``/values`` rows with the header row. Rows of other levels
+            than ``de`` are ignored.
+        agregado: Metadata of the table, for the variables' sumarizacao.
+        indice: Territorial hierarchy. A parent is only derived when
+            every one of its localidades in the index is in ``rows``.
+        nivel: Level to derive, like ``"N3"``.
+        de: Level of the rows summed, like ``"N6"``.
+    """
+    header, data = _split(rows)
+    if NIVEIS.get(nivel) is None or NIVEIS.get(de) is None:
+        raise ValueError(f"Cannot roll {de} up to {nivel}")
+    chave = _coluna(header, NIVEIS[de])
+    variavel = _coluna(header, "Variável")
+    somaveis = _variaveis_somaveis(agregado)
+    data = [row for row in data if row.get("NC") == de[1:]]
+
+    def pai_de(codigo: str) -> str | None:
+        if (de, codigo) not in indice:
+            return None
+        return indice.ancestor(de, codigo, nivel)
+
+    def esperados(codigo: str) -> int:
+        inicio, fim = indice.span(nivel, codigo, de)
+        return fim - inicio
+
+    def motivo(row: dict[str, str]) -> Reason | None:
+        if row[variavel] not in somaveis:
+            return Reason.NOT_SUMMABLE
+        return None
+
+    # The territorial column is relabelled, keeping its key
+    return _somar(
+        header,
+        data,
+        chave,
+        variavel,
+        pai_de,
+        esperados,
+        motivo,
+        lambda codigo: indice.nome(nivel, codigo),
+        cabecalho={
+            chave: NIVEIS[nivel] + _SUFIXO_CODIGO,
+            chave[:-1] + "N": NIVEIS[nivel],
+        },
+        fixos={"NC": nivel[1:], "NN": NIVEIS[nivel]},
+    )
+
+
+def _celula(header: dict[str, str], row: dict[str, str]) -> tuple:
+    return tuple(
+        row.get(k) for k in header if k.startswith("D") and k.endswith("C")
+    )
+
+
+def rollup_categorias(
+    rows: list[dict[str, str]],
+    agregado: Agregado,
+    classificacao_id: int,
+    categorias: Iterable[int] | None = None,
+) -> Rollup:
+    """Derive categories of a classification from their subcategories.
+
+    The hierarchy is the
+    :class:`~sidra_fetcher.categorias.CategoriaTree` of the
+    classification. Categories are derived deepest first, so they can be
+    summed from subcategories derived themselves. Cells already in
+    ``rows`` are used as components and not derived again.
+
+    Args:
+        rows: ``/values`` rows with the header row.
+        agregado: Metadata of the table.
+        classificacao_id: Classification to sum up.
+        categorias: Categories to derive, by default every category with
+            subcategories.
+
+    Raises:
+        ValueError: If the classification is not in the agregado.
+    """
+    header, data = _split(rows)
+    try:
+        tree = agregado.category_tree(classificacao_id)
+    except KeyError:
+        raise ValueError(
+            f"No classificacao {classificacao_id} in agregado"
+        ) from None
+    classificacao = next(
+        c for c in agregado.classificacoes if c.id == classificacao_id
+    )
+    chave = _coluna(header, classificacao.nome)
+    variavel = _coluna(header, "Variável")
+    somaveis = _variaveis_somaveis(agregado)
+    nomes = {str(c.id): c.nome for c in classificacao.categorias}
+    sumarizacao = classificacao.sumarizacao
+    excecoes = set(sumarizacao.excecao)
+
+    def motivo(row: dict[str, str]) -> Reason | None:
+        if not sumarizacao.status or row[variavel] not in somaveis:
+            return Reason.NOT_SUMMABLE
+        pai = int(row[chave])
+        if excecoes.intersection([pai, *tree.children(pai)]):
+            return Reason.EXCEPTION
+        return None
+
+    resultado = Rollup(rows=[header])
+    presentes = {_celula(header, row) for row in data}
+    derivadas: list[dict[str, str]] = []
+    pais = tree.parents()
+    for nivel in sorted({tree.niveis[tree.position(p)] for p in pais})[::-1]:
+        pais_nivel = {
+            str(filho): str(pai)
+            for pai in pais
+            if tree.niveis[tree.position(pai)] == nivel
+            for filho in tree.children(pai)
+        }
+        parcial = _somar(
+            header,
+            data + derivadas,
+            chave,
+            variavel,
+            pais_nivel.get,
+            lambda pai: len(tree.children(int(pai))),
+            motivo,
+            nomes.__getitem__,
+        )
+        for row in parcial.rows[1:]:
+            if _celula(header, row) not in presentes:
+                resultado.rows.append(row)
+                derivadas.append(row)
+        resultado.underivable += [
+            (row, razao)
+            for row, razao in parcial.underivable
+            if _celula(header, row) not in presentes
+        ]
+
+    if categorias is not None:
+        alvos = {str(c) for c in categorias}
+        resultado.rows[1:] = [
+            r for r in resultado.rows[1:] if r[chave] in alvos
+        ]
+        resultado.underivable = [
+            (r, razao)
+            for r, razao in resultado.underivable
+            if r[chave] in alvos
+        ]
+    return resultado
@@ -0,0 +1,288 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Priority-aware request scheduler for :class:`AsyncSidraClient`.
+
+:class:`RequestScheduler` sits in front of ``AsyncSidraClient.get``,
+and of the downloads of ``download_values``, and limits how many
+requests run at once. Requests that do not get a slot wait in one
+queue per :class:`Priority`:
+
+- Queues are served in strict priority order, and ``reserved`` slots
+  are kept for :attr:`Priority.INTERACTIVE` requests, so a bulk crawl
+  saturating the pool never delays a dashboard query by more than one
+  request.
+- Within a priority, tenants share the slots by weighted fair queuing:
+  every request gets a virtual finish tag of
+  ``max(virtual time, tenant's last tag) + 1 / weight`` and the smallest
+  tag runs first. A tenant with weight 2 gets twice the slots of a
+  tenant with weight 1 while both have work queued.
+- A ``deadline`` bounds the time a request may spend queued and
+  running, and :meth:`RequestScheduler.cancel` drops queued requests of
+  a tenant.
+
+Time spent queued is reported as :attr:`EventType.QUEUE_WAIT` events
+labelled with the priority name, and :meth:`RequestScheduler.queue_depth`
+and :meth:`RequestScheduler.render` expose the queue sizes::
+
+    scheduler = RequestScheduler(client, max_concurrency=8)
+    dashboard = scheduler.client(Priority.INTERACTIVE, tenant="dashboard")
+    agregado = await dashboard.get_agregado_metadados(1705)
+"""
+
+import asyncio
+import copy
+import heapq
+import itertools
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from functools import partial
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+from .download import Sink
+from .instrumentation import EventType
+
+
+class Priority(IntEnum):
+    """Priority classes of :class:`RequestScheduler`, most urgent first."""
+
+    INTERACTIVE = 0
+    NORMAL = 1
+    BULK = 2
+
+
+@dataclass(order=True)
+class _Entry:
+    tag: float
+    seq: int
+    priority: Priority = field(compare=False)
+    tenant: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class RequestScheduler:
+    """Share an :class:`AsyncSidraClient` between priorities and tenants.
+
+    Args:
+        client: The client whose ``get`` is scheduled.
+        max_concurrency: Maximum number of requests running at once.
+        reserved: Slots only :attr:`Priority.INTERACTIVE` requests may
+            use.
+        weights: Weight of each tenant for fair queuing; tenants not
+            listed weigh ``1``.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        max_concurrency: int = 8,
+        reserved: int = 1,
+        weights: dict[str, float] | None = None,
+    ) -> None:
+        if not 0 <= reserved < max_concurrency:
+            raise ValueError("reserved must be in [0, max_concurrency)")
+        self._client = client
+        self.max_concurrency = max_concurrency
+        self.reserved = reserved
+        self.weights = dict(weights or {})
+        self.running = 0
+        self._queues: dict[Priority, list[_Entry]] = {p: [] for p in Priority}
+        self._virtual_time: dict[Priority, float] = dict.fromkeys(Priority, 0)
+        self._finish: dict[tuple[Priority, str], float] = {}
+        self._depth: Counter[tuple[Priority, str]] = Counter()
+        self._seq = itertools.count()
+
+    def _limit(self, priority: Priority) -> int:
+        if priority == Priority.INTERACTIVE:
+            return self.max_concurrency
+        return self.max_concurrency - self.reserved
+
+    def _enqueue(self, priority: Priority, tenant: str) -> _Entry:
+        key = (priority, tenant)
+        start = max(self._virtual_time[priority], self._finish.get(key, 0))
+        tag = start + 1 / self.weights.get(tenant, 1.0)
+        self._finish[key] = tag
+        entry = _Entry(
+            tag,
+            next(self._seq),
+            priority,
+            tenant,
+            asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self._queues[priority], entry)
+        self._depth[key] += 1
+        return entry
+
+    def _dispatch(self) -> None:
+        """Give free slots to the queued requests that should run next."""
+        while True:
+            for priority, queue in self._queues.items():
+                while queue and queue[0].future.done():
+                    heapq.heappop(queue)  # Cancelled while queued
+                if queue and self.running < self._limit(priority):
+                    break
+            else:
+                return
+            entry = heapq.heappop(queue)
+            self._virtual_time[priority] = entry.tag
+            self._depth[priority, entry.tenant] -= 1
+            self.running += 1
+            entry.future.set_result(None)
+
+    def _release(self) -> None:
+        self.running -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def _slot(
+        self, url: str, priority: Priority, tenant: str
+    ) -> AsyncIterator[None]:
+        """Hold a slot for a request to ``url`` while the block runs."""
+        t0 = time.perf_counter()
+        entry = self._enqueue(priority, tenant)
+        self._dispatch()
+        try:
+            await entry.future
+        except BaseException:
+            if entry.future.cancelled():
+                self._depth[priority, tenant] -= 1
+            else:
+                # Got a slot right as it was cancelled: pass it on
+                self._release()
+            raise
+        self._client.instrumentation.emit(
+            EventType.QUEUE_WAIT,
+            url,
+            time.perf_counter() - t0,
+            endpoint=priority.name.lower(),
+        )
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def get(
+        self,
+        url: str,
+        priority: Priority = Priority.NORMAL,
+        tenant: str = "default",
+        deadline: float | None = None,
+    ) -> Any:
+        """Fetch ``url`` with the client once a slot is available.
+
+        Args:
+            url: The URL to fetch.
+            priority: Priority class of the request.
+            tenant: Caller the request is accounted to for fair queuing.
+            deadline: Seconds the request may take, queueing included.
+
+        Raises:
+            TimeoutError: If ``deadline`` expired.
+            asyncio.CancelledError: If the request was cancelled, either
+                by the caller or with :meth:`cancel`.
+        """
+        async with asyncio.timeout(deadline):
+            async with self._slot(url, priority, tenant):
+                return await self._client.get(url)
+
+    async def download(
+        self,
+        url: str,
+        sink: Sink,
+        priority: Priority = Priority.NORMAL,
+        tenant: str = "default",
+        deadline: float | None = None,
+    ) -> Path:
+        """Stream ``url`` into ``sink`` once a slot is available.
+
+        The download holds its slot until the whole body is written.
+        Takes the arguments of :meth:`get`.
+        """
+        async with asyncio.timeout(deadline):
+            async with self._slot(url, priority, tenant):
+                return await self._client._download_file(url, sink)
+
+    def client(
+        self,
+        priority: Priority = Priority.NORMAL,
+        tenant: str = "default",
+    ) -> Any:
+        """Return a view of the client whose requests are scheduled.
+
+        The view shares the connection pool of the scheduled client and
+        has all of its methods (``get_agregado``, ``get_values``,
+        ``download_values``, ...), with every request going through
+        :meth:`get`, or :meth:`download` for the files streamed to disk,
+        at ``priority`` on behalf of ``tenant``. Close the original
+        client, not the view.
+        """
+        view = copy.copy(self._client)
+        view.get = partial(self.get, priority=priority, tenant=tenant)
+        view._download_file = partial(
+            self.download, priority=priority, tenant=tenant
+        )
+        return view
+
+    def cancel(
+        self,
+        tenant: str | None = None,
+        priority: Priority | None = None,
+    ) -> int:
+        """Cancel queued requests, optionally of one tenant or priority.
+
+        Running requests are not interrupted.
+
+        Returns:
+            The number of cancelled requests.
+        """
+        n = 0
+        for p, queue in self._queues.items():
+            if priority is not None and p != priority:
+                continue
+            for entry in queue:
+                if tenant is not None and entry.tenant != tenant:
+                    continue
+                if entry.future.cancel():
+                    n += 1
+        return n
+
+    def queue_depth(self) -> dict[tuple[str, str], int]:
+        """Return the number of queued requests per priority and tenant."""
+        return {
+            (priority.name.lower(), tenant): n
+            for (priority, tenant), n in sorted(self._depth.items())
+            if n > 0
+        }
+
+    def render(self, namespace: str = "sidra_fetcher") -> str:
+        """Render the queue gauges in the Prometheus text format."""
+        name = f"{namespace}_scheduler"
+        lines = [
+            f"# HELP {name}_queue_depth Requests waiting for a slot.",
+            f"# TYPE {name}_queue_depth gauge",
+        ]
+        for (priority, tenant), n in self.queue_depth().items():
+            lines.append(
+                f'{name}_queue_depth{{priority="{priority}",'
+                f'tenant="{tenant}"}} {n}'
+            )
+        lines.append(f"# HELP {name}_running Requests holding a slot.")
+        lines.append(f"# TYPE {name}_running gauge")
+        lines.append(f"{name}_running {self.running}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,786 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Crawl the catalog with several workers sharing a SQLite file.
+
+There is no coordinator: every worker opens the same
+:class:`ShardQueue` database, on a volume all of them can reach, and
+claims tasks from it under a lease::
+
+    with ShardQueue("/shared/crawl.db") as queue, SidraClient() as client:
+        plan_catalog(queue, client, "/shared/out")   # Any worker, once
+        run_worker(queue, client, parametro=values_of)
+    merge(ShardQueue("/shared/crawl.db"), "/shared/merged")
+
+The work list comes from the agregados index: one task per agregado
+fetches it with ``get_agregado`` and, given ``parametro``, adds one task
+per :func:`~sidra_fetcher.jobs.split_parametro` slice of its values.
+
+Tasks are partitioned by a consistent hash of their key over the live
+workers (:class:`HashRing`): a worker claims the tasks it owns first and
+takes the others only when it has none left, so workers joining or
+leaving move few tasks. Workers announce themselves on every claim; one
+silent for longer than the lease is dead, its share of the ring goes to
+the others and its claimed tasks are claimed again when their lease
+expires. The workers renew the lease of a running task from a heartbeat
+(:meth:`ShardQueue.heartbeat`), so only the tasks of dead workers
+expire.
+
+Claims take SQLite's write lock (``BEGIN IMMEDIATE``), and the database
+keeps the default rollback journal, as WAL mode does not work on network
+file systems.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator
+
+from . import logger
+from .agregados import Agregado
+from .download import FORMATS, Format
+from .jobs import TaskState, split_parametro
+from .reader import save_agregado
+from .sidra import Parametro
+from .values import read_values
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    owner TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_until);
+CREATE TABLE IF NOT EXISTS workers (
+    name TEXT PRIMARY KEY,
+    seen REAL NOT NULL
+);
+"""
+
+# Claimable tasks looked at for one owned by the worker
+CLAIM_WINDOW = 256
+
+
+def _hash(key: str) -> int:
+    """Stable 64-bit hash, the same in every process."""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class HashRing:
+    """Consistent hashing of task keys over workers.
+
+    Each worker owns ``replicas`` points of a 64-bit ring, and a key
+    belongs to the worker of the first point after its hash. Removing a
+    worker only moves the keys it owned.
+
+    Args:
+        workers: Names of the workers.
+        replicas: Points per worker; more points spread keys more evenly.
+    """
+
+    def __init__(self, workers: Iterable[str], replicas: int = 64) -> None:
+        self.workers = tuple(sorted(set(workers)))
+        pontos = sorted(
+            (_hash(f"{worker}#{i}"), worker)
+            for worker in self.workers
+            for i in range(replicas)
+        )
+        self._hashes = [h for h, _ in pontos]
+        self._owners = [worker for _, worker in pontos]
+
+    def __len__(self) -> int:
+        return len(self.workers)
+
+    def owner(self, key: str) -> str | None:
+        """Return the worker owning ``key``, ``None`` without workers."""
+        if not self._hashes:
+            return None
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[i]
+
+
+@dataclass
+class ShardTask:
+    """A task claimed from a :class:`ShardQueue`.
+
+    Attributes:
+        key: Unique key of the task, hashed to choose its worker.
+        kind: ``"agregado"`` or ``"values"`` for :func:`run_worker`.
+        payload: JSON arguments of the task.
+        attempts: Failed attempts before this one.
+    """
+
+    key: str
+    kind: str
+    payload: dict[str, Any]
+    attempts: int = 0
+
+
+class ShardQueue:
+    """Lease-based work queue in a SQLite file shared by workers.
+
+    Args:
+        path: Path of the SQLite database, created if missing.
+        worker: Name of this worker, unique among the workers; the host
+            name and process id by default.
+        lease: Seconds a claimed task is kept before other workers may
+            claim it again, and a worker is considered alive after its
+            last claim.
+        max_attempts: Attempts, including expired leases, before a task
+            is marked ``failed``.
+        replicas: Points of each worker on the :class:`HashRing`.
+        clock: Wall clock shared by the workers, replaceable in tests.
+
+    The queue may be used from several threads of a process: they share
+    its connection one at a time.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        worker: str | None = None,
+        lease: float = 300.0,
+        max_attempts: int = 5,
+        replicas: int = 64,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.replicas = replicas
+        self.clock = clock
+        self.db = sqlite3.connect(
+            self.path,
+            timeout=60,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+        self._ring = HashRing((), replicas)
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Hold the write lock of the database until committed."""
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.db
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def _query(self, sql: str, parameters: tuple = ()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self.db.execute(sql, parameters).fetchall()
+
+    def add(self, tasks: Iterable[tuple[str, str, dict[str, Any]]]) -> int:
+        """Add ``(key, kind, payload)`` tasks, ignoring known keys.
+
+        Returns:
+            The number of new tasks.
+        """
+        with self._transaction() as db:
+            return db.executemany(
+                "INSERT OR IGNORE INTO tasks (key, kind, payload, state)"
+                " VALUES (?, ?, ?, ?)",
+                [
+                    (key, kind, json.dumps(payload), TaskState.PENDING)
+                    for key, kind, payload in tasks
+                ],
+            ).rowcount
+
+    def workers(self) -> list[str]:
+        """Return the names of the live workers."""
+        return [
+            row[0]
+            for row in self._query(
+                "SELECT name FROM workers WHERE seen >= ? ORDER BY name",
+                (self.clock() - self.lease,),
+            )
+        ]
+
+    def ring(self) -> HashRing:
+        """Return the :class:`HashRing` of the live workers."""
+        workers = self.workers()
+        if tuple(workers) != self._ring.workers:
+            self._ring = HashRing(workers, self.replicas)
+        return self._ring
+
+    def leave(self) -> None:
+        """Remove this worker from the ring, e.g. before exiting."""
+        with self._transaction() as db:
+            db.execute("DELETE FROM workers WHERE name = ?", (self.worker,))
+
+    def _expire(self, db: sqlite3.Connection, agora: float) -> None:
+        """Requeue the tasks whose lease expired, counting an attempt."""
+        n = db.execute(
+            "UPDATE tasks SET state = ?, owner = NULL,"
+            " attempts = attempts + 1, error = 'lease expired'"
+            " WHERE state = ? AND lease_until <= ?",
+            (TaskState.PENDING, TaskState.RUNNING, agora),
+        ).rowcount
+        if n:
+            logger.warning(f"Claiming again {n} tasks of dead workers")
+        db.execute(
+            "UPDATE tasks SET state = ? WHERE state = ? AND attempts >= ?",
+            (TaskState.FAILED, TaskState.PENDING, self.max_attempts),
+        )
+
+    def claim(self) -> ShardTask | None:
+        """Lease the next pending task, preferring the ones this owns.
+
+        Returns:
+            The task, or ``None`` when no task is pending.
+        """
+        agora = self.clock()
+        with self._transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO workers (name, seen) VALUES (?, ?)",
+                (self.worker, agora),
+            )
+            self._expire(db, agora)
+            candidatas = db.execute(
+                "SELECT * FROM tasks WHERE state = ? ORDER BY id LIMIT ?",
+                (TaskState.PENDING, CLAIM_WINDOW),
+            ).fetchall()
+            if not candidatas:
+                return None
+            ring = self.ring()
+            row = next(
+                (c for c in candidatas if ring.owner(c["key"]) == self.worker),
+                candidatas[0],
+            )
+            db.execute(
+                "UPDATE tasks SET state = ?, owner = ?, lease_until = ?"
+                " WHERE id = ?",
+                (
+                    TaskState.RUNNING,
+                    self.worker,
+                    agora + self.lease,
+                    row["id"],
+                ),
+            )
+        return ShardTask(
+            key=row["key"],
+            kind=row["kind"],
+            payload=json.loads(row["payload"]),
+            attempts=row["attempts"],
+        )
+
+    def renew(self, task: ShardTask) -> bool:
+        """Extend the lease of a claimed task.
+
+        Returns:
+            Whether this worker still held the task.
+        """
+        agora = self.clock()
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE workers SET seen = ? WHERE name = ?",
+                (agora, self.worker),
+            )
+            return bool(
+                db.execute(
+                    "UPDATE tasks SET lease_until = ?"
+                    " WHERE key = ? AND state = ? AND owner = ?",
+                    (
+                        agora + self.lease,
+                        task.key,
+                        TaskState.RUNNING,
+                        self.worker,
+                    ),
+                ).rowcount
+            )
+
+    @contextmanager
+    def heartbeat(
+        self, task: ShardTask, interval: float | None = None
+    ) -> Iterator[None]:
+        """Renew the lease of ``task`` from a thread while the block runs.
+
+        Args:
+            task: A task claimed by this worker.
+            interval: Seconds between renewals, a third of the lease by
+                default.
+        """
+        interval = self.lease / 3 if interval is None else interval
+        parar = threading.Event()
+
+        def renovar() -> None:
+            while not parar.wait(interval):
+                if not self.renew(task):
+                    logger.warning(f"Lost the lease of {task.key}")
+                    return
+
+        thread = threading.Thread(target=renovar, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            parar.set()
+            thread.join()
+
+    @asynccontextmanager
+    async def heartbeat_async(
+        self, task: ShardTask, interval: float | None = None
+    ) -> AsyncIterator[None]:
+        """Async counterpart of :meth:`heartbeat`, renewing from a task."""
+        interval = self.lease / 3 if interval is None else interval
+
+        async def renovar() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                if not await asyncio.to_thread(self.renew, task):
+                    logger.warning(f"Lost the lease of {task.key}")
+                    return
+
+        renovacao = asyncio.create_task(renovar())
+        try:
+            yield
+        finally:
+            renovacao.cancel()
+
+    def complete(self, task: ShardTask) -> bool:
+        """Mark a claimed task as done, if this worker still holds it.
+
+        A task whose lease was lost is left to the worker claiming it
+        again, which finds its outputs already written.
+
+        Returns:
+            Whether this worker still held the task.
+        """
+        with self._transaction() as db:
+            held = db.execute(
+                "UPDATE tasks SET state = ?, owner = NULL, error = NULL"
+                " WHERE key = ? AND state = ? AND owner = ?",
+                (TaskState.DONE, task.key, TaskState.RUNNING, self.worker),
+            ).rowcount
+        if not held:
+            logger.warning(f"Lease of {task.key} lost before completion")
+        return bool(held)
+
+    def fail(self, task: ShardTask, error: BaseException) -> None:
+        """Put a claimed task back in the queue, or mark it ``failed``."""
+        attempts = task.attempts + 1
+        if attempts >= self.max_attempts:
+            state = TaskState.FAILED
+            logger.error(f"Giving up {task.key}: {error!r}")
+        else:
+            state = TaskState.PENDING
+            logger.warning(f"Attempt {attempts} of {task.key}: {error!r}")
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE tasks SET state = ?, owner = NULL, attempts = ?,"
+                " error = ? WHERE key = ? AND state = ? AND owner = ?",
+                (
+                    state,
+                    attempts,
+                    repr(error),
+                    task.key,
+                    TaskState.RUNNING,
+                    self.worker,
+                ),
+            )
+
+    def wait_time(self) -> float | None:
+        """Return seconds until a task may become claimable.
+
+        ``0`` when a task is pending, the time left on the earliest
+        lease while others run, ``None`` when every task is finished.
+        """
+        [row] = self._query(
+            "SELECT MIN(CASE WHEN state = ? THEN 0 ELSE lease_until END)"
+            " FROM tasks WHERE state IN (?, ?)",
+            (TaskState.PENDING, TaskState.PENDING, TaskState.RUNNING),
+        )
+        if row[0] is None:
+            return None
+        return max(row[0] - self.clock(), 0.0)
+
+    def progress(self) -> dict[str, int]:
+        """Return the number of tasks in each :class:`TaskState`."""
+        counts = {state.value: 0 for state in TaskState}
+        for row in self._query(
+            "SELECT state, COUNT(*) FROM tasks GROUP BY state"
+        ):
+            counts[row[0]] = row[1]
+        return counts
+
+    def done(self, kind: str) -> list[ShardTask]:
+        """Return the finished tasks of a kind, in key order."""
+        return [
+            ShardTask(
+                key=row["key"],
+                kind=row["kind"],
+                payload=json.loads(row["payload"]),
+                attempts=row["attempts"],
+            )
+            for row in self._query(
+                "SELECT * FROM tasks WHERE kind = ? AND state = ?"
+                " ORDER BY key",
+                (kind, TaskState.DONE),
+            )
+        ]
+
+    def close(self) -> None:
+        """Close the database."""
+        self.db.close()
+
+    def __enter__(self) -> "ShardQueue":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def plan_catalog(
+    queue: ShardQueue,
+    client: Any,
+    dest: str | Path,
+    filtros: dict[str, str] | None = None,
+) -> int:
+    """Add a task for every agregado of the agregados index.
+
+    Planning again, from any worker, only adds new agregados.
+
+    Args:
+        queue: The shared queue.
+        client: A :class:`~sidra_fetcher.fetcher.SidraClient`.
+        dest: Directory, shared by the workers, of the outputs.
+        filtros: Filters of ``get_indice_pesquisas_agregados``.
+
+    Returns:
+        The number of new tasks.
+    """
+    indice = client.get_indice_pesquisas_agregados(filtros)
+    return queue.add(
+        (
+            f"agregado/{agregado.id}",
+            "agregado",
+            {"id": agregado.id, "dest": str(dest)},
+        )
+        for pesquisa in indice
+        for agregado in pesquisa.agregados
+    )
+
+
+def _agregado_path(dest: Path, agregado_id: int) -> Path:
+    return dest / "agregados" / f"{agregado_id}.json"
+
+
+def _save(agregado: Agregado, path: Path) -> None:
+    """Write ``agregado`` through a ``.part`` file renamed when complete."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    part = path.with_name(path.name + ".part")
+    save_agregado(agregado, part)
+    os.replace(part, path)
+
+
+def _values_tasks(
+    agregado: Agregado,
+    parametro: Parametro,
+    dest: Path,
+    format: Format,
+    periodos_por_tarefa: int,
+    localidades_por_tarefa: int | None,
+) -> list[tuple[str, str, dict[str, Any]]]:
+    partes = split_parametro(
+        parametro, agregado, periodos_por_tarefa, localidades_por_tarefa
+    )
+    return [
+        (
+            f"values/{agregado.id}/{nome}",
+            "values",
+            {
+                "agregado": agregado.id,
+                "url": p.url(),
+                "path": str(dest / "values" / str(agregado.id) / nome)
+                + f".{format}",
+                "format": format,
+            },
+        )
+        for nome, p in partes
+    ]
+
+
+class _Worker:
+    """Runs the tasks of :func:`run_worker` and :func:`run_worker_async`."""
+
+    def __init__(
+        self,
+        queue: ShardQueue,
+        parametro: Callable[[Agregado], Parametro | None] | None,
+        format: Format,
+        periodos_por_tarefa: int,
+        localidades_por_tarefa: int | None,
+    ) -> None:
+        if format not in FORMATS:
+            raise ValueError(f"Invalid format {format!r}, use {FORMATS}")
+        self.queue = queue
+        self.parametro = parametro
+        self.format = format
+        self.periodos_por_tarefa = periodos_por_tarefa
+        self.localidades_por_tarefa = localidades_por_tarefa
+
+    def fetched(self, task: ShardTask, agregado: Agregado) -> None:
+        """Save a fetched agregado and add the tasks of its values."""
+        dest = Path(task.payload["dest"])
+        _save(agregado, _agregado_path(dest, agregado.id))
+        parametro = (
+            None if self.parametro is None else self.parametro(agregado)
+        )
+        if parametro is not None:
+            self.queue.add(
+                _values_tasks(
+                    agregado,
+                    parametro,
+                    dest,
+                    self.format,
+                    self.periodos_por_tarefa,
+                    self.localidades_por_tarefa,
+                )
+            )
+
+    def _staging(self, task: ShardTask) -> Path | None:
+        """Return where a values task is downloaded, if needed.
+
+        Each attempt downloads to a path of its own, so that a worker
+        whose lease expired never writes the ``.part`` of the worker
+        claiming the task again. The files left by earlier attempts are
+        removed, and a finished download is kept.
+        """
+        path = Path(task.payload["path"])
+        if path.exists():
+            return None
+        for attempt in range(task.attempts):
+            stale = path.with_name(f"{path.name}.{attempt}")
+            stale.unlink(missing_ok=True)
+            stale.with_name(f"{stale.name}.part").unlink(missing_ok=True)
+        return path.with_name(f"{path.name}.{task.attempts}")
+
+    def download(self, task: ShardTask, client: Any) -> None:
+        """Download the values of a task with a :class:`SidraClient`."""
+        staging = self._staging(task)
+        if staging is not None:
+            client.download_values(
+                task.payload["url"], staging, task.payload["format"]
+            )
+            os.replace(staging, task.payload["path"])
+
+    async def download_async(self, task: ShardTask, client: Any) -> None:
+        """Async counterpart of :meth:`download`."""
+        staging = await asyncio.to_thread(self._staging, task)
+        if staging is not None:
+            await client.download_values(
+                task.payload["url"], staging, task.payload["format"]
+            )
+            await asyncio.to_thread(os.replace, staging, task.payload["path"])
+
+
+def run_worker(
+    queue: ShardQueue,
+    client: Any,
+    parametro: Callable[[Agregado], Parametro | None] | None = None,
+    format: Format = "json",
+    periodos_por_tarefa: int = 1,
+    localidades_por_tarefa: int | None = None,
+    poll: float = 5.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> dict[str, int]:
+    """Run tasks of the queue with a :class:`SidraClient`.
+
+    Agregado tasks save ``dest/agregados/<id>.json`` and add the tasks
+    of ``parametro(agregado)``, split with
+    :func:`~sidra_fetcher.jobs.split_parametro`; values tasks download
+    ``dest/values/<id>/<partition>.<format>``. The lease of the running
+    task is renewed by :meth:`ShardQueue.heartbeat`. Returns when every
+    task is finished, waiting meanwhile for the tasks other workers run,
+    which are claimed again if their worker dies.
+
+    Args:
+        queue: The shared queue.
+        client: A :class:`~sidra_fetcher.fetcher.SidraClient`.
+        parametro: Values to download of each agregado, ``None`` to
+            only fetch the agregados.
+        format: Format of the values files.
+        periodos_por_tarefa: Periods per values task.
+        localidades_por_tarefa: Localities per values task.
+        poll: Longest wait, in seconds, for the tasks of other workers.
+        sleep: Waits, replaceable in tests.
+
+    Returns:
+        The final :meth:`ShardQueue.progress`.
+    """
+    worker = _Worker(
+        queue, parametro, format, periodos_por_tarefa, localidades_por_tarefa
+    )
+    while True:
+        task = queue.claim()
+        if task is None:
+            wait = queue.wait_time()
+            if wait is None:
+                return queue.progress()
+            sleep(min(wait, poll))
+            continue
+        try:
+            with queue.heartbeat(task):
+                if task.kind == "agregado":
+                    agregado = client.get_agregado(task.payload["id"])
+                    worker.fetched(task, agregado)
+                else:
+                    worker.download(task, client)
+        except Exception as e:
+            queue.fail(task, e)
+        else:
+            queue.complete(task)
+
+
+async def run_worker_async(
+    queue: ShardQueue,
+    client: Any,
+    parametro: Callable[[Agregado], Parametro | None] | None = None,
+    format: Format = "json",
+    periodos_por_tarefa: int = 1,
+    localidades_por_tarefa: int | None = None,
+    poll: float = 5.0,
+    max_concurrency: int = 4,
+) -> dict[str, int]:
+    """Async counterpart of :func:`run_worker`.
+
+    Runs at most ``max_concurrency`` tasks at a time with an
+    :class:`~sidra_fetcher.fetcher.AsyncSidraClient`. The queue and the
+    files are used from threads, so that the event loop never waits on
+    the lock of the database.
+    """
+    worker = _Worker(
+        queue, parametro, format, periodos_por_tarefa, localidades_por_tarefa
+    )
+
+    # Set when a task of this process finishes, possibly adding others
+    terminou = asyncio.Event()
+
+    async def run() -> None:
+        while True:
+            task = await asyncio.to_thread(queue.claim)
+            if task is None:
+                wait = await asyncio.to_thread(queue.wait_time)
+                if wait is None:
+                    return
+                terminou.clear()
+                try:
+                    await asyncio.wait_for(terminou.wait(), min(wait, poll))
+                except TimeoutError:
+                    pass
+                continue
+            try:
+                async with queue.heartbeat_async(task):
+                    if task.kind == "agregado":
+                        id_ = task.payload["id"]
+                        agregado = await client.get_agregado(id_)
+                        await asyncio.to_thread(worker.fetched, task, agregado)
+                    else:
+                        await worker.download_async(task, client)
+            except Exception as e:
+                await asyncio.to_thread(queue.fail, task, e)
+            else:
+                await asyncio.to_thread(queue.complete, task)
+            terminou.set()
+
+    await asyncio.gather(*(run() for _ in range(max_concurrency)))
+    return await asyncio.to_thread(queue.progress)
+
+
+def _write_values(paths: list[Path], output: Path) -> None:
+    """Write the rows of the values files as one, with one header."""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    part = output.with_name(output.name + ".part")
+    cabecalho = False
+    separador = ""
+    with open(part, "w", encoding="utf-8") as f:
+        f.write("[")
+        for path in paths:
+            rows = read_values(path)
+            if rows and rows[0].get("V") == "Valor":
+                if cabecalho:
+                    rows = rows[1:]
+                cabecalho = True
+            for row in rows:
+                f.write(separador + json.dumps(row, ensure_ascii=False))
+                separador = ",\n"
+        f.write("]")
+    os.replace(part, output)
+
+
+def merge(queue: ShardQueue, output: str | Path) -> dict[str, int]:
+    """Combine the outputs of the finished tasks of every worker.
+
+    Writes ``output/agregados.json``, the list of the agregados by id,
+    and ``output/values/<id>.json`` with the rows of every values task
+    of each agregado, in partition order, under a single header.
+
+    Args:
+        queue: The shared queue, after the workers finished.
+        output: Directory of the merged files.
+
+    Returns:
+        The number of agregados and of values files written.
+    """
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    progress = queue.progress()
+    if progress[TaskState.PENDING] or progress[TaskState.RUNNING]:
+        logger.warning(f"Merging unfinished tasks of {queue.path}")
+
+    agregados = sorted(
+        queue.done("agregado"), key=lambda task: task.payload["id"]
+    )
+    with open(output / "agregados.json", "w", encoding="utf-8") as f:
+        f.write("[")
+        for i, task in enumerate(agregados):
+            path = _agregado_path(
+                Path(task.payload["dest"]), task.payload["id"]
+            )
+            with open(path, encoding="utf-8") as agregado:
+                f.write(",\n" * (i > 0) + agregado.read().strip())
+        f.write("]")
+
+    por_agregado: dict[int, list[Path]] = {}
+    for task in queue.done("values"):
+        por_agregado.setdefault(task.payload["agregado"], []).append(
+            Path(task.payload["path"])
+        )
+    for agregado_id, paths in sorted(por_agregado.items()):
+        _write_values(paths, output / "values" / f"{agregado_id}.json")
+    return {"agregados": len(agregados), "values": len(por_agregado)}
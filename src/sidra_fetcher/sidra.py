@@ -264,7 +264,7 @@ def get_sidra_url_request_period(
     Given a :class:`Parametro` instance, return a URL where the
     ``periods`` segment is replaced with the provided ``period_id``.
     """
-    p = parameter.assign("periods", [str(period_id)])
+    p = parameter.assign("periodos", [str(period_id)])
     url = p.url()
     return url
 
@@ -278,14 +278,17 @@ def parse_territories(url: str) -> tuple[list[str], dict[str, list[str]]]:
     Returns:
         A tuple ``(matches, territories)`` where ``matches`` is a list
         of raw matched strings and ``territories`` maps territorial
-        level ids to lists of selected ids (or ``['all']``).
+        level ids to lists of selected ids (or ``['all']``). Selections
+        by parent, like ``/n6/in%20n3%2033,35``, are kept whole.
     """
-    n = re.findall(r"(\/n\d\/)(all|\d+(,\d+)*)", url)
-    n = ["".join(g) for g in n]
-    territories = {
-        ter.strip("n"): select.split(",")
-        for _, ter, select in [i.split("/") for i in n]
-    }
+    pattern = r"/n\d/(?:all|(?:in%20n\d%20)?\d+(?:,\d+)*)"
+    n = [m.group() for m in re.finditer(pattern, url)]
+    territories = {}
+    for _, ter, select in [i.split("/") for i in n]:
+        if select.startswith("in"):
+            territories[ter.strip("n")] = [select]
+        else:
+            territories[ter.strip("n")] = select.split(",")
     return n, territories
 
 
@@ -25,12 +25,43 @@ data shape. Available functions include:
     classifications (i.e. total number of dimension combinations).
 - ``calculate_aggregate``: returns a dictionary with several metrics
     and size estimates (period/locality/variable dimensions and totals).
+
+Sizing a whole catalog does not need the parsed objects: an
+:class:`AgregadoCounts` holds only the numbers ``calculate_aggregate``
+uses. :func:`fetch_counts` builds it straight from the raw API
+responses, without allocating a single :class:`Localidade`, and a
+:class:`CountIndex` keeps the counts on disk between runs:
+
+- ``count_localidades``: counts raw localidades per territorial level.
+- ``fetch_counts`` / ``fetch_counts_async``: download and count the
+    metadados, periodos and localidades of an agregado.
+- ``calculate_aggregate_counts``: same result as ``calculate_aggregate``
+    from an :class:`AgregadoCounts`.
+- ``calculate_catalog``: the metrics of many agregados at once, as
+    NumPy columns (requires ``pip install sidra-fetcher[numpy]``).
 """
 
+import json
+import math
+from collections import Counter
+from dataclasses import asdict, dataclass, field
 from functools import reduce
-from typing import Any
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+from .agregados import (
+    Agregado,
+    LazyAgregado,
+    build_url_localidades,
+    build_url_metadados,
+    build_url_periodos,
+)
+from .pesquisas import PesquisaIndex
+
+if TYPE_CHECKING:
+    import numpy as np
 
-from .agregados import Agregado
+_INT64_MAX = 2**63 - 1
 
 
 def get_stat_localidades(agregado: Agregado) -> dict[str, int]:
@@ -41,14 +72,14 @@ def get_stat_localidades(agregado: Agregado) -> dict[str, int]:
 
     Returns:
         A mapping from territorial level id to the number of localidades.
+        For a :class:`LazyAgregado` the localidades are counted without
+        being loaded.
     """
-    stat_localidades: dict[str, int] = {}
-    for localidade in agregado.localidades:
-        nivel_id = localidade.nivel.id
-        if nivel_id not in stat_localidades:
-            stat_localidades[nivel_id] = 0
-        stat_localidades[nivel_id] += 1
-    return stat_localidades
+    if isinstance(agregado, LazyAgregado):
+        return agregado.stat_localidades()
+    return dict(
+        Counter(localidade.nivel.id for localidade in agregado.localidades)
+    )
 
 
 def get_n_dimensoes(agregado: Agregado) -> int:
@@ -72,31 +103,278 @@ def get_n_dimensoes(agregado: Agregado) -> int:
     return n_dimensoes
 
 
-def calculate_aggregate(agregado: Agregado) -> dict[str, Any]:
-    """Calculate size and basic statistics for an aggregate.
+def count_localidades(data: Iterable[dict[str, Any]]) -> dict[str, int]:
+    """Count the raw localidades of an API response per territorial level.
 
     Args:
-        agregado: Aggregate metadata object.
+        data: Raw localidades JSON, of one or several levels.
 
     Returns:
-        A dictionary with counts (localidades, variaveis, classificacoes),
-        dimension and period sizes and estimated total result size.
+        A mapping from territorial level id to the number of localidades,
+        as :func:`get_stat_localidades` returns.
+    """
+    return dict(Counter(localidade["nivel"]["id"] for localidade in data))
+
+
+@dataclass
+class AgregadoCounts:
+    """Counts an aggregate is sized from, without its objects.
+
+    Attributes:
+        agregado_id: Aggregate id.
+        pesquisa_id: Survey id.
+        n_periodos: Number of periods.
+        stat_localidades: Number of localidades per territorial level.
+        n_variaveis: Number of variables.
+        n_categorias: Number of categories of each classification.
+    """
+
+    agregado_id: int
+    pesquisa_id: str
+    n_periodos: int
+    stat_localidades: dict[str, int] = field(default_factory=dict)
+    n_variaveis: int = 0
+    n_categorias: list[int] = field(default_factory=list)
+
+    @classmethod
+    def from_agregado(
+        cls, agregado: Agregado, pesquisas: PesquisaIndex | None = None
+    ) -> "AgregadoCounts":
+        """Count the periods, localidades and dimensions of ``agregado``.
+
+        Args:
+            agregado: Aggregate metadata object.
+            pesquisas: Index of the survey ids, used when the pesquisa
+                of ``agregado`` has none.
+        """
+        if isinstance(agregado, LazyAgregado):
+            n_periodos = agregado.n_periodos()
+        else:
+            n_periodos = len(agregado.periodos)
+        return cls(
+            agregado_id=agregado.id,
+            pesquisa_id=agregado.pesquisa.id
+            or _pesquisa_id(agregado.id, pesquisas),
+            n_periodos=n_periodos,
+            stat_localidades=get_stat_localidades(agregado),
+            n_variaveis=len(agregado.variaveis),
+            n_categorias=[
+                len(classificacao.categorias)
+                for classificacao in agregado.classificacoes
+            ],
+        )
+
+    @classmethod
+    def from_raw(
+        cls,
+        metadados: dict[str, Any],
+        periodos: list[dict[str, Any]] | int,
+        localidades: Iterable[dict[str, Any]] | dict[str, int],
+        pesquisas: PesquisaIndex | None = None,
+    ) -> "AgregadoCounts":
+        """Count the raw API responses of an aggregate.
+
+        Args:
+            metadados: Raw metadados JSON.
+            periodos: Raw periodos JSON, or their number.
+            localidades: Raw localidades JSON of every level, or the
+                number of localidades per level.
+            pesquisas: Index of the survey ids, which the metadados
+                lack; ``pesquisa_id`` is empty without it.
+        """
+        if not isinstance(periodos, int):
+            periodos = len(periodos)
+        if not isinstance(localidades, dict):
+            localidades = count_localidades(localidades)
+        return cls(
+            agregado_id=metadados["id"],
+            pesquisa_id=_pesquisa_id(metadados["id"], pesquisas),
+            n_periodos=periodos,
+            stat_localidades=localidades,
+            n_variaveis=len(metadados["variaveis"]),
+            n_categorias=[
+                len(classificacao["categorias"])
+                for classificacao in metadados["classificacoes"]
+            ],
+        )
+
+
+def _pesquisa_id(agregado_id: int, pesquisas: PesquisaIndex | None) -> str:
+    pesquisa = None if pesquisas is None else pesquisas.get(agregado_id)
+    return "" if pesquisa is None else pesquisa.id
+
+
+def _niveis(metadados: dict[str, Any]) -> list[str]:
+    nivel_territorial = metadados["nivelTerritorial"]
+    return (
+        nivel_territorial["Administrativo"]
+        + nivel_territorial["Especial"]
+        + nivel_territorial["IBGE"]
+    )
+
+
+def fetch_counts(client: Any, agregado_id: int) -> AgregadoCounts:
+    """Download and count the raw responses of an aggregate.
+
+    The localidades of every level are requested at once, split like
+    :func:`~sidra_fetcher.fetcher.fetch_niveis` does when the API
+    rejects the combined request, and counted from the raw JSON, so no
+    :class:`Localidade` object is built.
+
+    The ``pesquisa_id`` comes from the
+    :class:`~sidra_fetcher.pesquisas.PesquisaIndex` of the client, if it
+    has one.
+
+    Args:
+        client: A :class:`~sidra_fetcher.fetcher.SidraClient`.
+        agregado_id: Aggregate id.
+    """
+    from .fetcher import fetch_niveis
+
+    metadados = client.get(build_url_metadados(agregado_id))
+    periodos = client.get(build_url_periodos(agregado_id))
+    niveis = _niveis(metadados)
+    localidades = (
+        fetch_niveis(
+            lambda n: client.get(build_url_localidades(agregado_id, n)),
+            niveis,
+        )
+        if niveis
+        else []
+    )
+    return AgregadoCounts.from_raw(
+        metadados, periodos, localidades, getattr(client, "pesquisas", None)
+    )
+
+
+async def fetch_counts_async(client: Any, agregado_id: int) -> AgregadoCounts:
+    """Async counterpart of :func:`fetch_counts`.
+
+    Args:
+        client: An :class:`~sidra_fetcher.fetcher.AsyncSidraClient`.
+        agregado_id: Aggregate id.
+    """
+    import asyncio
+
+    from .fetcher import fetch_niveis_async
+
+    metadados, periodos = await asyncio.gather(
+        client.get(build_url_metadados(agregado_id)),
+        client.get(build_url_periodos(agregado_id)),
+    )
+    niveis = _niveis(metadados)
+    localidades = (
+        await fetch_niveis_async(
+            lambda n: client.get(build_url_localidades(agregado_id, n)),
+            niveis,
+        )
+        if niveis
+        else []
+    )
+    return AgregadoCounts.from_raw(
+        metadados, periodos, localidades, getattr(client, "pesquisas", None)
+    )
+
+
+class CountIndex:
+    """Persistent index of :class:`AgregadoCounts` by aggregate id.
+
+    Stored as a JSON file, so a planning service sizes the catalog from
+    the counts of previous runs and only downloads the agregados it has
+    not seen (or that were dropped with :meth:`invalidate`)::
+
+        index = CountIndex("counts.json")
+        for agregado_id in ids:
+            counts = index.get_or_fetch(client, agregado_id)
+            print(calculate_aggregate_counts(counts))
+        index.save()
+
+    Args:
+        path: JSON file of the index; loaded if it exists.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._counts: dict[int, AgregadoCounts] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for item in json.load(f):
+                    counts = AgregadoCounts(**item)
+                    self._counts[counts.agregado_id] = counts
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, agregado_id: int) -> bool:
+        return agregado_id in self._counts
+
+    def __iter__(self) -> Iterator[AgregadoCounts]:
+        return iter(self._counts.values())
+
+    def get(self, agregado_id: int) -> AgregadoCounts | None:
+        """Return the counts of ``agregado_id``, if indexed."""
+        return self._counts.get(agregado_id)
+
+    def put(self, counts: AgregadoCounts) -> None:
+        """Add or replace the counts of an aggregate."""
+        self._counts[counts.agregado_id] = counts
+
+    def invalidate(self, agregado_id: int) -> None:
+        """Drop the counts of ``agregado_id``, if any."""
+        self._counts.pop(agregado_id, None)
+
+    def get_or_fetch(self, client: Any, agregado_id: int) -> AgregadoCounts:
+        """Return the indexed counts, fetching them on a miss."""
+        counts = self._counts.get(agregado_id)
+        if counts is None:
+            counts = fetch_counts(client, agregado_id)
+            self.put(counts)
+        return counts
+
+    async def get_or_fetch_async(
+        self, client: Any, agregado_id: int
+    ) -> AgregadoCounts:
+        """Async counterpart of :meth:`get_or_fetch`."""
+        counts = self._counts.get(agregado_id)
+        if counts is None:
+            counts = await fetch_counts_async(client, agregado_id)
+            self.put(counts)
+        return counts
+
+    def save(self) -> None:
+        """Write the index to :attr:`path`."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(
+                [asdict(counts) for counts in self._counts.values()],
+                f,
+                ensure_ascii=False,
+            )
+
+
+def calculate_aggregate_counts(counts: AgregadoCounts) -> dict[str, Any]:
+    """Calculate size and basic statistics from the counts of an aggregate.
+
+    Args:
+        counts: Counts of the aggregate.
+
+    Returns:
+        The same dictionary as :func:`calculate_aggregate`.
     """
-    stat_localidades = get_stat_localidades(agregado)
+    stat_localidades = dict(counts.stat_localidades)
     n_localidades = sum(stat_localidades.values())
 
     n_niveis_territoriais = len(stat_localidades)
-    n_variaveis = len(agregado.variaveis)
-    n_classificacoes = len(agregado.classificacoes)
-    n_dimensoes = get_n_dimensoes(agregado=agregado)
-    n_periodos = len(agregado.periodos)
+    n_variaveis = counts.n_variaveis
+    n_classificacoes = len(counts.n_categorias)
+    n_dimensoes = math.prod(counts.n_categorias)
+    n_periodos = counts.n_periodos
     period_size = n_localidades * n_variaveis * max(n_dimensoes, 1)
     total_size = period_size * n_periodos
     localidade_size = max(n_variaveis, 1) * max(n_dimensoes, 1)
     variavel_size = max(n_dimensoes, 1)
     return {
-        "pesquisa_id": agregado.pesquisa.id,
-        "agregado_id": agregado.id,
+        "pesquisa_id": counts.pesquisa_id,
+        "agregado_id": counts.agregado_id,
         "stat_localidades": stat_localidades,
         "n_niveis_territoriais": n_niveis_territoriais,
         "n_localidades": n_localidades,
@@ -109,3 +387,124 @@ def calculate_aggregate(agregado: Agregado) -> dict[str, Any]:
         "variavel_size": variavel_size,
         "total_size": total_size,
     }
+
+
+def calculate_aggregate(
+    agregado: Agregado, pesquisas: PesquisaIndex | None = None
+) -> dict[str, Any]:
+    """Calculate size and basic statistics for an aggregate.
+
+    Args:
+        agregado: Aggregate metadata object.
+        pesquisas: Index of the survey ids, used when the pesquisa of
+            ``agregado`` has none, like agregados read without one.
+
+    Returns:
+        A dictionary with counts (localidades, variaveis, classificacoes),
+        dimension and period sizes and estimated total result size.
+    """
+    return calculate_aggregate_counts(
+        AgregadoCounts.from_agregado(agregado, pesquisas)
+    )
+
+
+def _import_numpy():
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError(
+            "calculate_catalog requires numpy, install it with "
+            "`pip install sidra-fetcher[numpy]`"
+        ) from e
+    return np
+
+
+def calculate_catalog(
+    agregados: Iterable[Agregado | AgregadoCounts],
+    pesquisas: PesquisaIndex | None = None,
+) -> dict[str, "np.ndarray"]:
+    """Calculate the statistics of many aggregates as columns.
+
+    The metrics of :func:`calculate_aggregate` are computed with array
+    operations over the whole catalog, e.g. to rank it by size::
+
+        table = calculate_catalog(CountIndex("counts.json"))
+        order = table["total_size"].argsort()[::-1]
+        largest = table["agregado_id"][order[:10]]
+
+    Dimension products of tables with many classifications overflow
+    64 bits. Columns are ``int64`` when every size of the catalog fits,
+    and ``object`` arrays of Python integers otherwise, so sizes are
+    always exact.
+
+    Args:
+        agregados: :class:`Agregado` objects, :class:`AgregadoCounts`
+            or a :class:`CountIndex`.
+        pesquisas: Index of the survey ids, filling the empty
+            ``pesquisa_id`` of the aggregates.
+
+    Returns:
+        A mapping from metric name to a column with one row per
+        aggregate: ``agregado_id``, ``pesquisa_id`` and the numeric
+        metrics of :func:`calculate_aggregate`. ``stat_localidades`` is
+        spread over one ``n_localidades_<nivel>`` column per level.
+    """
+    np = _import_numpy()
+    counts = [
+        c
+        if isinstance(c, AgregadoCounts)
+        else AgregadoCounts.from_agregado(c, pesquisas)
+        for c in agregados
+    ]
+    n = len(counts)
+
+    def column(values: Iterable[int]) -> "np.ndarray":
+        return np.fromiter(values, np.int64, n)
+
+    niveis = sorted({nivel for c in counts for nivel in c.stat_localidades})
+    por_nivel = {
+        nivel: column(c.stat_localidades.get(nivel, 0) for c in counts)
+        for nivel in niveis
+    }
+    n_localidades = column(sum(c.stat_localidades.values()) for c in counts)
+    n_variaveis = column(c.n_variaveis for c in counts)
+    n_classificacoes = column(len(c.n_categorias) for c in counts)
+    n_periodos = column(c.n_periodos for c in counts)
+    dimensoes = [math.prod(c.n_categorias) for c in counts]
+
+    # The product of the maxima bounds every size in the catalog
+    maximo = max(max(dimensoes, default=1), 1)
+    for a in (n_localidades, n_variaveis, n_periodos):
+        maximo *= int(a.max(initial=1))
+    dtype = np.int64 if maximo <= _INT64_MAX else object
+    n_dimensoes = np.array(dimensoes, dtype=dtype)
+    if dtype is object:
+        n_localidades, n_variaveis, n_periodos = (
+            np.array(a.tolist(), dtype=object)
+            for a in (n_localidades, n_variaveis, n_periodos)
+        )
+    variavel_size = np.maximum(n_dimensoes, 1)
+    period_size = n_localidades * n_variaveis * variavel_size
+    return {
+        "pesquisa_id": np.array(
+            [
+                c.pesquisa_id or _pesquisa_id(c.agregado_id, pesquisas)
+                for c in counts
+            ],
+            object,
+        ),
+        "agregado_id": column(c.agregado_id for c in counts),
+        "n_niveis_territoriais": column(
+            len(c.stat_localidades) for c in counts
+        ),
+        "n_localidades": n_localidades,
+        **{f"n_localidades_{nivel}": a for nivel, a in por_nivel.items()},
+        "n_variaveis": n_variaveis,
+        "n_classificacoes": n_classificacoes,
+        "n_dimensoes": n_dimensoes,
+        "n_periodos": n_periodos,
+        "period_size": period_size,
+        "localidade_size": np.maximum(n_variaveis, 1) * variavel_size,
+        "variavel_size": variavel_size,
+        "total_size": period_size * n_periodos,
+    }
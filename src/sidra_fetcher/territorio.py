@@ -0,0 +1,361 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Territorial hierarchy of Brazil: N1 > N2 > N3 > N6.
+
+IBGE codes are hierarchical: a municipality (N6) code starts with the
+code of its state (N3), whose first digit is the code of its region
+(N2). :class:`TerritorioIndex` derives the parent of each localidade
+from its code and stores the tree in flat arrays, ordered so that the
+children of every node, and its descendants at any level below, are a
+contiguous range of positions::
+
+    indice = TerritorioIndex.from_localidades(
+        client.get_agregado_localidades(1705, "N6")
+    )
+    indice.parent("N6", "3550308")            # ("N3", "35")
+    indice.descendants("N2", "3", "N6")       # Every municipality of SE
+
+Brazil, the regions and the states are bundled, so only the
+municipalities come from the API.
+
+The index also rewrites :class:`~sidra_fetcher.sidra.Parametro`
+selections into the shortest equivalent form: a selection of every
+municipality of states 33 and 35 becomes ``/n6/in n3 33,35`` instead of
+thousands of ids in the URL. The rewrite is only correct when the index
+holds every localidade of the agregado queried at the selected level.
+"""
+
+import json
+from array import array
+from pathlib import Path
+from typing import Any, Iterable
+
+from . import logger
+from .agregados import Localidade
+from .sidra import Parametro
+
+# Levels of the hierarchy, from the root, and their names
+NIVEIS = {
+    "N1": "Brasil",
+    "N2": "Grande Região",
+    "N3": "Unidade da Federação",
+    "N6": "Município",
+}
+
+_ORDEM = tuple(NIVEIS)
+
+# Length of the code prefix of the parent of each level
+_PREFIXO = {"N2": 0, "N3": 1, "N6": 2}
+
+REGIOES = {
+    "1": "Norte",
+    "2": "Nordeste",
+    "3": "Sudeste",
+    "4": "Sul",
+    "5": "Centro-Oeste",
+}
+
+UFS = {
+    "11": "Rondônia",
+    "12": "Acre",
+    "13": "Amazonas",
+    "14": "Roraima",
+    "15": "Pará",
+    "16": "Amapá",
+    "17": "Tocantins",
+    "21": "Maranhão",
+    "22": "Piauí",
+    "23": "Ceará",
+    "24": "Rio Grande do Norte",
+    "25": "Paraíba",
+    "26": "Pernambuco",
+    "27": "Alagoas",
+    "28": "Sergipe",
+    "29": "Bahia",
+    "31": "Minas Gerais",
+    "32": "Espírito Santo",
+    "33": "Rio de Janeiro",
+    "35": "São Paulo",
+    "41": "Paraná",
+    "42": "Santa Catarina",
+    "43": "Rio Grande do Sul",
+    "50": "Mato Grosso do Sul",
+    "51": "Mato Grosso",
+    "52": "Goiás",
+    "53": "Distrito Federal",
+}
+
+
+def _bundled() -> list[tuple[str, str, str]]:
+    return [
+        ("N1", "1", "Brasil"),
+        *(("N2", id_, nome) for id_, nome in REGIOES.items()),
+        *(("N3", id_, nome) for id_, nome in UFS.items()),
+    ]
+
+
+def _parent_id(nivel: str, id_: str) -> str:
+    if nivel == "N2":
+        return "1"
+    return id_[: _PREFIXO[nivel]]
+
+
+class TerritorioIndex:
+    """Array-backed tree of the localidades of levels N1, N2, N3 and N6.
+
+    Nodes are stored level by level, each level sorted by the position
+    of the parent, then by id. Parent lookups are one array access, and
+    the descendants of a node at any level are the positions
+    ``range(*indice.span(nivel, id, nivel_alvo))``.
+
+    Build it with :meth:`from_localidades` or :meth:`load`.
+
+    Attributes:
+        niveis: Level of each position, as an index of :data:`NIVEIS`.
+        ids: Localidade id of each position.
+        nomes: Localidade name of each position.
+        pais: Position of the parent of each position, ``-1`` for N1.
+        inicio: First position of the children of each position.
+        fim: Position after the last child of each position.
+    """
+
+    def __init__(self, localidades: Iterable[tuple[str, str, str]]) -> None:
+        por_nivel: list[dict[str, str]] = [{} for _ in _ORDEM]
+        for nivel, id_, nome in localidades:
+            if nivel not in NIVEIS:
+                logger.debug(f"Skipping localidade {id_} of level {nivel}")
+                continue
+            por_nivel[_ORDEM.index(nivel)][id_] = nome
+
+        # Parents missing from the localidades are added without a name
+        for profundidade in range(len(_ORDEM) - 1, 0, -1):
+            nivel = _ORDEM[profundidade]
+            for id_ in list(por_nivel[profundidade]):
+                pai = _parent_id(nivel, id_)
+                por_nivel[profundidade - 1].setdefault(pai, "")
+
+        self.niveis = array("b")
+        self.ids: list[str] = []
+        self.nomes: list[str] = []
+        self.pais = array("i")
+        self._posicao: dict[tuple[str, str], int] = {}
+        self._limites = [0]
+        for profundidade, nivel in enumerate(_ORDEM):
+            itens = []
+            for id_, nome in por_nivel[profundidade].items():
+                if profundidade == 0:
+                    pai = -1
+                else:
+                    chave = (_ORDEM[profundidade - 1], _parent_id(nivel, id_))
+                    pai = self._posicao[chave]
+                itens.append((pai, id_, nome))
+            for pai, id_, nome in sorted(itens):
+                self._posicao[(nivel, id_)] = len(self.ids)
+                self.niveis.append(profundidade)
+                self.ids.append(id_)
+                self.nomes.append(nome)
+                self.pais.append(pai)
+            self._limites.append(len(self.ids))
+
+        # Children follow the order of their parents, so each parent's
+        # children start where the previous parent's end
+        n = len(self.ids)
+        contagem = array("i", [0] * n)
+        for pai in self.pais:
+            if pai >= 0:
+                contagem[pai] += 1
+        self.inicio = array("i", [0] * n)
+        self.fim = array("i", [0] * n)
+        for profundidade in range(len(_ORDEM)):
+            cursor = self._limites[profundidade + 1]
+            for posicao in range(*self._level(profundidade)):
+                self.inicio[posicao] = cursor
+                cursor += contagem[posicao]
+                self.fim[posicao] = cursor
+
+    @classmethod
+    def from_localidades(
+        cls, localidades: Iterable[Localidade | dict[str, Any]]
+    ) -> "TerritorioIndex":
+        """Build the index from localidades and the bundled upper levels.
+
+        Args:
+            localidades: :class:`~sidra_fetcher.agregados.Localidade`
+                objects or raw localidades payloads. Levels other than
+                N1, N2, N3 and N6 are ignored.
+        """
+        itens = _bundled()
+        for loc in localidades:
+            if isinstance(loc, dict):
+                itens.append((loc["nivel"]["id"], loc["id"], loc["nome"]))
+            else:
+                itens.append((loc.nivel.id, loc.id, loc.nome))
+        return cls(itens)
+
+    @classmethod
+    def load(cls, path: Path | str) -> "TerritorioIndex":
+        """Load an index saved with :meth:`save`."""
+        with open(path, encoding="utf-8") as f:
+            return cls.from_localidades(json.load(f))
+
+    def save(self, path: Path | str) -> None:
+        """Save the index as a localidades payload."""
+        data = [
+            {
+                "id": id_,
+                "nome": nome,
+                "nivel": {"id": nivel, "nome": NIVEIS[nivel]},
+            }
+            for nivel, id_, nome in self
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self):
+        for posicao, id_ in enumerate(self.ids):
+            yield _ORDEM[self.niveis[posicao]], id_, self.nomes[posicao]
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._posicao
+
+    def _level(self, profundidade: int) -> tuple[int, int]:
+        return self._limites[profundidade], self._limites[profundidade + 1]
+
+    def position(self, nivel: str, id_: str) -> int:
+        """Return the position of a localidade.
+
+        Raises:
+            KeyError: If the localidade is not in the index.
+        """
+        return self._posicao[(nivel, id_)]
+
+    def nome(self, nivel: str, id_: str) -> str:
+        """Return the name of a localidade."""
+        return self.nomes[self.position(nivel, id_)]
+
+    def ids_of(self, nivel: str) -> list[str]:
+        """Return the ids of every localidade of ``nivel``."""
+        return self.ids[slice(*self._level(_ORDEM.index(nivel)))]
+
+    def parent(self, nivel: str, id_: str) -> tuple[str, str] | None:
+        """Return ``(nivel, id)`` of the parent, ``None`` for N1."""
+        pai = self.pais[self.position(nivel, id_)]
+        if pai < 0:
+            return None
+        return _ORDEM[self.niveis[pai]], self.ids[pai]
+
+    def children(self, nivel: str, id_: str) -> list[str]:
+        """Return the ids of the children of a localidade."""
+        posicao = self.position(nivel, id_)
+        return self.ids[self.inicio[posicao] : self.fim[posicao]]
+
+    def span(self, nivel: str, id_: str, nivel_alvo: str) -> tuple[int, int]:
+        """Return the range of positions of the descendants at a level.
+
+        Raises:
+            ValueError: If ``nivel_alvo`` is not below ``nivel``.
+        """
+        return self._span(self.position(nivel, id_), nivel_alvo)
+
+    def _span(self, posicao: int, nivel_alvo: str) -> tuple[int, int]:
+        alvo = _ORDEM.index(nivel_alvo)
+        if alvo < self.niveis[posicao]:
+            nivel = _ORDEM[self.niveis[posicao]]
+            raise ValueError(f"{nivel_alvo} is not below {nivel}")
+        inicio = fim = posicao
+        fim += 1
+        for _ in range(self.niveis[posicao], alvo):
+            if inicio == fim:
+                break
+            inicio, fim = self.inicio[inicio], self.fim[fim - 1]
+        return inicio, fim
+
+    def descendants(self, nivel: str, id_: str, nivel_alvo: str) -> list[str]:
+        """Return the ids of the descendants of a localidade at a level."""
+        return self.ids[slice(*self.span(nivel, id_, nivel_alvo))]
+
+    def ancestor(self, nivel: str, id_: str, nivel_alvo: str) -> str:
+        """Return the id of the ancestor of a localidade at a level."""
+        return self.ids[self._ancestor(self.position(nivel, id_), nivel_alvo)]
+
+    def _ancestor(self, posicao: int, nivel_alvo: str) -> int:
+        alvo = _ORDEM.index(nivel_alvo)
+        if alvo > self.niveis[posicao]:
+            nivel = _ORDEM[self.niveis[posicao]]
+            raise ValueError(f"{nivel_alvo} is not above {nivel}")
+        for _ in range(alvo, self.niveis[posicao]):
+            posicao = self.pais[posicao]
+        return posicao
+
+    def ancestors(
+        self, nivel: str, ids: Iterable[str], nivel_alvo: str
+    ) -> list[str]:
+        """Return the ancestor at ``nivel_alvo`` of each of ``ids``."""
+        return [self.ancestor(nivel, id_, nivel_alvo) for id_ in ids]
+
+    def rewrite(self, nivel: str, ids: list[str]) -> list[str]:
+        """Return the shortest selection equivalent to ``ids``.
+
+        The candidates are the ids themselves, ``["all"]`` and, for
+        each level above ``nivel`` whose localidades have all their
+        descendants selected, ``["in n<level> <ids>"]``. Selections with
+        localidades missing from the index are returned unchanged.
+
+        Args:
+            nivel: Level of the selection, like ``"N6"``.
+            ids: Selected localidade ids.
+        """
+        if nivel not in NIVEIS or not ids or ids == ["all"]:
+            return ids
+        try:
+            posicoes = {self.position(nivel, id_) for id_ in ids}
+        except KeyError:
+            return ids
+
+        candidatos = [ids]
+        for acima in _ORDEM[: _ORDEM.index(nivel)]:
+            ancestrais = sorted({self._ancestor(p, acima) for p in posicoes})
+            n = sum(
+                fim - inicio
+                for inicio, fim in (self._span(a, nivel) for a in ancestrais)
+            )
+            if n != len(posicoes):
+                continue
+            if acima == "N1":
+                candidatos.append(["all"])
+            else:
+                selecao = ",".join(self.ids[a] for a in ancestrais)
+                candidatos.append([f"in%20n{acima[1:]}%20{selecao}"])
+        return min(candidatos, key=lambda c: len(",".join(c)))
+
+
+def rewrite_parametro(
+    parametro: Parametro, indice: TerritorioIndex
+) -> Parametro:
+    """Return ``parametro`` with its localidades selected most briefly.
+
+    Each ``/n`` segment is replaced by :meth:`TerritorioIndex.rewrite`,
+    e.g. the ids of every municipality of Rio de Janeiro and São Paulo
+    by ``in n3 33,35``.
+    """
+    territorios = {
+        nivel: indice.rewrite(f"N{nivel}", ids)
+        for nivel, ids in parametro.territorios.items()
+    }
+    return parametro.assign("territorios", territorios)
@@ -0,0 +1,255 @@
+# Copyright (C) 2022-2026 Daniel Kiyoyudi Komesu
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Helpers to read and decode SIDRA ``/values`` responses.
+
+SIDRA returns a JSON list of flat string dictionaries. With the header
+enabled (``/h/y``) the first row maps each key (``NC``, ``NN``, ``MC``,
+``MN``, ``V``, ``D1C``, ``D1N``, ...) to its label. Values in the ``V``
+field are strings and may be one of the special symbols below instead
+of a number:
+
+=====  =========================================================
+``-``  Zero absoluto, não resultante de arredondamento
+``..`` Não se aplica dado numérico
+``...`` Dado numérico não disponível
+``X``  Dado numérico omitido a fim de evitar a individualização
+=====  =========================================================
+
+Decoding a whole response with :func:`decode_values` or
+:func:`decode_rows` happens in one batched NumPy pass and returns a
+``float64`` array of values and an ``int8`` array of :class:`Status`
+codes. NumPy is an optional dependency
+(``pip install sidra-fetcher[numpy]``).
+
+References:
+- https://apisidra.ibge.gov.br/home/ajuda
+"""
+
+import gzip
+import json
+import math
+from enum import IntEnum
+from itertools import repeat
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Sequence
+
+from .sidra import Parametro, Precisao
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class Status(IntEnum):
+    """Status of a decoded SIDRA value."""
+
+    OK = 0  # Numeric value
+    ZERO = 1  # "-": absolute zero, decoded as 0.0
+    NAO_SE_APLICA = 2  # "..": not applicable
+    NAO_DISPONIVEL = 3  # "...": not available
+    SIGILO = 4  # "X": suppressed to avoid identification
+    INVALIDO = 5  # Anything else that is not a number
+
+
+SIMBOLOS: dict[str, Status] = {
+    "-": Status.ZERO,
+    "..": Status.NAO_SE_APLICA,
+    "...": Status.NAO_DISPONIVEL,
+    "X": Status.SIGILO,
+}
+
+# Lookup tables of decode_values
+_STATUS: dict[str | None, Status] = {**SIMBOLOS, None: Status.INVALIDO}
+_NUMEROS: dict[str | None, str] = {
+    simbolo: "0" if status is Status.ZERO else "nan"
+    for simbolo, status in _STATUS.items()
+}
+
+
+def decode_value(value: str | None) -> tuple[float, Status]:
+    """Decode one ``V`` field into ``(number, status)``.
+
+    Numbers come back with :attr:`Status.OK`, ``"-"`` as ``0.0`` with
+    :attr:`Status.ZERO`, and every other symbol as ``nan`` with its
+    status.
+    """
+    if value is None:
+        return math.nan, Status.INVALIDO
+    status = SIMBOLOS.get(value)
+    if status is Status.ZERO:
+        return 0.0, status
+    if status is not None:
+        return math.nan, status
+    try:
+        return float(value), Status.OK
+    except ValueError:
+        return math.nan, Status.INVALIDO
+
+
+def split_header(
+    rows: list[dict[str, str]],
+) -> tuple[dict[str, str], list[dict[str, str]]]:
+    """Separate the header row from the data rows.
+
+    Returns ``(header, data)``. When the response has no header
+    (requested with ``/h/n``), ``header`` maps every key to itself.
+    """
+    if not rows:
+        return {}, []
+    first = rows[0]
+    if first.get("V") == "Valor":
+        return first, rows[1:]
+    return {key: key for key in first}, rows
+
+
+def read_values(path: str | Path) -> list[dict[str, str]]:
+    """Read a ``/values`` file written by ``download_values``.
+
+    Handles the ``.json``, ``.json.gz`` and ``.json.zst`` formats.
+    """
+    path = Path(path)
+    if path.name.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            return json.load(f)
+    if path.name.endswith(".zst"):
+        return json.loads(_read_zstd(path))
+    with open(path, "rb") as f:
+        return json.load(f)
+
+
+def _read_zstd(path: Path) -> Any:
+    try:
+        from compression import zstd  # Python >= 3.14
+    except ImportError:
+        import zstandard
+
+        with open(path, "rb") as f:
+            return zstandard.ZstdDecompressor().stream_reader(f).read()
+    with zstd.open(path, "rb") as f:
+        return f.read()
+
+
+def _import_numpy():
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError(
+            "Vectorized decoding requires numpy, install it with "
+            "`pip install sidra-fetcher[numpy]`"
+        ) from e
+    return np
+
+
+def casas_decimais(precisao: Precisao) -> int | None:
+    """Return the number of decimals of ``precisao``.
+
+    ``None`` for :attr:`Precisao.S` and :attr:`Precisao.M`, whose number
+    of decimals depends on the variable.
+    """
+    if precisao in (Precisao.S, Precisao.M):
+        return None
+    return int(precisao.value)
+
+
+def decode_values(
+    valores: Sequence[str | None],
+    decimais: int | None = None,
+) -> tuple["np.ndarray", "np.ndarray"]:
+    """Decode a sequence of ``V`` fields in one batched pass.
+
+    Same rules as :func:`decode_value`, without a Python call per value:
+    symbols are looked up and numbers parsed by C-level ``map`` loops
+    feeding NumPy arrays directly.
+
+    Args:
+        valores: The ``V`` fields.
+        decimais: Number of decimals requested with ``/d``; values are
+            rounded to it so they compare equal to the published figures.
+
+    Returns:
+        ``(values, status)``: a ``float64`` array and an ``int8`` array of
+        :class:`Status` codes.
+    """
+    np = _import_numpy()
+    n = len(valores)
+    status = np.fromiter(
+        map(_STATUS.get, valores, repeat(Status.OK)), np.int8, n
+    )
+    try:
+        numeros = np.fromiter(
+            map(float, map(_NUMEROS.get, valores, valores)), np.float64, n
+        )
+    except ValueError:
+        # Some unexpected string: decode the values one by one
+        decoded = [decode_value(v) for v in valores]
+        numeros = np.fromiter((v for v, _ in decoded), np.float64, n)
+        status = np.fromiter((s for _, s in decoded), np.int8, n)
+    if decimais is not None:
+        np.round(numeros, decimais, out=numeros)
+    return numeros, status
+
+
+def _variavel_key(header: dict[str, str]) -> str | None:
+    for key, label in header.items():
+        if key.startswith("D") and label == "Variável (Código)":
+            return key
+    return None
+
+
+def decode_rows(
+    rows: list[dict[str, str]],
+    parametro: Parametro | None = None,
+) -> tuple["np.ndarray", "np.ndarray"]:
+    """Decode the ``V`` column of a ``/values`` response.
+
+    Args:
+        rows: Rows as returned by ``get_values``, with or without the
+            header row.
+        parametro: The request that produced ``rows``. Its ``decimais``
+            set the rounding of each variable; per-variable precisions
+            need the header row to find the variable column.
+
+    Returns:
+        ``(values, status)``, see :func:`decode_values`.
+    """
+    np = _import_numpy()
+    header, data = split_header(rows)
+    valores = [row.get("V") for row in data]
+    decimais = {} if parametro is None else parametro.decimais
+    geral = casas_decimais(decimais.get("", Precisao.M))
+    # Round only once the precision of each value is known: rounding to
+    # the general decimals first would lose the digits of a variable
+    # asking for more.
+    numeros, status = decode_values(valores)
+
+    por_variavel = {
+        variavel: casas_decimais(precisao)
+        for variavel, precisao in decimais.items()
+        if variavel
+    }
+    key = _variavel_key(header)
+    if por_variavel and key is not None:
+        variaveis = np.asarray([row.get(key) for row in data], dtype=object)
+        resto = np.ones(len(data), dtype=bool)
+        for variavel, casas in por_variavel.items():
+            mask = variaveis == variavel
+            resto &= ~mask
+            if casas is not None:
+                numeros[mask] = np.round(numeros[mask], casas)
+        if geral is not None:
+            numeros[resto] = np.round(numeros[resto], geral)
+    elif geral is not None:
+        np.round(numeros, geral, out=numeros)
+    return numeros, status
@@ -0,0 +1,134 @@
+"""Real clients answered in-process by a MockIBGE app, shared by tests."""
+
+import re
+from urllib.parse import parse_qs
+
+from sidra_fetcher.fetcher import AsyncSidraClient, SidraClient
+from sidra_fetcher.instrumentation import EventType
+from sidra_fetcher.mock import MockIBGE
+
+
+class CatalogIBGE(MockIBGE):
+    """MockIBGE serving a given catalog instead of the synthetic one.
+
+    Args:
+        acervos: Items listed by each ``?acervo=``.
+        agregados: Agregado ids of each ``(filter, value)`` of the
+            agregados index; ``None`` is the unfiltered index.
+        metadados: Function changing the metadados payload of each
+            agregado id.
+    """
+
+    def __init__(
+        self, acervos=None, agregados=None, metadados=None, config=None
+    ):
+        super().__init__(config)
+        self.acervos = acervos or {}
+        self.agregados = agregados or {}
+        self.metadados = metadados or {}
+
+    def route(self, path, query=""):
+        endpoint, payload = super().route(path, query)
+        filtros = {k: v[0] for k, v in parse_qs(query).items()}
+        if endpoint == "acervo":
+            payload = self.acervos.get(filtros["acervo"], [])
+        elif endpoint == "agregados" and (filtros or None in self.agregados):
+            [filtro] = filtros.items() or [None]
+            ids = self.agregados.get(filtro, [])
+            payload = [
+                {
+                    "id": "P",
+                    "nome": "Pesquisa",
+                    "agregados": [{"id": i, "nome": str(i)} for i in ids],
+                }
+            ]
+        elif endpoint == "metadados" and payload["id"] in self.metadados:
+            self.metadados[payload["id"]](payload)
+        return endpoint, payload
+
+
+class _Recorder:
+    """Record the requests of a client and fail the chosen calls.
+
+    Attributes:
+        app: The app answering the client.
+        urls: URLs requested, in order.
+        calls: Agregados and values asked for, in order.
+        peak: Most requests in flight at once.
+    """
+
+    def _setup(self, app, fail, fail_downloads):
+        self.app = app
+        self.fail = set(fail)
+        self.fail_downloads = fail_downloads
+        self.urls = []
+        self.calls = []
+        self.running = self.peak = 0
+        self.instrumentation.add_hook(self._record)
+
+    def _record(self, event):
+        if event.type is EventType.REQUEST_START:
+            self.urls.append(event.url)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        elif event.type is EventType.REQUEST_END:
+            self.running -= 1
+
+    def requested(self, endpoint):
+        """Return the agregado ids requested from ``endpoint``, in order."""
+        pattern = re.compile(rf"/agregados/(\d+)/{endpoint}\b")
+        return [
+            int(m.group(1))
+            for m in map(pattern.search, self.urls)
+            if m is not None
+        ]
+
+    def _agregado(self, agregado_id):
+        self.calls.append(agregado_id)
+        if agregado_id in self.fail:
+            raise ConnectionError("boom")
+
+    def _download(self, parametro):
+        self.calls.append(str(parametro))
+        if self.fail_downloads:
+            self.fail_downloads -= 1
+            raise ConnectionError("boom")
+
+
+class MockClient(_Recorder, SidraClient):
+    """:class:`SidraClient` answered by ``app``.
+
+    ``get_agregado`` raises :class:`ConnectionError` for the ids in
+    ``fail``, and ``download_values`` for its first ``fail_downloads``
+    calls.
+    """
+
+    def __init__(self, app=None, fail=(), fail_downloads=0, **kwargs):
+        app = app or MockIBGE()
+        super().__init__(transport=app.transport(), **kwargs)
+        self._setup(app, fail, fail_downloads)
+
+    def get_agregado(self, agregado_id, *args, **kwargs):
+        self._agregado(agregado_id)
+        return super().get_agregado(agregado_id, *args, **kwargs)
+
+    def download_values(self, parametro, *args, **kwargs):
+        self._download(parametro)
+        return super().download_values(parametro, *args, **kwargs)
+
+
+class AsyncMockClient(_Recorder, AsyncSidraClient):
+    """Async counterpart of :class:`MockClient`."""
+
+    def __init__(self, app=None, fail=(), fail_downloads=0, **kwargs):
+        app = app or MockIBGE()
+        super().__init__(transport=app.async_transport(), **kwargs)
+        self._setup(app, fail, fail_downloads)
+
+    async def get_agregado(self, agregado_id, *args, **kwargs):
+        self._agregado(agregado_id)
+        return await super().get_agregado(agregado_id, *args, **kwargs)
+
+    async def download_values(self, parametro, *args, **kwargs):
+        self._download(parametro)
+        return await super().download_values(parametro, *args, **kwargs)
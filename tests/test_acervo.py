@@ -0,0 +1,164 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from clients import AsyncMockClient, CatalogIBGE, MockClient
+
+from sidra_fetcher.acervo import AcervoIndex
+from sidra_fetcher.agregados import AcervoEnum, build_url_agregados
+from sidra_fetcher.mock import build_metadados
+from sidra_fetcher.reader import read_acervo, read_metadados
+
+ACERVOS = {
+    "A": [{"id": 70, "literals": ["Benchmark"]}],
+    "C": [
+        {"id": 100, "literals": ["Classificação 0"]},
+        {"id": 101, "literals": ["Classificação 1"]},
+    ],
+    "V": [{"id": 1000, "literals": ["Variável 0"]}],
+}
+AGREGADOS = {
+    ("assunto", "70"): [1, 2],
+    ("classificacao", "100"): [1, 2, 3],
+    ("classificacao", "101"): [2],
+}
+
+
+def catalog():
+    return CatalogIBGE(
+        acervos={k: list(v) for k, v in ACERVOS.items()}, agregados=AGREGADOS
+    )
+
+
+class TestAcervoIndex(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.index = AcervoIndex(clock=lambda: self.now)
+        self.client = MockClient(catalog())
+
+    def filtered(self):
+        """Return the agregados index URLs requested by the index."""
+        return [url for url in self.client.urls if "acervo=" not in url]
+
+    def test_refresh_is_incremental(self):
+        n = self.index.refresh(self.client)
+        self.assertEqual(n, 3)
+        self.assertEqual(
+            self.index.agregados(AcervoEnum.CLASSIFICACAO, 100), {1, 2, 3}
+        )
+        self.assertEqual(
+            self.index.agregados(AcervoEnum.ASSUNTO, "70"), {1, 2}
+        )
+        self.assertEqual(
+            self.index.item(AcervoEnum.VARIAVEL, "1000").nome, "Variável 0"
+        )
+        # Variables cannot be filtered
+        self.assertFalse(any("variavel=" in url for url in self.filtered()))
+
+        self.client.app.acervos["C"].append({"id": 102, "literals": ["Nova"]})
+        self.assertEqual(self.index.refresh(self.client), 1)
+        self.assertTrue(self.filtered()[-1].endswith("?classificacao=102"))
+
+        self.now += 100
+        self.assertEqual(self.index.refresh(self.client, max_age=50), 4)
+
+    def test_removed_items(self):
+        self.index.refresh(self.client)
+        del self.client.app.acervos["C"][0]
+        self.index.refresh(self.client, [AcervoEnum.CLASSIFICACAO])
+        self.assertEqual(
+            self.index.agregados(AcervoEnum.CLASSIFICACAO, 100), set()
+        )
+        self.assertNotIn(3, self.index)
+        self.assertEqual(
+            self.index.keys(2),
+            {(AcervoEnum.ASSUNTO, "70"), (AcervoEnum.CLASSIFICACAO, "101")},
+        )
+
+    def test_add_agregado(self):
+        self.index.refresh(self.client, [AcervoEnum.ASSUNTO])
+        agregado = read_metadados(build_metadados(9, ["N1", "N6"]))
+        self.index.add_agregado(agregado)
+        self.assertEqual(self.index.agregados(AcervoEnum.VARIAVEL, 1003), {9})
+        self.assertEqual(
+            self.index.agregados(AcervoEnum.NIVELTERRITORIAL, "N6"), {9}
+        )
+        self.assertIn(9, self.index.agregados(AcervoEnum.ASSUNTO, 70))
+
+        agregado.variaveis = agregado.variaveis[:1]
+        self.index.add_agregado(agregado)
+        self.assertEqual(
+            self.index.agregados(AcervoEnum.VARIAVEL, 1003), set()
+        )
+        self.index.remove_agregado(9)
+        self.assertNotIn(9, self.index)
+
+    def test_save_and_load(self):
+        self.index.refresh(self.client)
+        self.index.add_agregado(read_metadados(build_metadados(9, ["N1"])))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "acervos.json"
+            self.index.save(path)
+            loaded = AcervoIndex(path, clock=lambda: self.now)
+        for acervo in AcervoEnum:
+            self.assertEqual(loaded.items(acervo), self.index.items(acervo))
+        self.assertEqual(loaded.keys(9), self.index.keys(9))
+        self.assertEqual(loaded.refresh(self.client), 0)
+
+    def test_async_refresh(self):
+        client = AsyncMockClient(catalog())
+        self.assertEqual(asyncio.run(self.index.refresh_async(client)), 3)
+        self.assertEqual(
+            self.index.agregados(AcervoEnum.CLASSIFICACAO, 101), {2}
+        )
+
+    def test_async_refresh_keeps_completed(self):
+        client = AsyncMockClient(catalog())
+        ativos = []
+        get = client.get_indice_pesquisas_agregados
+
+        async def bounded(filtros=None):
+            ativos.append(filtros)
+            self.assertLessEqual(len(ativos), 2)
+            try:
+                if filtros == {"classificacao": "100"}:
+                    raise ConnectionError(filtros)
+                return await get(filtros)
+            finally:
+                ativos.remove(filtros)
+
+        client.get_indice_pesquisas_agregados = bounded
+        with self.assertRaises(ConnectionError):
+            asyncio.run(self.index.refresh_async(client, max_concurrency=2))
+        self.assertEqual(
+            self.index.agregados(AcervoEnum.CLASSIFICACAO, 101), {2}
+        )
+        self.assertEqual(self.index.agregados(AcervoEnum.ASSUNTO, 70), {1, 2})
+
+        client.get_indice_pesquisas_agregados = get
+        self.assertEqual(asyncio.run(self.index.refresh_async(client)), 1)
+
+    def test_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "acervos.json"
+            index = AcervoIndex(path, clock=lambda: self.now)
+            index.refresh(self.client, checkpoint=2)
+            self.assertEqual(AcervoIndex(path).refresh(self.client), 1)
+
+
+class TestAcervoModels(unittest.TestCase):
+    def test_read_acervo(self):
+        [item] = read_acervo([{"id": 93, "literals": ["População"]}])
+        self.assertEqual((item.id, item.nome), ("93", "População"))
+
+    def test_build_url_agregados(self):
+        self.assertTrue(
+            build_url_agregados({"classificacao": "12896"}).endswith(
+                "/agregados?classificacao=12896"
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,24 @@
+import asyncio
+import tempfile
 import unittest
+from dataclasses import replace
+from pathlib import Path
+
+from clients import AsyncMockClient, MockClient
 
 from sidra_fetcher.agregados import (
     AcervoEnum,
+    LazyAgregado,
     build_url_acervos,
     build_url_agregados,
     build_url_localidades,
     build_url_metadados,
     build_url_periodos,
 )
+from sidra_fetcher.cache import ObjectCache
+from sidra_fetcher.diff import SnapshotLog
+from sidra_fetcher.mock import MockConfig, MockIBGE
+from sidra_fetcher.reader import load_agregado, save_agregado
 
 BASE_URL = "https://servicodados.ibge.gov.br/api/v3/agregados"
 
@@ -40,5 +51,99 @@ class TestAgregados(unittest.TestCase):
             self.assertTrue(url.startswith(BASE_URL))
 
 
+class TestLazyAgregado(unittest.TestCase):
+    def setUp(self):
+        self.app = MockIBGE(MockConfig(niveis=["N1", "N3", "N6"]))
+        self.client = MockClient(self.app)
+        metadados = self.client.get_agregado_metadados(1705)
+        self.app.requests.clear()
+        self.agregado = LazyAgregado(metadados, self.client)
+
+    def test_loads_on_first_access(self):
+        agregado = self.agregado
+        self.assertEqual(agregado.variaveis[0].id, 1000)
+        self.assertEqual(sum(self.app.requests.values()), 0)
+
+        n3 = agregado.localidades_nivel("N3")
+        self.assertTrue(all(loc.nivel.id == "N3" for loc in n3))
+        self.assertEqual(self.app.requests["localidades"], 1)
+
+        localidades = agregado.localidades
+        self.assertEqual(agregado.localidades, localidades)
+        self.assertEqual(self.app.requests["localidades"], 3)
+        self.assertIs(agregado.periodos, agregado.periodos)
+        self.assertEqual(self.app.requests["periodos"], 1)
+
+    def test_counts_without_loading(self):
+        self.assertEqual(self.agregado.n_periodos(), 300)
+        stat = self.agregado.stat_localidades()
+        self.assertEqual(list(stat), ["N1", "N3", "N6"])
+        self.assertNotIn("periodos_loaded=True", repr(self.agregado))
+        self.assertEqual(self.agregado._localidades, {})
+
+    def test_setters(self):
+        localidades = self.client.get_agregado_localidades(1705, "N1")
+        self.agregado.localidades = localidades
+        self.agregado.periodos = []
+        self.assertEqual(self.agregado.localidades, localidades)
+        self.assertEqual(self.agregado.n_periodos(), 0)
+        self.assertEqual(sum(self.app.requests.values()), 1)
+
+    def test_dataclass_machinery(self):
+        agregado = self.agregado
+        self.assertEqual(agregado, LazyAgregado(agregado, self.client))
+        self.assertNotIn("periodos_loaded=True", repr(agregado))
+        self.assertEqual(sum(self.app.requests.values()), 0)
+
+        copia = replace(agregado, nome="Outro")
+        self.assertIsInstance(copia, LazyAgregado)
+        self.assertIs(copia.client, self.client)
+        self.assertNotEqual(copia, agregado)
+        self.assertEqual(len(copia.periodos), 300)
+        self.assertEqual(self.app.requests["periodos"], 1)
+
+    def test_save_and_snapshot_load_everything(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "1705.json"
+            save_agregado(self.agregado, path)
+            saved = load_agregado(path)
+            log = SnapshotLog(Path(tmp) / "log.jsonl")
+            log.append(LazyAgregado(saved, self.client))
+            latest = log.latest(1705)
+        self.assertEqual(len(saved.periodos), 300)
+        self.assertEqual(saved.localidades, self.agregado.localidades)
+        self.assertEqual(latest.periodos, saved.periodos)
+
+        async_client = AsyncMockClient(self.app)
+        with self.assertRaises(RuntimeError):
+            LazyAgregado(saved, async_client).asdict()
+
+    def test_counts_through_cache(self):
+        self.client.cache = ObjectCache()
+        self.assertEqual(self.agregado.n_periodos(), 300)
+        self.agregado.stat_localidades()
+        self.assertIsNotNone(self.agregado._periodos)
+        self.assertEqual(self.agregado._n_localidades, {})
+        self.assertEqual(self.app.requests["localidades"], 3)
+
+    def test_async_client(self):
+        client = AsyncMockClient(self.app)
+        agregado = LazyAgregado(self.agregado, client)
+        with self.assertRaises(RuntimeError):
+            agregado.periodos
+
+        async def load():
+            await agregado.fetch_counts()
+            await agregado.fetch_localidades("N3")
+            await agregado.fetch_periodos()
+
+        asyncio.run(load())
+        self.assertEqual(agregado.n_periodos(), len(agregado.periodos))
+        self.assertEqual(
+            agregado.stat_localidades()["N3"],
+            len(agregado.localidades_nivel("N3")),
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
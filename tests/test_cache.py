@@ -0,0 +1,126 @@
+import asyncio
+import unittest
+
+from sidra_fetcher.cache import ObjectCache, cached, estimate_size
+from sidra_fetcher.instrumentation import EventType, Instrumentation
+from sidra_fetcher.mock import build_localidades
+from sidra_fetcher.reader import read_localidades
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Client:
+    def __init__(self, cache):
+        self.cache = cache
+        self.instrumentation = Instrumentation()
+        self.calls = 0
+
+    @cached("localidades")
+    def get_localidades(self, agregado_id, nivel="N1"):
+        self.calls += 1
+        return [agregado_id, nivel, self.calls]
+
+    @cached("periodos")
+    async def get_periodos(self, agregado_id):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return [agregado_id, self.calls]
+
+
+class TestObjectCache(unittest.TestCase):
+    def test_estimate_size(self):
+        small = read_localidades(build_localidades("N1", 1))
+        large = read_localidades(build_localidades("N6", 1000))
+        self.assertGreater(estimate_size(large), 500 * estimate_size(small))
+        shared = ["x" * 1000]
+        self.assertLess(estimate_size([shared, shared]), 2 * 1000)
+
+    def test_size_bounded_lru(self):
+        cache = ObjectCache(max_bytes=3000)
+        cache.put("a", "a" * 1000)
+        cache.put("b", "b" * 1000)
+        cache.get("a")
+        cache.put("c", "c" * 1000)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertLessEqual(cache.bytes, 3000)
+        cache.put("huge", "h" * 5000)
+        self.assertNotIn("huge", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_ttl_and_stale(self):
+        clock = Clock()
+        cache = ObjectCache(ttl=10, stale_while_revalidate=5, clock=clock)
+        cache.put("a", 1)
+        clock.now = 12
+        self.assertEqual(cache.get("a"), 1)  # Stale, still served
+        clock.now = 16
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.bytes, 0)
+
+    def test_get_or_load_refresh_ahead(self):
+        clock = Clock()
+        cache = ObjectCache(ttl=10, refresh_ahead=3, clock=clock)
+        client = Client(cache)
+        events = []
+        client.instrumentation.add_hook(events.append)
+
+        self.assertEqual(client.get_localidades(1705), [1705, "N1", 1])
+        self.assertEqual(client.get_localidades(agregado_id=1705)[2], 1)
+        self.assertEqual(client.get_localidades(1705, "N6")[2], 2)
+        self.assertEqual(
+            [e.type for e in events],
+            [EventType.CACHE_MISS, EventType.CACHE_HIT, EventType.CACHE_MISS],
+        )
+        self.assertEqual(events[0].url, "localidades/1705/N1")
+
+        clock.now = 8
+        self.assertEqual(client.get_localidades(1705)[2], 1)
+        reload = cache._loading.get(("localidades", 1705, "N1"))
+        if reload is not None:
+            reload.join()
+        self.assertEqual(client.get_localidades(1705)[2], 3)
+        self.assertEqual((cache.hits, cache.misses), (3, 2))
+
+    def test_returns_copies(self):
+        client = Client(ObjectCache())
+        client.get_localidades(1705).clear()
+        self.assertEqual(client.get_localidades(1705), [1705, "N1", 1])
+
+
+class TestAsyncObjectCache(unittest.IsolatedAsyncioTestCase):
+    async def test_single_flight(self):
+        client = Client(ObjectCache())
+        results = await asyncio.gather(
+            *(client.get_periodos(1705) for _ in range(5))
+        )
+        self.assertEqual(results, [[1705, 1]] * 5)
+        self.assertEqual(client.calls, 1)
+        results[0].clear()
+        self.assertEqual(await client.get_periodos(1705), [1705, 1])
+
+    async def test_stale_while_revalidate(self):
+        clock = Clock()
+        cache = ObjectCache(ttl=10, stale_while_revalidate=10, clock=clock)
+        client = Client(cache)
+        await client.get_periodos(1705)
+        clock.now = 15
+        self.assertEqual(await client.get_periodos(1705), [1705, 1])
+        await cache._loading[("periodos", 1705)]
+        self.assertEqual(await client.get_periodos(1705), [1705, 2])
+
+    async def test_uncached_client(self):
+        client = Client(None)
+        await client.get_periodos(1)
+        await client.get_periodos(1)
+        self.assertEqual(client.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from dataclasses import replace
+
+from sidra_fetcher.agregados import (
+    Categoria,
+    Classificacao,
+    ClassificacaoSumarizacao,
+)
+from sidra_fetcher.categorias import CategoriaTree
+from sidra_fetcher.mock import build_metadados
+from sidra_fetcher.reader import read_metadados
+
+# Total > (A > (A1, A2), B, C > C1), with a gap in the levels under C
+NIVEIS = [("Total", 0), ("A", 1), ("A1", 2), ("A2", 2), ("B", 1), ("C", 1)]
+NIVEIS += [("C1", 3)]
+
+
+def make_classificacao():
+    return Classificacao(
+        id=81,
+        nome="Produto",
+        sumarizacao=ClassificacaoSumarizacao(status=True, excecao=[]),
+        categorias=[
+            Categoria(id=i, nome=nome, unidade=None, nivel=nivel)
+            for i, (nome, nivel) in enumerate(NIVEIS)
+        ],
+    )
+
+
+class TestCategoriaTree(unittest.TestCase):
+    def setUp(self):
+        self.tree = CategoriaTree(make_classificacao())
+
+    def test_hierarchy(self):
+        tree = self.tree
+        self.assertEqual(tree.roots(), [0])
+        self.assertIsNone(tree.parent(0))
+        self.assertEqual(tree.parent(3), 1)
+        self.assertEqual(tree.parent(6), 5)
+        self.assertEqual(tree.children(0), [1, 4, 5])
+        self.assertEqual(tree.children(1), [2, 3])
+        self.assertEqual(list(tree.folhas), [0, 0, 1, 1, 1, 0, 1])
+        self.assertTrue(tree.is_leaf(4))
+        self.assertEqual(tree.span(1), (1, 4))
+        self.assertEqual(tree.parents(), [1, 5, 0])
+
+    def test_subtree_and_select(self):
+        tree = self.tree
+        self.assertEqual(tree.subtree(1), [1, 2, 3])
+        self.assertEqual(tree.subtree(leaves=True), [2, 3, 4, 6])
+        self.assertEqual(tree.select(5, leaves=True), ["6"])
+        self.assertEqual(tree.select(), ["all"])
+        with self.assertRaises(KeyError):
+            tree.subtree(99)
+
+    def test_cached_on_agregado(self):
+        agregado = read_metadados(build_metadados(1, ["N1"]))
+        classificacao = agregado.classificacoes[0]
+        tree = agregado.category_tree(classificacao.id)
+        self.assertIs(agregado.category_tree(classificacao.id), tree)
+        self.assertEqual(tree.roots(), [classificacao.categorias[0].id])
+        self.assertEqual(agregado, read_metadados(build_metadados(1, ["N1"])))
+
+        agregado.classificacoes[0] = replace(
+            make_classificacao(), id=classificacao.id
+        )
+        self.assertIsNot(agregado.category_tree(classificacao.id), tree)
+        with self.assertRaises(KeyError):
+            agregado.category_tree(999)
+
+        copia = replace(agregado)
+        self.assertIsNot(
+            copia.category_tree(classificacao.id),
+            agregado.category_tree(classificacao.id),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
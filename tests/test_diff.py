@@ -0,0 +1,234 @@
+import json
+import tempfile
+import unittest
+from dataclasses import replace
+from pathlib import Path
+
+from sidra_fetcher.agregados import Categoria, Periodo
+from sidra_fetcher.diff import (
+    AgregadoDiff,
+    SnapshotLog,
+    apply_diff,
+    diff_agregados,
+)
+from sidra_fetcher.mock import (
+    build_localidades,
+    build_metadados,
+    build_periodos,
+)
+from sidra_fetcher.reader import (
+    read_localidades,
+    read_metadados,
+    read_periodos,
+)
+
+
+def make_agregado(n_periodos=12):
+    return replace(
+        read_metadados(build_metadados(1705, ["N1", "N2", "N3"])),
+        periodos=read_periodos(build_periodos(n_periodos)),
+        localidades=read_localidades(
+            build_localidades("N1")
+            + build_localidades("N2")
+            + build_localidades("N3")
+        ),
+    )
+
+
+def change(agregado):
+    """Add two periods, move a date, rename a category, drop a UF."""
+    periodos = list(agregado.periodos)
+    periodos[0] = replace(
+        periodos[0], modificacao=periodos[0].modificacao.replace(day=1)
+    )
+    periodos += read_periodos(build_periodos(14))[-2:]
+    classificacao = agregado.classificacoes[0]
+    categorias = list(classificacao.categorias)
+    categorias[3] = replace(categorias[3], nome="Renomeada")
+    classificacoes = [
+        replace(classificacao, categorias=categorias),
+        *agregado.classificacoes[1:],
+    ]
+    return replace(
+        agregado,
+        periodos=periodos,
+        classificacoes=classificacoes,
+        localidades=agregado.localidades[:-1],
+    )
+
+
+class TestDiff(unittest.TestCase):
+    def setUp(self):
+        self.old = make_agregado()
+        self.new = change(self.old)
+
+    def test_diff(self):
+        diff = diff_agregados(self.old, self.new)
+
+        self.assertEqual(diff.atributos, {})
+        self.assertEqual(
+            [posicao for posicao, _ in diff.periodos.added], [12, 13]
+        )
+        self.assertEqual(len(diff.periodos.changed), 1)
+        self.assertEqual(diff.periodos.removed, [])
+        self.assertEqual(len(diff.localidades.removed), 1)
+        self.assertFalse(diff.classificacoes)
+        classificacao_id = self.old.classificacoes[0].id
+        self.assertEqual(
+            diff.categorias[classificacao_id].changed[0]["nome"], "Renomeada"
+        )
+        self.assertFalse(diff_agregados(self.old, self.old))
+
+    def test_apply_diff(self):
+        diff = diff_agregados(self.old, self.new)
+        self.assertEqual(apply_diff(self.old, diff), self.new)
+        reverse = diff_agregados(self.new, self.old)
+        self.assertEqual(apply_diff(self.new, reverse), self.old)
+
+    def test_localidades_of_different_levels_share_ids(self):
+        localidades = list(self.old.localidades)
+        i, uf = next(
+            (i, loc)
+            for i, loc in enumerate(localidades)
+            if loc.nivel.id == "N3" and loc.id == "1"
+        )
+        localidades[i] = replace(uf, nome="Rondônia")
+        new = replace(self.old, localidades=localidades)
+
+        diff = diff_agregados(self.old, new)
+        self.assertEqual(diff.localidades.changed[0]["nome"], "Rondônia")
+        self.assertEqual(len(diff.localidades.changed), 1)
+        self.assertEqual(apply_diff(self.old, diff), new)
+
+    def test_reordered_and_added_in_the_middle(self):
+        classificacao = self.old.classificacoes[1]
+        categorias = list(reversed(classificacao.categorias))
+        categorias.insert(
+            2, Categoria(id=999, nome="Nova", unidade=None, nivel=1)
+        )
+        new = replace(
+            self.old,
+            nome="Outro nome",
+            classificacoes=[
+                self.old.classificacoes[0],
+                replace(classificacao, categorias=categorias),
+            ],
+        )
+        diff = diff_agregados(self.old, new)
+        self.assertEqual(diff.atributos, {"nome": "Outro nome"})
+        self.assertEqual(apply_diff(self.old, diff), new)
+
+    def test_json_round_trip(self):
+        diff = diff_agregados(self.old, self.new)
+        data = json.loads(json.dumps(diff.asdict()))
+        self.assertEqual(AgregadoDiff.from_dict(data), diff)
+        self.assertEqual(
+            apply_diff(self.old, AgregadoDiff.from_dict(data)), self.new
+        )
+
+    def test_diff_does_not_apply(self):
+        diff = diff_agregados(self.old, self.new)
+        with self.assertRaises(ValueError):
+            apply_diff(self.new, diff)
+        with self.assertRaises(ValueError):
+            diff_agregados(self.old, replace(self.new, id=1))
+
+
+class TestSnapshotLog(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "snapshots.jsonl"
+
+    def versions(self, n):
+        agregado = make_agregado(n_periodos=2)
+        for i in range(n):
+            agregado = replace(
+                agregado, periodos=read_periodos(build_periodos(3 + i))
+            )
+            yield agregado
+
+    def test_append_and_replay(self):
+        log = SnapshotLog(self.path)
+        versions = list(self.versions(4))
+        self.assertIsNone(log.append(versions[0]))
+        for agregado in versions[1:]:
+            self.assertTrue(log.append(agregado))
+        self.assertFalse(log.append(versions[-1]))
+
+        lines = self.path.read_text().splitlines()
+        self.assertEqual(len(lines), 4)
+        # Deltas hold only the changes
+        self.assertLess(len(lines[1]), len(lines[0]) / 10)
+
+        reopened = SnapshotLog(self.path)
+        self.assertEqual(reopened.version(1705), 4)
+        self.assertEqual(reopened.latest(1705), versions[-1])
+        self.assertIsNone(reopened.latest(1))
+
+    def test_changes(self):
+        log = SnapshotLog(self.path)
+        for agregado in self.versions(4):
+            log.append(agregado)
+
+        changes = list(log.changes(1705, since=2))
+        self.assertEqual([versao for _, versao, _ in changes], [3, 4])
+        _, _, diff = changes[-1]
+        self.assertEqual(diff.periodos.added[0][1]["id"], "200006")
+
+    def test_compact_every(self):
+        log = SnapshotLog(self.path, compact_every=2)
+        for agregado in self.versions(6):
+            log.append(agregado)
+
+        lines = self.path.read_text().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [r["tipo"] for r in records],
+            ["base", "delta", "delta", "base", "delta", "delta"],
+        )
+        self.assertEqual(len(list(log.changes())), 5)
+        self.assertEqual(
+            SnapshotLog(self.path).latest(1705), list(self.versions(6))[-1]
+        )
+
+    def test_compact(self):
+        log = SnapshotLog(self.path)
+        for agregado in self.versions(5):
+            log.append(agregado)
+        log.compact()
+
+        self.assertEqual(len(self.path.read_text().splitlines()), 1)
+        reopened = SnapshotLog(self.path)
+        self.assertEqual(reopened.version(1705), 5)
+        self.assertEqual(reopened.latest(1705), list(self.versions(5))[-1])
+        self.assertEqual(list(reopened.changes()), [])
+
+    def test_truncated_last_line(self):
+        log = SnapshotLog(self.path)
+        versions = list(self.versions(2))
+        for agregado in versions:
+            log.append(agregado)
+        with open(self.path, "a") as f:
+            f.write('{"agregado_id": 1705, "ver')
+
+        with self.assertLogs("sidra_fetcher", "WARNING"):
+            reopened = SnapshotLog(self.path)
+        self.assertEqual(reopened.latest(1705), versions[-1])
+
+        reopened.append(replace(versions[-1], nome="Outro nome"))
+        with self.assertLogs("sidra_fetcher", "WARNING"):
+            self.assertEqual(SnapshotLog(self.path).version(1705), 3)
+
+
+class TestPeriodoDates(unittest.TestCase):
+    def test_date_objects_survive(self):
+        agregado = make_agregado(n_periodos=1)
+        diff = diff_agregados(agregado, agregado)
+        self.assertIsInstance(
+            apply_diff(agregado, diff).periodos[0], Periodo
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
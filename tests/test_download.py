@@ -0,0 +1,94 @@
+import gzip
+import tempfile
+import unittest
+from pathlib import Path
+
+from sidra_fetcher.download import Sink, plan_downloads
+from sidra_fetcher.sidra import Parametro
+
+
+class TestDownload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sink_commit_is_atomic(self):
+        sink = Sink(self.dir / "out.json")
+        with sink.open() as f:
+            sink.write(f, b"[1,")
+            sink.write(f, b"2]")
+        self.assertFalse(sink.dest.exists())
+        self.assertEqual(sink.commit(), sink.dest)
+        self.assertEqual(sink.dest.read_bytes(), b"[1,2]")
+        self.assertFalse(sink.part.exists())
+
+    def test_sink_resume(self):
+        sink = Sink(self.dir / "out.json")
+        sink.part.write_bytes(b"[1,")
+        self.assertEqual(sink.resume_offset(), 3)
+        with sink.open(append=True) as f:
+            sink.write(f, b"2]")
+        sink.commit()
+        self.assertEqual(sink.dest.read_bytes(), b"[1,2]")
+
+        compressed = Sink(self.dir / "out.json.gz", format="json.gz")
+        compressed.part.write_bytes(b"partial")
+        self.assertEqual(compressed.resume_offset(), 0)
+
+    def test_sink_gzip(self):
+        sink = Sink(self.dir / "out.json.gz", format="json.gz")
+        with sink.open() as f:
+            sink.write(f, b"[]")
+        sink.commit()
+        with gzip.open(sink.dest) as f:
+            self.assertEqual(f.read(), b"[]")
+
+    def test_sink_empty_body(self):
+        sink = Sink(self.dir / "out.json")
+        with sink.open():
+            pass
+        with self.assertRaises(ConnectionError):
+            sink.commit()
+
+    def test_plan_downloads(self):
+        parametro = Parametro(
+            agregado="1",
+            territorios={"1": []},
+            variaveis=[],
+            periodos=["202001", "202002-202003"],
+            classificacoes={},
+        )
+        self.assertEqual(
+            plan_downloads(parametro, self.dir / "x.json"),
+            [(parametro.url(), self.dir / "x.json")],
+        )
+        plan = plan_downloads(
+            parametro, self.dir, format="json.gz", partition_by="periodos"
+        )
+        self.assertEqual(
+            [path.name for _, path in plan],
+            ["periodo=202001.json.gz", "periodo=202002-202003.json.gz"],
+        )
+        self.assertIn("/p/202002-202003/", plan[1][0])
+
+        with self.assertRaises(ValueError):
+            plan_downloads(
+                parametro.assign("periodos", ["all"]),
+                self.dir,
+                partition_by="periodos",
+            )
+
+        url = parametro.url()
+        self.assertEqual(
+            plan_downloads(url, self.dir / "x.json"),
+            [(url, self.dir / "x.json")],
+        )
+        with self.assertRaises(ValueError):
+            plan_downloads(url, self.dir, partition_by="periodos")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from sidra_fetcher.mock import build_metadados, build_periodos
+from sidra_fetcher.reader import (
+    read_localidades,
+    read_metadados,
+    read_periodos,
+)
+from sidra_fetcher.values import Status
+
+try:
+    import pyarrow.parquet as pq
+
+    from sidra_fetcher.export import to_record_batch, write_parquet
+except ImportError:
+    pq = None
+
+HEADER = {
+    "NC": "Nível Territorial (Código)",
+    "NN": "Nível Territorial",
+    "MN": "Unidade de Medida",
+    "V": "Valor",
+    "D1C": "Unidade da Federação (Código)",
+    "D1N": "Unidade da Federação",
+    "D2C": "Mês (Código)",
+    "D2N": "Mês",
+    "D3C": "Variável (Código)",
+    "D3N": "Variável",
+}
+
+
+def row(uf, periodo, valor):
+    return {
+        "NC": "3",
+        "NN": "Unidade da Federação",
+        "MN": "%",
+        "V": valor,
+        "D1C": uf,
+        "D1N": f"UF {uf}",
+        "D2C": periodo,
+        "D2N": f"Mês {periodo}",
+        "D3C": "1000",
+        "D3N": "Variável 0",
+    }
+
+
+@unittest.skipIf(pq is None, "pyarrow is not installed")
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.agregado = read_metadados(build_metadados(1, ["N3"], 2, 0, 0))
+        self.agregado.periodos = read_periodos(build_periodos(3))
+        nivel = {"id": "N3", "nome": "Unidade da Federação"}
+        self.agregado.localidades = read_localidades(
+            [
+                {"id": uf, "nome": f"UF {uf}", "nivel": nivel}
+                for uf in ("33", "35")
+            ]
+        )
+        self.rows = [
+            HEADER,
+            row("35", "200001", "1.5"),
+            row("33", "200001", "-"),
+            row("35", "200002", "X"),
+            row("99", "200002", ".."),
+        ]
+
+    def test_to_record_batch(self):
+        batch = to_record_batch(self.rows, self.agregado)
+        self.assertEqual(batch.num_rows, 4)
+        self.assertEqual(
+            batch.schema.field("D1C").metadata[b"label"].decode(),
+            "Unidade da Federação (Código)",
+        )
+        valores = batch.column("V").to_pylist()
+        self.assertEqual(valores, [1.5, 0.0, None, None])
+        self.assertEqual(
+            batch.column("status").to_pylist(),
+            [Status.OK, Status.ZERO, Status.SIGILO, Status.NAO_SE_APLICA],
+        )
+
+        uf = batch.column("D1C")
+        # Metadata order first, then codes only present in the data.
+        self.assertEqual(uf.dictionary.to_pylist(), ["33", "35", "99"])
+        self.assertEqual(uf.to_pylist(), ["35", "33", "35", "99"])
+        self.assertEqual(batch.column("D1N").dictionary[2].as_py(), "UF 99")
+        periodos = batch.column("D2C").dictionary.to_pylist()
+        self.assertEqual(periodos, ["200001", "200002", "200003"])
+        variaveis = batch.column("D3N").dictionary.to_pylist()
+        self.assertEqual(variaveis, ["Variável 0", "Variável 1"])
+        self.assertEqual(batch.column("MN").dictionary.to_pylist(), ["%"])
+
+    def test_to_record_batch_without_metadata(self):
+        batch = to_record_batch(self.rows[1:])
+        ufs = batch.column("D1C").dictionary.to_pylist()
+        self.assertEqual(ufs, ["35", "33", "99"])
+        self.assertEqual(batch.column("D2N").to_pylist()[-1], "Mês 200002")
+
+    def test_write_parquet(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "values.parquet"
+            responses = [self.rows[:3], [HEADER] + self.rows[3:]]
+            write_parquet(responses, path, self.agregado)
+            table = pq.read_table(path)
+        self.assertEqual(table.num_rows, 4)
+        ufs = table.column("D1C").to_pylist()
+        self.assertEqual(ufs, ["35", "33", "35", "99"])
+        with self.assertRaises(ValueError):
+            write_parquet([], Path(tmp) / "empty.parquet")
+
+
+if __name__ == "__main__":
+    unittest.main()
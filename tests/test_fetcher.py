@@ -1,14 +1,11 @@
+import asyncio
+import contextlib
 import json
 import sys
+import tempfile
 import unittest
-from unittest.mock import MagicMock
-
-# Mock external dependencies that might be missing
-sys.modules["httpx"] = MagicMock()
-sys.modules["tenacity"] = MagicMock()
-sys.modules["tenacity.retry"] = MagicMock()
-sys.modules["tenacity.stop"] = MagicMock()
-sys.modules["tenacity.wait"] = MagicMock()
+from pathlib import Path
+from unittest.mock import MagicMock, patch
 
 
 # Mock the decorators from tenacity to just return the function
@@ -19,10 +16,30 @@ def mock_retry(*args, **kwargs):
     return decorator
 
 
-sys.modules["tenacity"].retry = mock_retry
-
-from sidra_fetcher.agregados import AcervoEnum
-from sidra_fetcher.fetcher import SidraClient
+# Mock external dependencies that might be missing. The package is
+# imported again against the mocks and sys.modules restored afterwards,
+# so the other tests keep the real modules.
+mock_httpx = MagicMock()
+mock_tenacity = MagicMock(retry=mock_retry)
+with patch.dict(
+    sys.modules,
+    {
+        "httpx": mock_httpx,
+        "tenacity": mock_tenacity,
+        "tenacity.retry": MagicMock(),
+        "tenacity.stop": MagicMock(),
+        "tenacity.wait": MagicMock(),
+    },
+):
+    for name in [n for n in sys.modules if n.startswith("sidra_fetcher")]:
+        del sys.modules[name]
+    from sidra_fetcher.agregados import AcervoEnum
+    from sidra_fetcher.cache import ObjectCache
+    from sidra_fetcher.download import Sink
+    from sidra_fetcher.fetcher import AsyncSidraClient, SidraClient
+    from sidra_fetcher.instrumentation import EventType
+    from sidra_fetcher.mock import MockConfig, MockIBGE
+    from sidra_fetcher.sidra import Parametro
 
 
 class TestFetcher(unittest.TestCase):
@@ -35,7 +52,6 @@ class TestFetcher(unittest.TestCase):
             }
         ]
 
-        mock_httpx = sys.modules["httpx"]
         mock_client_instance = mock_httpx.Client.return_value
         mock_client_instance.stream.return_value.__enter__.return_value.iter_bytes.return_value = [
             json.dumps(mock_response).encode("utf-8")
@@ -80,7 +96,6 @@ class TestFetcher(unittest.TestCase):
             ],
         }
 
-        mock_httpx = sys.modules["httpx"]
         mock_client_instance = mock_httpx.Client.return_value
         mock_client_instance.stream.return_value.__enter__.return_value.iter_bytes.return_value = [
             json.dumps(mock_response).encode("utf-8")
@@ -103,7 +118,6 @@ class TestFetcher(unittest.TestCase):
             }
         ]
 
-        mock_httpx = sys.modules["httpx"]
         mock_client_instance = mock_httpx.Client.return_value
         mock_client_instance.stream.return_value.__enter__.return_value.iter_bytes.return_value = [
             json.dumps(mock_response).encode("utf-8")
@@ -124,7 +138,6 @@ class TestFetcher(unittest.TestCase):
             }
         ]
 
-        mock_httpx = sys.modules["httpx"]
         mock_client_instance = mock_httpx.Client.return_value
         mock_client_instance.stream.return_value.__enter__.return_value.iter_bytes.return_value = [
             json.dumps(mock_response).encode("utf-8")
@@ -140,7 +153,6 @@ class TestFetcher(unittest.TestCase):
     def test_get_acervo(self):
         mock_response = {"some": "data"}
 
-        mock_httpx = sys.modules["httpx"]
         mock_client_instance = mock_httpx.Client.return_value
         mock_client_instance.stream.return_value.__enter__.return_value.iter_bytes.return_value = [
             json.dumps(mock_response).encode("utf-8")
@@ -151,6 +163,325 @@ class TestFetcher(unittest.TestCase):
 
         self.assertEqual(data, mock_response)
 
+    def test_get_values(self):
+        mock_response = [{"V": "Valor"}, {"V": "1.5"}]
+
+        mock_client_instance = mock_httpx.Client.return_value
+        mock_client_instance.stream.return_value.__enter__.return_value.iter_bytes.return_value = [
+            json.dumps(mock_response).encode("utf-8")
+        ]
+
+        client = SidraClient()
+        parametro = Parametro(
+            agregado="1419",
+            territorios={"1": ["all"]},
+            variaveis=["63"],
+            periodos=["202401"],
+            classificacoes={},
+        )
+        rows = client.get_values(parametro)
+
+        self.assertEqual(rows, mock_response)
+        url = mock_client_instance.stream.call_args.args[1]
+        self.assertEqual(url, parametro.url())
+
+    def test_get_agregado_cached(self):
+        app = MockIBGE(MockConfig(niveis=["N1", "N3"]))
+
+        def stream(method, url, **kwargs):
+            response = MagicMock()
+            response.__enter__.return_value.iter_bytes.return_value = [
+                app.respond(url)[2]
+            ]
+            return response
+
+        mock_client_instance = mock_httpx.Client.return_value
+        mock_client_instance.stream.side_effect = stream
+        self.addCleanup(
+            setattr, mock_client_instance.stream, "side_effect", None
+        )
+
+        cache = ObjectCache()
+        client = SidraClient(cache=cache)
+        agregado = client.get_agregado(1705)
+        again = client.get_agregado(1705)
+
+        # Metadados, periodos and every level of localidades at once
+        self.assertEqual(sum(app.requests.values()), 3)
+        self.assertEqual(again.localidades, agregado.localidades)
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+        metadados = client.get_agregado_metadados(1705)
+        self.assertEqual(metadados.localidades, [])
+
+        # Changing a result leaves the cached parts alone
+        agregado.variaveis.clear()
+        agregado.localidades[0].nome = "Outra"
+        again = client.get_agregado(1705)
+        self.assertTrue(again.variaveis)
+        self.assertNotEqual(again.localidades[0].nome, "Outra")
+        client.get_agregado_metadados(1705).variaveis.clear()
+        client.get_agregado_periodos(1705).clear()
+        client.get_agregado_localidades(1705, "N1|N3").clear()
+        self.assertTrue(client.get_agregado_metadados(1705).variaveis)
+        again = client.get_agregado(1705)
+        self.assertTrue(again.variaveis)
+        self.assertEqual(len(again.periodos), len(agregado.periodos))
+        self.assertEqual(len(again.localidades), len(agregado.localidades))
+        self.assertEqual(sum(app.requests.values()), 3)
+
+    def test_get_agregado_combined_localidades(self):
+        app = MockIBGE(MockConfig(niveis=["N1", "N2", "N3", "N7"]))
+
+        class Rejected(Exception):
+            response = MagicMock(status_code=400)
+
+        urls = []
+
+        def stream(method, url, **kwargs):
+            urls.append(url)
+            if "N7|" in url or "|N7" in url:
+                raise Rejected(url)
+            response = MagicMock()
+            response.__enter__.return_value.iter_bytes.return_value = [
+                app.respond(url)[2]
+            ]
+            return response
+
+        mock_client_instance = mock_httpx.Client.return_value
+        mock_client_instance.stream.side_effect = stream
+        self.addCleanup(
+            setattr, mock_client_instance.stream, "side_effect", None
+        )
+
+        with patch.object(mock_httpx, "HTTPStatusError", Rejected):
+            agregado = SidraClient().get_agregado(1705)
+
+        localidades = [url.split("/")[-1] for url in urls[2:]]
+        self.assertEqual(
+            localidades, ["N1|N2|N3|N7", "N1|N2", "N3|N7", "N3", "N7"]
+        )
+        niveis = [loc.nivel.id for loc in agregado.localidades]
+        self.assertEqual(niveis, sorted(niveis, key=app.config.niveis.index))
+        self.assertEqual(set(niveis), set(app.config.niveis))
+
+    def test_get_emits_events(self):
+        mock_response = {"some": "data"}
+
+        mock_client_instance = mock_httpx.Client.return_value
+        mock_client_instance.stream.return_value.__enter__.return_value.iter_bytes.return_value = [
+            json.dumps(mock_response).encode("utf-8")
+        ]
+
+        events = []
+        client = SidraClient(hooks=[events.append])
+        client.get_acervo(AcervoEnum.ASSUNTO)
+
+        self.assertEqual(
+            [event.type for event in events],
+            [
+                EventType.REQUEST_START,
+                EventType.FIRST_BYTE,
+                EventType.BYTES,
+                EventType.REQUEST_END,
+                EventType.PARSE,
+            ],
+        )
+        self.assertTrue(all(event.endpoint == "acervo" for event in events))
+        self.assertEqual(events[2].value, len(json.dumps(mock_response)))
+
+    def test_throttled_localidades_not_split(self):
+        class Throttled(Exception):
+            response = MagicMock(status_code=429)
+
+        urls = []
+
+        def get_localidades(agregado_id, niveis):
+            urls.append(niveis)
+            raise Throttled(niveis)
+
+        client = SidraClient()
+        client.get_agregado_localidades = get_localidades
+        with patch.object(mock_httpx, "HTTPStatusError", Throttled):
+            with self.assertRaises(Throttled):
+                client._get_localidades(1705, ["N1", "N3", "N6"])
+        self.assertEqual(urls, ["N1|N3|N6"])
+
+    def test_download_range_not_satisfiable(self):
+        client = SidraClient()
+        response = MagicMock(status_code=416)
+        response.headers = {"Content-Range": "bytes */5"}
+        client.client = MagicMock()
+        client.client.stream.return_value.__enter__.return_value = response
+        with tempfile.TemporaryDirectory() as tmp:
+            sink = Sink(Path(tmp) / "out.json")
+            sink.part.write_bytes(b"[1,2]")
+            self.assertEqual(client._download_file("url", sink), sink.dest)
+            self.assertEqual(sink.dest.read_bytes(), b"[1,2]")
+            self.assertFalse(sink.part.exists())
+            _, kwargs = client.client.stream.call_args
+            self.assertEqual(kwargs["headers"], {"Range": "bytes=5-"})
+
+            stale = Sink(Path(tmp) / "stale.json")
+            stale.part.write_bytes(b"[1,2,3]")
+            with self.assertRaises(ConnectionError):
+                client._download_file("url", stale)
+            self.assertFalse(stale.part.exists())
+            self.assertFalse(stale.dest.exists())
+
+
+class TestAsyncClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        niveis = [f"N{i}" for i in range(1, 11)]
+        self.app = MockIBGE(MockConfig(niveis=niveis, n_periodos=6))
+        self.client = AsyncSidraClient()
+        self.urls = []
+
+        async def get(url):
+            self.urls.append(url)
+            await asyncio.sleep(0)
+            return json.loads(self.app.respond(url)[2])
+
+        self.client.get = get
+
+    async def test_fills_pesquisa(self):
+        agregado = await self.client.get_agregado_metadados(1007)
+        self.assertEqual(agregado.pesquisa.id, "")
+
+        await self.client.get_indice_pesquisas_agregados({"nivel": "N1"})
+        self.assertIsNone(self.client.pesquisas)
+        pesquisas = await self.client.pesquisa_index()
+        self.assertIs(await self.client.pesquisa_index(), pesquisas)
+        self.assertEqual(len(self.urls), 3)
+
+        agregado = await self.client.get_agregado_metadados(1007)
+        self.assertEqual(agregado.pesquisa.id, "P1")
+
+    async def test_fills_cached_pesquisa(self):
+        self.client.cache = ObjectCache()
+        await self.client.get_agregado_metadados(1007)
+        await self.client.pesquisa_index()
+
+        agregado = await self.client.get_agregado_metadados(1007)
+        self.assertEqual(agregado.pesquisa.id, "P1")
+        agregado = await self.client.get_agregado(1007)
+        self.assertEqual(agregado.pesquisa.id, "P1")
+        self.assertEqual(self.app.requests["metadados"], 1)
+
+    async def test_stream_agregado_localidades(self):
+        stream = self.client.stream_agregado_localidades(
+            1705, max_concurrency=3
+        )
+        niveis = {nivel: localidades async for nivel, localidades in stream}
+        self.assertEqual(sorted(niveis), sorted(self.app.config.niveis))
+        self.assertTrue(all(loc.nivel.id == "N3" for loc in niveis["N3"]))
+
+    async def test_backpressure(self):
+        stream = self.client.stream_agregado_localidades(
+            1705, max_concurrency=2, buffer=1
+        )
+        async with contextlib.aclosing(stream):
+            await anext(stream)
+            await asyncio.sleep(0.05)
+            # Consumed, queued, and one finished per worker
+            self.assertLessEqual(len(self.urls) - 1, 4)
+        await asyncio.sleep(0)
+        self.assertLess(len(self.urls) - 1, 10)
+
+    async def test_stream_values(self):
+        parametro = Parametro(
+            agregado="1705",
+            territorios={"1": ["all"]},
+            variaveis=["63"],
+            periodos=["202401", "202402", "202403"],
+            classificacoes={},
+        )
+        fatias = [
+            fatia async for fatia, rows in self.client.stream_values(parametro)
+        ]
+        self.assertEqual(
+            sorted(fatia.periodos[0] for fatia in fatias),
+            parametro.periodos,
+        )
+
+    async def test_get_agregado_combined_localidades(self):
+        get = self.client.get
+
+        class Rejected(Exception):
+            response = MagicMock(status_code=400)
+
+        async def reject_n10(url):
+            if "|N10" in url:
+                self.urls.append(url)
+                raise Rejected(url)
+            return await get(url)
+
+        self.client.get = reject_n10
+        with patch.object(mock_httpx, "HTTPStatusError", Rejected):
+            agregado = await self.client.get_agregado(1705)
+
+        # N1-N10, N1-N5, N6-N10, N6-N7, N8-N10, N8, N9-N10, N9, N10
+        self.assertEqual(len(self.urls), 2 + 9)
+        niveis = [loc.nivel.id for loc in agregado.localidades]
+        ordem = self.app.config.niveis.index
+        self.assertEqual(niveis, sorted(niveis, key=ordem))
+
+    def localidades_urls(self):
+        return [
+            url.split("/")[-1] for url in self.urls if "localidades" in url
+        ]
+
+    async def test_speculative_get_agregado(self):
+        self.app.config.niveis = ["N1", "N3", "N7"]
+        expected = await self.client.get_agregado(1705)
+        self.urls.clear()
+
+        agregado = await self.client.get_agregado(1705, speculate=True)
+
+        self.assertEqual(agregado, expected)
+        # Requested together with the metadados, then the missing N7
+        self.assertEqual(self.localidades_urls(), ["N1|N2|N3|N6", "N7"])
+        self.assertIn("localidades", self.urls[0])
+
+    async def test_speculation_not_needed(self):
+        self.app.config.niveis = ["N1", "N3"]
+        agregado = await self.client.get_agregado(
+            1705, speculate=["N6", "N7"]
+        )
+        self.assertEqual(
+            {loc.nivel.id for loc in agregado.localidades}, {"N1", "N3"}
+        )
+        self.assertEqual(self.localidades_urls()[-1], "N1|N3")
+
+    async def test_speculation_rejected(self):
+        self.app.config.niveis = ["N1", "N3"]
+        get = self.client.get
+
+        class Rejected(Exception):
+            response = MagicMock(status_code=400)
+
+        async def reject(url):
+            if url.endswith("N1|N2|N3|N6"):
+                raise Rejected(url)
+            return await get(url)
+
+        self.client.get = reject
+        with patch.object(mock_httpx, "HTTPStatusError", Rejected):
+            agregado = await self.client.get_agregado(1705, speculate=True)
+
+        self.assertEqual(self.localidades_urls(), ["N1|N3"])
+        self.assertEqual(len(agregado.localidades), 28)
+
+    async def test_stream_error(self):
+        async def get(url):
+            raise ConnectionError(url)
+
+        self.client.get = get
+        with self.assertRaises(ConnectionError):
+            async for _ in self.client.stream_agregado_localidades(
+                1705, niveis=["N1", "N3"]
+            ):
+                pass
+
 
 if __name__ == "__main__":
     unittest.main()
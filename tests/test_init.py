@@ -0,0 +1,32 @@
+import subprocess
+import sys
+import unittest
+
+import sidra_fetcher
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_light_modules_do_not_load_the_network_stack(self):
+        code = (
+            "import sys, sidra_fetcher.sidra, sidra_fetcher.reader; "
+            "print(sorted({'httpx', 'tenacity', 'asyncio'} & set(sys.modules)))"
+        )
+        proc = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(proc.stdout.strip(), "[]")
+
+    def test_getattr(self):
+        from sidra_fetcher.sidra import Parametro
+
+        self.assertIs(sidra_fetcher.Parametro, Parametro)
+        self.assertEqual(sidra_fetcher.values.__name__, "sidra_fetcher.values")
+        self.assertIn("SidraClient", dir(sidra_fetcher))
+        self.assertFalse(hasattr(sidra_fetcher, "missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+
+from sidra_fetcher.instrumentation import (
+    Event,
+    EventType,
+    Histogram,
+    Instrumentation,
+    MetricsRecorder,
+    endpoint_name,
+)
+
+AGREGADOS = "https://servicodados.ibge.gov.br/api/v3/agregados"
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_endpoint_name(self):
+        self.assertEqual(endpoint_name(f"{AGREGADOS}/1/metadados"), "metadados")
+        self.assertEqual(
+            endpoint_name(f"{AGREGADOS}/1/localidades/N1|N6"), "localidades"
+        )
+        self.assertEqual(endpoint_name(f"{AGREGADOS}?acervo=V"), "acervo")
+        self.assertEqual(endpoint_name(AGREGADOS), "agregados")
+        self.assertEqual(
+            endpoint_name("https://apisidra.ibge.gov.br/values/t/1"), "values"
+        )
+
+    def test_emit_ignores_failing_hooks(self):
+        events = []
+
+        def broken(event):
+            raise RuntimeError("boom")
+
+        instrumentation = Instrumentation([broken, events.append])
+        with self.assertLogs("sidra_fetcher", level="ERROR"):
+            instrumentation.emit(EventType.BYTES, f"{AGREGADOS}/1/periodos", 10)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].endpoint, "periodos")
+        self.assertEqual(events[0].value, 10)
+
+    def test_request_tracker(self):
+        events = []
+        instrumentation = Instrumentation([events.append])
+        url = f"{AGREGADOS}/1/periodos"
+        with instrumentation.request(url) as request:
+            request.first_byte(200)
+            request.size = 10
+        self.assertEqual(
+            [(e.type, e.value, e.status) for e in events[2:]],
+            [
+                (EventType.BYTES, 10, None),
+                (EventType.REQUEST_END, request.elapsed, 200),
+            ],
+        )
+
+        events.clear()
+        with self.assertRaises(ConnectionError):
+            with instrumentation.request(url) as request:
+                request.first_byte(503)
+                raise ConnectionError("boom")
+        end = events[-1]
+        self.assertEqual(len(events), 3)
+        self.assertEqual(
+            (end.type, end.status, end.error),
+            (EventType.REQUEST_END, 503, "ConnectionError"),
+        )
+
+    def test_histogram(self):
+        h = Histogram([0.1, 1.0])
+        for value in (0.05, 0.1, 0.5, 2.0):
+            h.observe(value)
+        self.assertEqual(
+            h.cumulative(), [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+        )
+        self.assertEqual(h.quantile(0.5), 0.1)
+        self.assertAlmostEqual(h.sum, 2.65)
+
+    def test_metrics_recorder(self):
+        recorder = MetricsRecorder()
+        recorder(Event(EventType.REQUEST_START, "u", "metadados"))
+        recorder(Event(EventType.REQUEST_END, "u", "metadados", value=0.2))
+        recorder(
+            Event(
+                EventType.REQUEST_END,
+                "u",
+                "metadados",
+                value=0.3,
+                error="HTTPStatusError",
+            )
+        )
+        self.assertEqual(recorder.counter(EventType.REQUEST_START, "metadados"), 1)
+        hist = recorder.histogram(EventType.REQUEST_END, "metadados")
+        self.assertEqual(hist.count, 2)
+
+        text = recorder.render()
+        self.assertIn(
+            "# TYPE sidra_fetcher_request_duration_seconds histogram", text
+        )
+        self.assertIn(
+            'sidra_fetcher_request_duration_seconds_bucket'
+            '{endpoint="metadados",le="+Inf"} 2',
+            text,
+        )
+        self.assertIn('sidra_fetcher_requests_total{endpoint="metadados"} 1', text)
+        self.assertIn(
+            'sidra_fetcher_request_errors_total'
+            '{endpoint="metadados",error="HTTPStatusError"} 1',
+            text,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
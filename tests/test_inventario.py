@@ -0,0 +1,116 @@
+import asyncio
+import unittest
+
+from clients import AsyncMockClient, CatalogIBGE, MockClient
+
+from sidra_fetcher.acervo import AcervoIndex
+from sidra_fetcher.agregados import AcervoEnum
+from sidra_fetcher.inventario import Inventario
+from sidra_fetcher.mock import MockConfig
+
+ACERVOS = {
+    "V": [{"id": 1000 + i, "literals": [f"Variável {i}"]} for i in range(5)]
+    + [{"id": 2000, "literals": ["Sem agregado"]}],
+    "C": [
+        {"id": 100, "literals": ["Classificação 0"]},
+        {"id": 101, "literals": ["Classificação 1"]},
+        {"id": 300, "literals": ["Outra"]},
+    ],
+}
+CLASSIFICACOES = {"100": [1, 2], "101": [1, 2], "300": [5]}
+
+
+def catalog():
+    agregados = {("classificacao", k): v for k, v in CLASSIFICACOES.items()}
+    return CatalogIBGE(
+        acervos=ACERVOS,
+        agregados={**agregados, None: [1, 2, 5]},
+        metadados={5: lambda d: d["classificacoes"][0].update(id=300)},
+        config=MockConfig(niveis=["N1"]),
+    )
+
+
+def make_indice():
+    indice = AcervoIndex()
+    indice.refresh(MockClient(catalog()), [AcervoEnum.CLASSIFICACAO])
+    return indice
+
+
+class TestInventario(unittest.TestCase):
+    def setUp(self):
+        self.client = MockClient(catalog())
+        self.inventario = Inventario(self.client, make_indice())
+        self.inventario.build()
+
+    def test_build_from_acervos(self):
+        inventario = self.inventario
+        self.assertEqual(len(inventario.variaveis), 6)
+        self.assertEqual(inventario.classificacoes[300].nome, "Outra")
+        self.assertFalse(inventario.variaveis[1000].completo)
+        self.assertEqual(self.client.requested("metadados"), [])
+
+    def test_complete_with_few_metadados(self):
+        inventario = self.inventario
+        # Variable 2000 is searched in the one agregado left
+        self.assertEqual(inventario.complete(), 3)
+        self.assertEqual(self.client.requested("metadados"), [1, 5, 2])
+        self.assertEqual(inventario.variaveis[1003].unidade, "Unidades")
+        self.assertEqual(len(inventario.classificacoes[300].categorias), 20)
+        self.assertEqual(
+            inventario.incomplete(), [(AcervoEnum.VARIAVEL, 2000)]
+        )
+        # Variables are now indexed too
+        self.assertEqual(
+            inventario.indice.agregados(AcervoEnum.VARIAVEL, 1000), {1, 2, 5}
+        )
+        self.assertEqual(inventario.complete(), 0)
+
+    def test_lazy_entries(self):
+        inventario = self.inventario
+        classificacao = inventario.classificacao(101)
+        self.assertTrue(classificacao.completo)
+        self.assertEqual(self.client.requested("metadados"), [1])
+        self.assertTrue(inventario.variavel(1000).completo)
+        self.assertEqual(self.client.requested("metadados"), [1])
+        self.assertFalse(inventario.variavel(2000).completo)
+        self.assertEqual(self.client.requested("metadados"), [1, 2, 5])
+        self.assertFalse(inventario.variavel(2000).completo)
+        self.assertEqual(self.client.requested("metadados"), [1, 2, 5])
+        with self.assertRaises(KeyError):
+            inventario.variavel(9)
+
+    def test_variable_not_indexed(self):
+        inventario = Inventario(self.client)
+        inventario.build()
+        self.assertTrue(inventario.variavel(1000).completo)
+        self.assertEqual(self.client.requested("metadados"), [1])
+        self.assertEqual(inventario.complete([(AcervoEnum.VARIAVEL, 1004)]), 0)
+
+    def test_async(self):
+        client = AsyncMockClient(catalog())
+        inventario = Inventario(client, make_indice())
+
+        async def run():
+            await inventario.build_async()
+            client.peak = 0
+            return await inventario.complete_async()
+
+        self.assertEqual(asyncio.run(run()), 3)
+        self.assertEqual(sorted(client.requested("metadados")), [1, 2, 5])
+        self.assertEqual(client.peak, 2)
+
+    def test_async_concurrency(self):
+        client = AsyncMockClient(catalog())
+        inventario = Inventario(client, make_indice())
+
+        async def run():
+            await inventario.build_async()
+            client.peak = 0
+            return await inventario.complete_async(max_concurrency=1)
+
+        self.assertEqual(asyncio.run(run()), 3)
+        self.assertEqual(client.peak, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
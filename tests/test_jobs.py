@@ -0,0 +1,150 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from clients import AsyncMockClient, MockClient
+
+from sidra_fetcher.jobs import ExtractionJob, TaskState, split_parametro
+from sidra_fetcher.mock import (
+    MockConfig,
+    MockIBGE,
+    build_localidades,
+    build_metadados,
+    build_periodos,
+    build_values,
+)
+from sidra_fetcher.reader import (
+    read_localidades,
+    read_metadados,
+    read_periodos,
+)
+from sidra_fetcher.sidra import Parametro
+from sidra_fetcher.values import read_values
+
+
+def parametro(periodos, territorios=None):
+    return Parametro(
+        agregado="1612",
+        territorios=territorios or {"6": ["all"]},
+        variaveis=["109"],
+        periodos=periodos,
+        classificacoes={},
+    )
+
+
+def mock_client(fail=0, asynchronous=False):
+    """Client whose first ``fail`` downloads raise."""
+    app = MockIBGE(MockConfig(values_rows=2))
+    Client = AsyncMockClient if asynchronous else MockClient
+    return Client(app, fail_downloads=fail)
+
+
+class TestSplitParametro(unittest.TestCase):
+    def setUp(self):
+        self.agregado = read_metadados(build_metadados(1612, ["N6"]))
+        self.agregado.periodos = read_periodos(build_periodos(4))
+        self.agregado.localidades = read_localidades(
+            build_localidades("N6", 5)
+        )
+
+    def test_split_periodos(self):
+        partes = split_parametro(parametro(["200001", "200002", "200003"]))
+        self.assertEqual(
+            [nome for nome, _ in partes],
+            [
+                "periodo=200001/part",
+                "periodo=200002/part",
+                "periodo=200003/part",
+            ],
+        )
+        self.assertEqual(partes[1][1].periodos, ["200002"])
+
+    def test_split_with_agregado(self):
+        partes = split_parametro(
+            parametro(["all"]),
+            self.agregado,
+            periodos_por_tarefa=2,
+            localidades_por_tarefa=2,
+        )
+        self.assertEqual(len(partes), 2 * 3)
+        nome, p = partes[-1]
+        self.assertEqual(nome, "periodo=200003_200004/n6-00002")
+        self.assertEqual(p.periodos, ["200003", "200004"])
+        self.assertEqual(p.territorios, {"6": ["5"]})
+
+        partes = split_parametro(parametro(["200002-200003"]), self.agregado)
+        periodos = [p.periodos for _, p in partes]
+        self.assertEqual(periodos, [["200002"], ["200003"]])
+
+    def test_unresolvable_periodos(self):
+        partes = split_parametro(parametro(["last 5"]))
+        self.assertEqual([nome for nome, _ in partes], ["part"])
+        self.assertEqual(partes[0][1].periodos, ["last 5"])
+
+
+class TestExtractionJob(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.db = self.dir / "job.db"
+        self.parametro = parametro(["200001", "200002", "200003"])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_plan_is_idempotent(self):
+        with ExtractionJob(self.db) as job:
+            self.assertEqual(job.plan(self.parametro, self.dir / "out"), 3)
+            self.assertEqual(job.plan(self.parametro, self.dir / "out"), 0)
+            self.assertEqual(job.progress()[TaskState.PENDING], 3)
+
+    def test_run_retries_with_backoff(self):
+        client = mock_client(fail=2)
+        with ExtractionJob(self.db, backoff=0) as job:
+            job.plan(self.parametro, self.dir / "out", format="json.gz")
+            progress = job.run(client)
+        self.assertEqual(progress[TaskState.DONE], 3)
+        self.assertEqual(len(client.calls), 5)
+        path = self.dir / "out" / "periodo=200002" / "part.json.gz"
+        url = self.parametro.assign("periodos", ["200002"]).url()
+        self.assertIn(url, client.calls)
+        self.assertEqual(read_values(path), build_values(2))
+
+    def test_failed_tasks(self):
+        client = mock_client(fail=100)
+        with ExtractionJob(self.db, max_attempts=2, backoff=0) as job:
+            job.plan(self.parametro, self.dir / "out")
+            progress = job.run(client)
+            self.assertEqual(progress[TaskState.FAILED], 3)
+            self.assertEqual(len(client.calls), 6)
+            self.assertIn("boom", job.failed()[0]["error"])
+            self.assertEqual(job.retry_failed(), 3)
+            progress = job.run(mock_client())
+        self.assertEqual(progress[TaskState.DONE], 3)
+
+    def test_resume_after_crash(self):
+        job = ExtractionJob(self.db)
+        job.plan(self.parametro, self.dir / "out")
+        job._claim()
+        job.close()  # The process dies with a task running
+
+        client = mock_client()
+        with ExtractionJob(self.db) as job:
+            self.assertEqual(job.progress()[TaskState.RUNNING], 0)
+            job.run(client)
+            job.plan(self.parametro, self.dir / "out")
+            job.run(client)
+        self.assertEqual(len(client.calls), 3)
+
+    def test_run_async(self):
+        client = mock_client(fail=1, asynchronous=True)
+        with ExtractionJob(self.db, backoff=0) as job:
+            job.plan(self.parametro, self.dir / "out")
+            progress = asyncio.run(job.run_async(client, max_concurrency=2))
+        self.assertEqual(progress[TaskState.DONE], 3)
+        self.assertEqual(len(client.calls), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
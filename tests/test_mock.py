@@ -0,0 +1,119 @@
+import asyncio
+import json
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+
+from sidra_fetcher.fetcher import AsyncSidraClient, SidraClient
+from sidra_fetcher.mock import MockConfig, MockIBGE, MockIBGEServer
+from sidra_fetcher.replay import (
+    AsyncRecordReplayTransport,
+    AsyncRedirectTransport,
+    RecordReplayTransport,
+    RedirectTransport,
+)
+
+AGREGADOS = "https://servicodados.ibge.gov.br/api/v3/agregados"
+
+
+class TestMockIBGE(unittest.TestCase):
+    def test_routes(self):
+        app = MockIBGE(MockConfig(n_periodos=12, n_localidades={"N3": 4}))
+
+        status, _, body = app.respond(f"{AGREGADOS}/1705/metadados")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["id"], 1705)
+
+        _, _, body = app.respond(f"{AGREGADOS}/1705/periodos")
+        self.assertEqual(len(json.loads(body)), 12)
+
+        _, _, body = app.respond(f"{AGREGADOS}/1705/localidades/N1|N3")
+        niveis = [loc["nivel"]["id"] for loc in json.loads(body)]
+        self.assertEqual(niveis, ["N1"] + ["N3"] * 4)
+
+        status, _, _ = app.respond("https://apisidra.ibge.gov.br/values/t/1")
+        self.assertEqual(status, 200)
+        status, _, _ = app.respond("https://example.com/unknown")
+        self.assertEqual(status, 404)
+        self.assertEqual(app.requests["localidades"], 1)
+
+    def test_throttling(self):
+        app = MockIBGE(MockConfig(throttle_rps=0.001, throttle_burst=2))
+        statuses = [app.respond(AGREGADOS)[0] for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 429, 429])
+
+    def test_error_rate_is_deterministic(self):
+        def statuses():
+            app = MockIBGE(MockConfig(error_rate=0.5, seed=42))
+            return [app.respond(AGREGADOS)[0] for _ in range(20)]
+
+        first = statuses()
+        self.assertIn(503, first)
+        self.assertIn(200, first)
+        self.assertEqual(first, statuses())
+
+    def test_server(self):
+        with MockIBGEServer(MockIBGE(MockConfig(n_agregados=7))) as server:
+            url = f"{server.base_url}/api/v3/agregados"
+            with urllib.request.urlopen(url) as response:
+                data = json.load(response)
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                urllib.request.urlopen(f"{server.base_url}/nope")
+            ctx.exception.close()
+        self.assertEqual(sum(len(p["agregados"]) for p in data), 7)
+        self.assertEqual(ctx.exception.code, 404)
+
+
+
+class TestTransports(unittest.TestCase):
+    def setUp(self):
+        self.app = MockIBGE(MockConfig(niveis=["N1", "N3"]))
+
+    def test_redirect(self):
+        with MockIBGEServer(self.app) as server:
+            transport = RedirectTransport(server.base_url)
+            with SidraClient(transport=transport) as client:
+                agregado = client.get_agregado(1705)
+        self.assertEqual(agregado.id, 1705)
+        self.assertEqual(self.app.requests["localidades"], 1)
+
+    def test_async_redirect(self):
+        async def get_agregado(base_url):
+            transport = AsyncRedirectTransport(base_url)
+            async with AsyncSidraClient(transport=transport) as client:
+                return await client.get_agregado(1705)
+
+        with MockIBGEServer(self.app) as server:
+            agregado = asyncio.run(get_agregado(server.base_url))
+        self.assertEqual(len(agregado.localidades), 1 + 27)
+        self.assertEqual(self.app.requests["metadados"], 1)
+
+    def test_record_then_replay(self):
+        fixtures = tempfile.TemporaryDirectory()
+        self.addCleanup(fixtures.cleanup)
+        with MockIBGEServer(self.app) as server:
+            transport = RecordReplayTransport(
+                fixtures.name, "record", server.transport()
+            )
+            with SidraClient(transport=transport) as client:
+                recorded = client.get_agregado(1705)
+
+        # The server is stopped: every request is served from fixtures
+        transport = RecordReplayTransport(fixtures.name)
+        with SidraClient(transport=transport) as client:
+            self.assertEqual(client.get_agregado(1705), recorded)
+            with self.assertRaises(FileNotFoundError):
+                client.get(f"{AGREGADOS}/1706/metadados")
+
+        async def replay():
+            transport = AsyncRecordReplayTransport(fixtures.name)
+            async with AsyncSidraClient(transport=transport) as client:
+                return await client.get_agregado(1705)
+
+        self.assertEqual(asyncio.run(replay()), recorded)
+        self.assertEqual(sum(self.app.requests.values()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
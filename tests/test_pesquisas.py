@@ -0,0 +1,73 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from sidra_fetcher.agregados import IndiceAgregado, IndicePesquisaAgregados
+from sidra_fetcher.mock import build_indice, build_metadados
+from sidra_fetcher.pesquisas import PesquisaIndex
+from sidra_fetcher.reader import read_metadados
+from sidra_fetcher.stats import AgregadoCounts, calculate_aggregate
+
+
+class TestPesquisaIndex(unittest.TestCase):
+    def setUp(self):
+        self.pesquisas = PesquisaIndex(build_indice(12))
+
+    def test_lookup(self):
+        pesquisas = self.pesquisas
+        self.assertEqual(len(pesquisas), 12)
+        self.assertEqual(pesquisas[1007].id, "P1")
+        self.assertIs(pesquisas[1005], pesquisas[1009])
+        self.assertIsNone(pesquisas.get(1))
+        self.assertNotIn(1, pesquisas)
+        self.assertEqual(pesquisas.agregados("P2"), [1010, 1011])
+        with self.assertRaises(KeyError):
+            pesquisas[1]
+
+    def test_from_objects(self):
+        pesquisas = PesquisaIndex(
+            [
+                IndicePesquisaAgregados(
+                    id="CD",
+                    nome="Censo",
+                    agregados=[IndiceAgregado(id=1705, nome="")],
+                )
+            ]
+        )
+        self.assertEqual(pesquisas[1705].nome, "Censo")
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "pesquisas.json"
+            self.pesquisas.save(path)
+            loaded = PesquisaIndex.load(path)
+        self.assertEqual(loaded.pesquisas, self.pesquisas.pesquisas)
+        self.assertEqual(list(loaded), list(self.pesquisas))
+
+    def test_fills_agregados(self):
+        metadados = build_metadados(1003, ["N1"])
+        self.assertEqual(read_metadados(metadados).pesquisa.id, "")
+        agregado = read_metadados(metadados, self.pesquisas)
+        self.assertEqual(agregado.pesquisa.id, "P0")
+
+        # The agregado filled is a copy
+        agregado = read_metadados(metadados)
+        filled = self.pesquisas.fill(agregado)
+        self.assertEqual(filled.pesquisa.id, "P0")
+        self.assertEqual(agregado.pesquisa.id, "")
+
+        unknown = read_metadados(build_metadados(1, ["N1"]), self.pesquisas)
+        self.assertEqual(unknown.pesquisa.id, "")
+
+    def test_stats_pesquisa_id(self):
+        agregado = read_metadados(build_metadados(1003, ["N1"]))
+        result = calculate_aggregate(agregado, self.pesquisas)
+        self.assertEqual(result["pesquisa_id"], "P0")
+        counts = AgregadoCounts.from_raw(
+            build_metadados(1011, ["N1"]), 1, {"N1": 1}, self.pesquisas
+        )
+        self.assertEqual(counts.pesquisa_id, "P2")
+
+
+if __name__ == "__main__":
+    unittest.main()
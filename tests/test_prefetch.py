@@ -0,0 +1,122 @@
+import asyncio
+import time
+import unittest
+
+from clients import AsyncMockClient, MockClient
+
+from sidra_fetcher.agregados import IndiceAgregado, IndicePesquisaAgregados
+from sidra_fetcher.cache import ObjectCache
+from sidra_fetcher.instrumentation import EventType
+from sidra_fetcher.prefetch import Prefetcher
+
+INDICE = [
+    IndicePesquisaAgregados(
+        id="P1",
+        nome="Pesquisa 1",
+        agregados=[IndiceAgregado(id=i, nome=str(i)) for i in range(1, 6)],
+    ),
+    IndicePesquisaAgregados(
+        id="P2",
+        nome="Pesquisa 2",
+        agregados=[IndiceAgregado(id=i, nome=str(i)) for i in range(10, 13)],
+    ),
+]
+
+
+def bytes_of(agregado_id):
+    """Return the bytes downloaded by one ``get_agregado``."""
+    client = MockClient()
+    sizes = []
+    client.instrumentation.add_hook(
+        lambda e: e.type is EventType.BYTES and sizes.append(e.value)
+    )
+    client.get_agregado(agregado_id)
+    return sum(sizes)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.005)
+
+
+class TestPrefetcher(unittest.TestCase):
+    def test_requires_cache(self):
+        client = MockClient()
+        with self.assertRaises(ValueError):
+            Prefetcher(client)
+
+    def test_predict_prior_and_history(self):
+        prefetcher = Prefetcher(MockClient(cache=ObjectCache()), INDICE)
+        # Nearest siblings first, never other pesquisas
+        self.assertEqual(prefetcher.predict(3, n=2), [2, 4])
+        self.assertEqual(prefetcher.predict(11), [10, 12])
+        self.assertEqual(prefetcher.predict(99), [])
+
+        for _ in range(2):
+            prefetcher.record(3)
+            prefetcher.record(10)
+        self.assertEqual(prefetcher.predict(3)[0], 10)
+        prefetcher.close()
+
+    def test_warms_cache_when_idle(self):
+        client = MockClient(cache=ObjectCache())
+        with Prefetcher(
+            client, INDICE, max_prefetch=2, idle_delay=0.01
+        ) as prefetcher:
+            client.get_agregado(1)
+            wait_for(lambda: prefetcher.prefetched == 2)
+
+            self.assertEqual(client.requested("metadados"), [1, 2, 3])
+            requested = len(client.urls)
+            client.get_agregado(2)
+            self.assertEqual(len(client.urls), requested)
+
+    def test_waits_for_idle(self):
+        client = MockClient(cache=ObjectCache())
+        with Prefetcher(client, INDICE, idle_delay=0.2) as prefetcher:
+            client.get_agregado(1)
+            time.sleep(0.05)
+            self.assertEqual(prefetcher.prefetched, 0)
+            wait_for(lambda: prefetcher.prefetched > 0)
+
+    def test_budget(self):
+        client = MockClient(cache=ObjectCache())
+        budget = bytes_of(1) * 3 // 2
+        with Prefetcher(
+            client, INDICE, max_prefetch=4, budget_bytes=budget, idle_delay=0
+        ) as prefetcher:
+            client.get_agregado(1)
+            wait_for(lambda: prefetcher.prefetched == 2)
+            time.sleep(0.05)
+            self.assertEqual(prefetcher.prefetched, 2)
+
+    def test_close_detaches(self):
+        client = MockClient(cache=ObjectCache())
+        prefetcher = Prefetcher(client, INDICE)
+        prefetcher.close()
+        self.assertNotIn(prefetcher, client.instrumentation.hooks)
+        client.get_agregado(1)
+        self.assertEqual(client.requested("metadados"), [1])
+
+
+class TestAsyncPrefetcher(unittest.IsolatedAsyncioTestCase):
+    async def test_warms_cache_when_idle(self):
+        client = AsyncMockClient(cache=ObjectCache())
+        with Prefetcher(
+            client, INDICE, max_prefetch=2, idle_delay=0.01
+        ) as prefetcher:
+            await client.get_agregado(11)
+            for _ in range(100):
+                if prefetcher.prefetched == 2:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(
+                sorted(client.requested("metadados")), [10, 11, 12]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,242 @@
+import unittest
+from dataclasses import replace
+
+from sidra_fetcher.agregados import Categoria, ClassificacaoSumarizacao
+from sidra_fetcher.mock import build_metadados
+from sidra_fetcher.reader import read_metadados
+from sidra_fetcher.rollup import Reason, rollup_categorias, rollup_territorios
+from sidra_fetcher.territorio import TerritorioIndex
+
+try:
+    import numpy  # noqa: F401
+except ImportError:
+    numpy = None
+
+HEADER = {
+    "NC": "Nível Territorial (Código)",
+    "NN": "Nível Territorial",
+    "MC": "Unidade de Medida (Código)",
+    "MN": "Unidade de Medida",
+    "V": "Valor",
+    "D1C": "Município (Código)",
+    "D1N": "Município",
+    "D2C": "Variável (Código)",
+    "D2N": "Variável",
+    "D3C": "Ano (Código)",
+    "D3N": "Ano",
+    "D4C": "Classificação 0 (Código)",
+    "D4N": "Classificação 0",
+}
+
+MUNICIPIOS = {"33": ["3300100", "3300209"], "35": ["3500105", "3500204"]}
+
+
+def row(municipio, variavel, categoria, valor, ano="2020"):
+    return {
+        "NC": "6",
+        "NN": "Município",
+        "MC": "1",
+        "MN": "Unidades",
+        "V": valor,
+        "D1C": municipio,
+        "D1N": f"Município {municipio}",
+        "D2C": str(variavel),
+        "D2N": f"Variável {variavel}",
+        "D3C": ano,
+        "D3N": ano,
+        "D4C": str(categoria),
+        "D4N": f"Categoria {categoria}",
+    }
+
+
+def make_agregado():
+    metadados = build_metadados(1, ["N6"], n_classificacoes=1, n_categorias=3)
+    metadados["variaveis"][1]["sumarizacao"] = []
+    return read_metadados(metadados)
+
+
+def make_indice():
+    return TerritorioIndex.from_localidades(
+        {"id": m, "nome": m, "nivel": {"id": "N6", "nome": "Município"}}
+        for ids in MUNICIPIOS.values()
+        for m in ids
+    )
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestRollupTerritorios(unittest.TestCase):
+    def setUp(self):
+        self.agregado = make_agregado()
+        self.indice = make_indice()
+
+    def rollup(self, rows, nivel="N3"):
+        return rollup_territorios(
+            [HEADER, *rows], self.agregado, self.indice, nivel
+        )
+
+    def test_sums_states(self):
+        rows = [
+            row("3300100", 1000, 10001, "1.5"),
+            row("3300209", 1000, 10001, "2.25"),
+            row("3500105", 1000, 10001, "-"),
+            row("3500204", 1000, 10001, "-"),
+            row("3300100", 1000, 10002, "10"),
+            row("3300209", 1000, 10002, "20"),
+        ]
+        result = self.rollup(rows)
+
+        self.assertEqual(
+            result.rows[0]["D1C"], "Unidade da Federação (Código)"
+        )
+        valores = {(r["D1C"], r["D4C"]): r["V"] for r in result.rows[1:]}
+        self.assertEqual(
+            valores,
+            {
+                ("33", "10001"): "3.75",
+                ("35", "10001"): "-",
+                ("33", "10002"): "30",
+            },
+        )
+        derived = result.rows[1]
+        self.assertEqual(
+            (derived["NC"], derived["NN"]), ("3", "Unidade da Federação")
+        )
+        self.assertEqual(derived["D1N"], "Rio de Janeiro")
+        self.assertEqual(result.underivable, [])
+
+        brasil = self.rollup(rows, "N1")
+        self.assertEqual(
+            [(r["D1C"], r["D4C"], r["V"]) for r in brasil.rows[1:]],
+            [("1", "10001", "3.75")],
+        )
+        self.assertEqual(brasil.underivable[0][1], Reason.INCOMPLETE)
+
+    def test_reports_underivable(self):
+        rows = [
+            row("3300100", 1000, 10001, "1"),
+            row("3300209", 1000, 10001, "X"),
+            row("3500105", 1000, 10001, "1"),
+            row("3300100", 1001, 10001, "1"),
+            row("3300209", 1001, 10001, "1"),
+        ]
+        result = self.rollup(rows)
+        self.assertEqual(result.rows[1:], [])
+        reasons = {
+            (r["D1C"], r["D2C"]): reason for r, reason in result.underivable
+        }
+        self.assertEqual(
+            reasons,
+            {
+                ("33", "1000"): Reason.SYMBOL,
+                ("35", "1000"): Reason.INCOMPLETE,
+                ("33", "1001"): Reason.NOT_SUMMABLE,
+            },
+        )
+        self.assertNotIn("V", result.underivable[0][0])
+
+    def test_decimals_per_variable(self):
+        self.agregado.variaveis[1].sumarizacao = ["nivelTerritorial"]
+        rows = [
+            row("3300100", 1000, 10001, "1.1"),
+            row("3300209", 1000, 10001, "2.2"),
+            row("3300100", 1001, 10001, "0.1234567890123456"),
+            row("3300209", 1001, 10001, "0"),
+        ]
+        result = self.rollup(rows)
+        valores = {r["D2C"]: r["V"] for r in result.rows[1:]}
+        self.assertEqual(
+            valores, {"1000": "3.3", "1001": "0.1234567890123456"}
+        )
+
+    def test_duplicate_rows(self):
+        rows = [
+            row("3500105", 1000, 10001, "1"),
+            row("3500105", 1000, 10001, "1"),
+        ]
+        result = self.rollup(rows)
+        self.assertEqual(result.rows[1:], [])
+        self.assertEqual(result.underivable[0][1], Reason.INCOMPLETE)
+
+    def test_needs_header(self):
+        with self.assertRaises(ValueError):
+            rollup_territorios(
+                [row("3300100", 1000, 10001, "1")], self.agregado, self.indice
+            )
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestRollupCategorias(unittest.TestCase):
+    def setUp(self):
+        self.agregado = make_agregado()
+        self.rows = [
+            HEADER,
+            row("3300100", 1000, 10001, "1.5"),
+            row("3300100", 1000, 10002, "2"),
+            row("3300209", 1000, 10001, "4"),
+        ]
+
+    def test_sums_total(self):
+        result = rollup_categorias(self.rows, self.agregado, 100)
+        self.assertEqual(len(result.rows), 2)
+        total = result.rows[1]
+        self.assertEqual((total["D4C"], total["V"]), ("10000", "3.5"))
+        self.assertEqual(total["D4N"], "Categoria 0.0")
+        [(cell, reason)] = result.underivable
+        self.assertEqual((cell["D1C"], reason), ("3300209", Reason.INCOMPLETE))
+
+    def test_sumarizacao(self):
+        classificacao = self.agregado.classificacoes[0]
+        for sumarizacao, reason in [
+            (ClassificacaoSumarizacao(False, []), Reason.NOT_SUMMABLE),
+            (ClassificacaoSumarizacao(True, [10002]), Reason.EXCEPTION),
+        ]:
+            agregado = replace(
+                self.agregado,
+                classificacoes=[
+                    replace(classificacao, sumarizacao=sumarizacao)
+                ],
+            )
+            result = rollup_categorias(self.rows, agregado, 100)
+            self.assertEqual(result.rows[1:], [])
+            self.assertEqual({r for _, r in result.underivable}, {reason})
+
+    def test_derives_every_level(self):
+        # 10000 > (10001 > (10003, 10004), 10002)
+        classificacao = self.agregado.classificacoes[0]
+        categorias = [
+            Categoria(id=10000 + i, nome=str(i), unidade=None, nivel=nivel)
+            for i, nivel in enumerate([0, 1, 1, 2, 2])
+        ]
+        categorias[2:] = categorias[3:] + categorias[2:3]
+        agregado = replace(
+            self.agregado,
+            classificacoes=[replace(classificacao, categorias=categorias)],
+        )
+        rows = [
+            HEADER,
+            row("3300100", 1000, 10003, "1"),
+            row("3300100", 1000, 10004, "2"),
+            row("3300100", 1000, 10002, "4"),
+            row("3300209", 1000, 10001, "5"),
+            row("3300209", 1000, 10002, "X"),
+        ]
+        result = rollup_categorias(rows, agregado, 100)
+        valores = {(r["D1C"], r["D4C"]): r["V"] for r in result.rows[1:]}
+        self.assertEqual(
+            valores, {("3300100", "10001"): "3", ("3300100", "10000"): "7"}
+        )
+        self.assertEqual(
+            [(r["D1C"], r["D4C"], m) for r, m in result.underivable],
+            [("3300209", "10000", Reason.SYMBOL)],
+        )
+
+        only_total = rollup_categorias(rows, agregado, 100, categorias=[10000])
+        self.assertEqual([r["D4C"] for r in only_total.rows[1:]], ["10000"])
+
+    def test_unknown_classificacao(self):
+        with self.assertRaises(ValueError):
+            rollup_categorias(self.rows, self.agregado, 999)
+
+
+if __name__ == "__main__":
+    unittest.main()
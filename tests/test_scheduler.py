@@ -0,0 +1,179 @@
+import asyncio
+import unittest
+from pathlib import Path
+
+from sidra_fetcher.instrumentation import EventType, Instrumentation
+from sidra_fetcher.scheduler import Priority, RequestScheduler
+
+
+class FakeClient:
+    """Async client whose requests complete when ``release`` is called."""
+
+    def __init__(self):
+        self.instrumentation = Instrumentation()
+        self.started = []
+        self.gates = {}
+
+    async def get(self, url):
+        self.started.append(url)
+        gate = self.gates[url] = asyncio.Event()
+        await gate.wait()
+        return url
+
+    async def get_acervo(self, acervo):
+        return await self.get(f"acervo={acervo}")
+
+    async def _download_file(self, url, sink):
+        return Path(await self.get(url))
+
+    async def download_values(self, url, dest):
+        return await self._download_file(url, dest)
+
+    def release(self, url):
+        self.gates[url].set()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestRequestScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_priority_order(self):
+        client = FakeClient()
+        scheduler = RequestScheduler(client, max_concurrency=1, reserved=0)
+        first = asyncio.create_task(scheduler.get("a"))
+        await settle()
+        tasks = [
+            asyncio.create_task(scheduler.get(url, priority))
+            for url, priority in [
+                ("bulk", Priority.BULK),
+                ("normal", Priority.NORMAL),
+                ("interactive", Priority.INTERACTIVE),
+            ]
+        ]
+        await settle()
+        self.assertEqual(
+            scheduler.queue_depth(),
+            {
+                ("interactive", "default"): 1,
+                ("normal", "default"): 1,
+                ("bulk", "default"): 1,
+            },
+        )
+        for url in ["a", "interactive", "normal", "bulk"]:
+            await settle()
+            self.assertEqual(client.started[-1], url)
+            client.release(url)
+        self.assertEqual(await first, "a")
+        await asyncio.gather(*tasks)
+        self.assertEqual(scheduler.running, 0)
+
+    async def test_reserved_slot(self):
+        client = FakeClient()
+        scheduler = RequestScheduler(client, max_concurrency=2, reserved=1)
+        bulk = [
+            asyncio.create_task(scheduler.get(f"b{i}", Priority.BULK))
+            for i in range(3)
+        ]
+        interactive = asyncio.create_task(
+            scheduler.get("i", Priority.INTERACTIVE)
+        )
+        await settle()
+        self.assertEqual(client.started, ["b0", "i"])
+        client.release("i")
+        self.assertEqual(await interactive, "i")
+        for url in ["b0", "b1", "b2"]:
+            await settle()
+            client.release(url)
+        await asyncio.gather(*bulk)
+
+    async def test_weighted_fair_queuing(self):
+        client = FakeClient()
+        scheduler = RequestScheduler(
+            client, max_concurrency=1, reserved=0, weights={"a": 2}
+        )
+        tasks = [asyncio.create_task(scheduler.get("first"))]
+        await settle()
+        for i in range(4):
+            for tenant in "ab":
+                url = f"{tenant}{i}"
+                task = asyncio.create_task(scheduler.get(url, tenant=tenant))
+                tasks.append(task)
+        await settle()
+        client.release("first")
+        for _ in range(6):
+            await settle()
+            client.release(client.started[-1])
+        # Tenant "a" weighs 2: twice the slots of "b" while both wait
+        self.assertEqual(
+            client.started[1:], ["a0", "b0", "a1", "a2", "b1", "a3"]
+        )
+        for _ in range(2):
+            await settle()
+            client.release(client.started[-1])
+        await asyncio.gather(*tasks)
+
+    async def test_deadline_and_cancel(self):
+        client = FakeClient()
+        scheduler = RequestScheduler(client, max_concurrency=1, reserved=0)
+        running = asyncio.create_task(scheduler.get("a"))
+        await settle()
+        with self.assertRaises(TimeoutError):
+            await scheduler.get("late", deadline=0.01)
+        queued = [
+            asyncio.create_task(scheduler.get(f"t{i}", tenant="crawler"))
+            for i in range(2)
+        ]
+        await settle()
+        self.assertEqual(scheduler.cancel(tenant="crawler"), 2)
+        for task in queued:
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        self.assertEqual(scheduler.queue_depth(), {})
+        client.release("a")
+        await running
+        self.assertEqual(client.started, ["a"])
+        self.assertEqual(scheduler.running, 0)
+
+    async def test_client_view_and_events(self):
+        client = FakeClient()
+        events = []
+        client.instrumentation.add_hook(events.append)
+        scheduler = RequestScheduler(client, max_concurrency=2)
+        view = scheduler.client(Priority.INTERACTIVE, tenant="dashboard")
+        task = asyncio.create_task(view.get_acervo("A"))
+        await settle()
+        self.assertEqual(scheduler.running, 1)
+        self.assertIn("sidra_fetcher_scheduler_running 1", scheduler.render())
+        client.release("acervo=A")
+        self.assertEqual(await task, "acervo=A")
+        self.assertEqual(events[0].type, EventType.QUEUE_WAIT)
+        self.assertEqual(events[0].endpoint, "interactive")
+
+    async def test_downloads_take_slots(self):
+        client = FakeClient()
+        scheduler = RequestScheduler(client, max_concurrency=2, reserved=1)
+        bulk = scheduler.client(Priority.BULK, tenant="crawl")
+        downloads = [
+            asyncio.create_task(bulk.download_values(f"v{i}", None))
+            for i in range(2)
+        ]
+        interactive = asyncio.create_task(
+            scheduler.get("i", Priority.INTERACTIVE)
+        )
+        await settle()
+        # The second download waits, the reserved slot stays free
+        self.assertEqual(client.started, ["v0", "i"])
+        self.assertEqual(scheduler.queue_depth(), {("bulk", "crawl"): 1})
+        for url in ["i", "v0", "v1"]:
+            client.release(url)
+            await settle()
+        self.assertEqual(
+            await asyncio.gather(*downloads), [Path("v0"), Path("v1")]
+        )
+        await interactive
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from clients import AsyncMockClient, MockClient
+
+from sidra_fetcher.jobs import TaskState
+from sidra_fetcher.mock import MockConfig, MockIBGE, build_values
+from sidra_fetcher.shard import (
+    HashRing,
+    ShardQueue,
+    merge,
+    plan_catalog,
+    run_worker,
+    run_worker_async,
+)
+from sidra_fetcher.sidra import Parametro
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def crawl_client(client=MockClient, fail=()):
+    """Return a client serving agregados 1000 to 1002, one row per value."""
+    config = MockConfig(
+        niveis=["N6"],
+        n_agregados=3,
+        n_periodos=2,
+        n_localidades={"N6": 3},
+        values_rows=1,
+    )
+    return client(MockIBGE(config), fail=fail)
+
+
+def values_of(agregado):
+    return Parametro(
+        agregado=str(agregado.id),
+        territorios={"6": ["all"]},
+        variaveis=["allxp"],
+        periodos=["all"],
+        classificacoes={},
+    )
+
+
+class TestHashRing(unittest.TestCase):
+    def test_consistent(self):
+        keys = [f"agregado/{i}" for i in range(500)]
+        ring = HashRing(["a", "b", "c"])
+        owners = {key: ring.owner(key) for key in keys}
+        self.assertEqual(set(owners.values()), {"a", "b", "c"})
+        reordered = HashRing(["c", "b", "a"])
+        self.assertEqual(owners, {k: reordered.owner(k) for k in keys})
+
+        # Only the keys of the removed worker move
+        smaller = HashRing(["a", "b"])
+        for key, owner in owners.items():
+            if owner != "c":
+                self.assertEqual(smaller.owner(key), owner)
+        self.assertIsNone(HashRing([]).owner("x"))
+
+
+class TestShardQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.clock = Clock()
+        self.queues = []
+
+    def tearDown(self):
+        for queue in self.queues:
+            queue.close()
+        self.tmp.cleanup()
+
+    def queue(self, worker, **kwargs):
+        queue = ShardQueue(
+            self.dir / "crawl.db", worker, lease=60, clock=self.clock, **kwargs
+        )
+        self.queues.append(queue)
+        return queue
+
+    def test_claims_are_disjoint_and_prefer_owned(self):
+        a, b = self.queue("a"), self.queue("b")
+        tasks = [(f"k{i}", "agregado", {"id": i}) for i in range(40)]
+        self.assertEqual(a.add(tasks), 40)
+        self.assertEqual(b.add(tasks), 0)
+
+        # Both workers are known after their first claim
+        claimed = [a.claim().key, b.claim().key]
+        self.assertEqual(a.workers(), ["a", "b"])
+        ring = a.ring()
+        for _ in range(10):
+            claimed += [a.claim().key, b.claim().key]
+            self.assertEqual(ring.owner(claimed[-2]), "a")
+            self.assertEqual(ring.owner(claimed[-1]), "b")
+        self.assertEqual(len(set(claimed)), len(claimed))
+
+    def test_dead_worker(self):
+        a, b = self.queue("a"), self.queue("b")
+        a.add([("k", "agregado", {"id": 1})])
+        task = a.claim()
+        self.assertIsNone(b.claim())
+        self.assertEqual(b.wait_time(), 60)
+
+        # a stops claiming: it leaves the ring, its task is claimed again
+        self.clock.sleep(61)
+        again = b.claim()
+        self.assertEqual((again.key, again.attempts), ("k", 1))
+        self.assertEqual(b.workers(), ["b"])
+        self.assertFalse(a.renew(task))
+        # A late a does not finish the task b runs
+        self.assertFalse(a.complete(task))
+        self.assertEqual(b.progress()[TaskState.RUNNING], 1)
+        self.assertTrue(b.renew(again))
+        self.assertTrue(b.complete(again))
+        self.assertEqual(b.progress()[TaskState.DONE], 1)
+        self.assertIsNone(b.wait_time())
+
+    def test_heartbeat(self):
+        path = self.dir / "crawl.db"
+        a = ShardQueue(path, "a", lease=0.3)
+        b = ShardQueue(path, "b", lease=0.3)
+        self.queues += [a, b]
+        a.add([("k", "agregado", {"id": 1})])
+        task = a.claim()
+        with a.heartbeat(task):
+            time.sleep(0.6)
+            self.assertIsNone(b.claim())
+        self.assertTrue(a.complete(task))
+
+    def test_fail_until_max_attempts(self):
+        a = self.queue("a", max_attempts=2)
+        a.add([("k", "agregado", {"id": 1})])
+        a.fail(a.claim(), ConnectionError("boom"))
+        self.assertEqual(a.progress()[TaskState.PENDING], 1)
+        a.fail(a.claim(), ConnectionError("boom"))
+        self.assertEqual(a.progress()[TaskState.FAILED], 1)
+        self.assertIsNone(a.claim())
+
+    def test_stale_staging_removed(self):
+        a, b = self.queue("a"), self.queue("b")
+        path = self.dir / "values" / "1.json"
+        url = values_of(crawl_client().get_agregado(1000)).url()
+        payload = {"url": url, "path": str(path), "format": "json"}
+        a.add([("values/1", "values", payload)])
+        a.claim()
+
+        # a dies during the download, b claims the task again
+        path.parent.mkdir()
+        path.with_name("1.json.0.part").write_text("[")
+        self.clock.sleep(61)
+        run_worker(b, crawl_client(), sleep=self.clock.sleep)
+        self.assertEqual(list(path.parent.iterdir()), [path])
+
+    def test_crawl_and_merge(self):
+        a, b = self.queue("a"), self.queue("b")
+        client = crawl_client()
+        out = self.dir / "out"
+        self.assertEqual(plan_catalog(a, client, out), 3)
+
+        # a dies holding a task, b finishes the crawl after its lease
+        lost = a.claim().payload["id"]
+        client.fail = {max({1000, 1001, 1002} - {lost})}
+        progress = run_worker(b, client, values_of, sleep=self.clock.sleep)
+        self.assertEqual(progress[TaskState.DONE], 2 + 4)
+        self.assertEqual(progress[TaskState.FAILED], 1)
+        self.assertEqual(client.calls.count(lost), 1)
+        self.assertGreaterEqual(self.clock(), 60)
+
+        result = merge(b, self.dir / "merged")
+        self.assertEqual(result, {"agregados": 2, "values": 2})
+        agregados = json.loads(
+            (self.dir / "merged" / "agregados.json").read_text()
+        )
+        ids = sorted({1000, 1001, 1002} - client.fail)
+        self.assertEqual([a["id"] for a in agregados], ids)
+        rows = json.loads(
+            (self.dir / "merged" / "values" / f"{ids[0]}.json").read_text()
+        )
+        # One header over the rows of both periods
+        self.assertEqual(rows[0], build_values(0)[0])
+        self.assertEqual(len(rows), 3)
+
+    def test_run_worker_async(self):
+        a = self.queue("a")
+        plan_catalog(a, crawl_client(), self.dir / "out")
+        client = crawl_client(AsyncMockClient)
+        progress = asyncio.run(
+            run_worker_async(a, client, values_of, max_concurrency=2)
+        )
+        self.assertEqual(progress[TaskState.DONE], 3 + 6)
+        files = list((self.dir / "out" / "values").rglob("*"))
+        self.assertEqual(len([f for f in files if f.is_file()]), 6)
+        self.assertTrue(all(f.suffix == ".json" for f in files if f.is_file()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ import unittest
 from sidra_fetcher.sidra import (
     Parametro,
     Precisao,
+    get_sidra_url_request_period,
     parameter_from_url,
     parse_aggregate,
     parse_classifications,
@@ -102,6 +103,12 @@ class TestSidra(unittest.TestCase):
             },
         )
 
+    def test_get_sidra_url_request_period(self):
+        parameter = parameter_from_url(url)
+        period_url = get_sidra_url_request_period(parameter, 202001)
+        self.assertIn("/p/202001/", period_url)
+        self.assertEqual(parameter.periodos, ["all"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,21 +1,36 @@
+import asyncio
+import tempfile
 import unittest
+from pathlib import Path
 from unittest.mock import Mock
 
+from clients import AsyncMockClient, MockClient
+
 from sidra_fetcher.agregados import (
     Agregado,
     AgregadoNivelTerritorial,
     Categoria,
     Classificacao,
     ClassificacaoSumarizacao,
+    LazyAgregado,
     Localidade,
     NivelTerritorial,
     Periodicidade,
     Periodo,
     Pesquisa,
     Variavel,
+    build_url_metadados,
 )
+from sidra_fetcher.mock import MockConfig, MockIBGE
 from sidra_fetcher.stats import (
+    AgregadoCounts,
+    CountIndex,
     calculate_aggregate,
+    calculate_aggregate_counts,
+    calculate_catalog,
+    count_localidades,
+    fetch_counts,
+    fetch_counts_async,
     get_n_dimensoes,
     get_stat_localidades,
 )
@@ -127,6 +142,144 @@ class TestStats(unittest.TestCase):
         # variavel_size = 6
         self.assertEqual(result["variavel_size"], 6)
 
+    def test_calculate_aggregate_lazy(self):
+        eager = self.create_dummy_agregado()
+        eager.nivel_territorial.administrativo = ["N1", "N2"]
+        sizes = {"periodos": 2, "N1": 2, "N2": 1}
+        client = Mock()
+        client.get.side_effect = lambda url: [{}] * sizes[url.split("/")[-1]]
+        agregado = LazyAgregado(eager, client)
+
+        self.assertEqual(
+            calculate_aggregate(agregado), calculate_aggregate(eager)
+        )
+        client.get_agregado_periodos.assert_not_called()
+        client.get_agregado_localidades.assert_not_called()
+
+
+class RejectingIBGE(MockIBGE):
+    """Reject the localidades of several levels at once."""
+
+    def respond(self, url):
+        if "/localidades/" in url and ("|" in url or "%7C" in url):
+            return 400, {}, b'{"erro": 400}'
+        return super().respond(url)
+
+
+class TestCounts(unittest.TestCase):
+    def setUp(self):
+        self.app = MockIBGE(
+            MockConfig(
+                niveis=["N1", "N3"],
+                n_periodos=4,
+                n_localidades={"N3": 27},
+            )
+        )
+        self.client = MockClient(self.app)
+
+    def test_count_localidades(self):
+        data = [
+            {"id": "1", "nome": "Brasil", "nivel": {"id": "N1"}},
+            {"id": "11", "nome": "RO", "nivel": {"id": "N3"}},
+            {"id": "12", "nome": "AC", "nivel": {"id": "N3"}},
+        ]
+        self.assertEqual(count_localidades(data), {"N1": 1, "N3": 2})
+        self.assertEqual(count_localidades([]), {})
+
+    def test_fetch_counts_matches_calculate_aggregate(self):
+        counts = fetch_counts(self.client, 1705)
+
+        # One request for every level of localidades
+        self.assertEqual(len(self.client.urls), 3)
+        self.assertEqual(counts.stat_localidades, {"N1": 1, "N3": 27})
+        self.assertEqual(counts.n_periodos, 4)
+
+        self.assertEqual(
+            calculate_aggregate_counts(counts),
+            calculate_aggregate(self.client.get_agregado(1705)),
+        )
+
+    def test_fetch_counts_splits_rejected_levels(self):
+        client = MockClient(RejectingIBGE(self.app.config))
+        counts = fetch_counts(client, 1705)
+        self.assertEqual(counts.stat_localidades, {"N1": 1, "N3": 27})
+        # The combined request, then one per level
+        self.assertEqual(len(client.urls), 5)
+        self.assertTrue(client.urls[-1].endswith("/localidades/N3"))
+
+    def test_fetch_counts_async(self):
+        counts = asyncio.run(fetch_counts_async(AsyncMockClient(self.app), 1))
+        self.assertEqual(counts, fetch_counts(self.client, 1))
+
+    def test_from_raw_accepts_counts(self):
+        metadados = self.client.get(build_url_metadados(1))
+        counts = AgregadoCounts.from_raw(metadados, 10, {"N1": 1})
+        self.assertEqual(counts.n_periodos, 10)
+        self.assertEqual(counts.stat_localidades, {"N1": 1})
+        self.assertEqual(counts.n_categorias, [20, 20])
+
+    def test_count_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "counts.json"
+            index = CountIndex(path)
+            counts = index.get_or_fetch(self.client, 1705)
+            index.get_or_fetch(self.client, 1705)
+            self.assertEqual(len(self.client.urls), 3)
+            index.save()
+
+            reloaded = CountIndex(path)
+            self.assertIn(1705, reloaded)
+            self.assertEqual(reloaded.get(1705), counts)
+            reloaded.invalidate(1705)
+            self.assertIsNone(reloaded.get(1705))
+
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestCalculateCatalog(unittest.TestCase):
+    def test_matches_calculate_aggregate(self):
+        agregado = TestStats().create_dummy_agregado()
+        counts = [
+            AgregadoCounts.from_agregado(agregado),
+            AgregadoCounts(7, "P2", 3, {"N3": 27}, 4, []),
+            AgregadoCounts(8, "P2", 0, {}, 0, [5]),
+        ]
+        table = calculate_catalog(counts)
+
+        self.assertEqual(table["n_localidades_N3"].tolist(), [0, 27, 0])
+        for i, c in enumerate(counts):
+            expected = calculate_aggregate_counts(c)
+            for key, value in expected.items():
+                if key != "stat_localidades":
+                    self.assertEqual(table[key][i], value, key)
+        self.assertEqual(table["total_size"].dtype, numpy.int64)
+
+    def test_exact_overflowing_sizes(self):
+        counts = [
+            AgregadoCounts(1, "", 500, {"N6": 5570}, 30, [200] * 6),
+            AgregadoCounts(2, "", 1, {"N1": 1}, 1, [2]),
+        ]
+        table = calculate_catalog(counts)
+
+        self.assertEqual(table["total_size"].dtype, object)
+        self.assertEqual(
+            table["total_size"][0], 5570 * 30 * 200**6 * 500
+        )
+        self.assertEqual(
+            table["total_size"][0],
+            calculate_aggregate_counts(counts[0])["total_size"],
+        )
+        self.assertEqual(table["total_size"].argmax(), 0)
+
+    def test_empty_catalog(self):
+        table = calculate_catalog([])
+        self.assertEqual(len(table["total_size"]), 0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,124 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from sidra_fetcher.reader import read_localidades
+from sidra_fetcher.sidra import Parametro, parameter_from_url
+from sidra_fetcher.territorio import UFS, TerritorioIndex, rewrite_parametro
+
+
+def municipios(uf, n):
+    return [
+        {
+            "id": f"{uf}{i:05d}",
+            "nome": f"Município {uf}{i:05d}",
+            "nivel": {"id": "N6", "nome": "Município"},
+        }
+        for i in range(n)
+    ]
+
+
+def make_indice():
+    data = []
+    for uf in UFS:
+        data += municipios(uf, 3)
+    # São Paulo and Rio de Janeiro listed out of order
+    data += municipios("35", 50)[3:] + municipios("33", 20)[3:]
+    return TerritorioIndex.from_localidades(read_localidades(data))
+
+
+class TestTerritorioIndex(unittest.TestCase):
+    def setUp(self):
+        self.indice = make_indice()
+
+    def test_hierarchy(self):
+        indice = self.indice
+        self.assertEqual(len(indice.ids_of("N6")), 27 * 3 + 47 + 17)
+        self.assertEqual(indice.parent("N6", "3500007"), ("N3", "35"))
+        self.assertEqual(indice.parent("N3", "35"), ("N2", "3"))
+        self.assertEqual(indice.parent("N2", "3"), ("N1", "1"))
+        self.assertIsNone(indice.parent("N1", "1"))
+        self.assertEqual(indice.nome("N3", "35"), "São Paulo")
+        self.assertEqual(indice.ancestor("N6", "3300001", "N2"), "3")
+        self.assertEqual(indice.children("N2", "3"), ["31", "32", "33", "35"])
+
+        sudeste = indice.descendants("N2", "3", "N6")
+        self.assertEqual(len(sudeste), 3 + 3 + 20 + 50)
+        self.assertEqual(
+            set(indice.ancestors("N6", sudeste, "N3")),
+            {"31", "32", "33", "35"},
+        )
+        self.assertEqual(
+            indice.descendants("N1", "1", "N6"), indice.ids_of("N6")
+        )
+        with self.assertRaises(ValueError):
+            indice.span("N6", "3500007", "N3")
+
+    def test_spans_are_contiguous(self):
+        indice = self.indice
+        for uf in UFS:
+            inicio, fim = indice.span("N3", uf, "N6")
+            self.assertTrue(
+                all(indice.ids[i].startswith(uf) for i in range(inicio, fim))
+            )
+
+    def test_missing_parents_and_other_levels(self):
+        indice = TerritorioIndex.from_localidades(
+            municipios("99", 2)
+            + [{"id": "1", "nome": "RM", "nivel": {"id": "N7", "nome": "RM"}}]
+        )
+        self.assertEqual(indice.parent("N6", "9900000"), ("N3", "99"))
+        self.assertEqual(indice.parent("N3", "99"), ("N2", "9"))
+        self.assertEqual(indice.nome("N3", "99"), "")
+        self.assertNotIn(("N7", "1"), indice)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "territorios.json"
+            self.indice.save(path)
+            loaded = TerritorioIndex.load(path)
+        self.assertEqual(list(loaded), list(self.indice))
+        self.assertEqual(loaded.pais, self.indice.pais)
+
+
+class TestRewrite(unittest.TestCase):
+    def setUp(self):
+        self.indice = make_indice()
+
+    def test_rewrite(self):
+        indice = self.indice
+        ids = indice.descendants("N3", "35", "N6")
+        ids += indice.descendants("N3", "33", "N6")
+        self.assertEqual(indice.rewrite("N6", ids), ["in%20n3%2033,35"])
+
+        sudeste = indice.descendants("N2", "3", "N6")
+        self.assertEqual(indice.rewrite("N6", sudeste), ["in%20n2%203"])
+        self.assertEqual(indice.rewrite("N6", indice.ids_of("N6")), ["all"])
+        self.assertEqual(indice.rewrite("N3", ["33", "35"]), ["33", "35"])
+
+        # Incomplete states and unknown ids are kept as they are
+        self.assertEqual(indice.rewrite("N6", ids[1:]), ids[1:])
+        self.assertEqual(
+            indice.rewrite("N6", [*ids, "9999999"]), [*ids, "9999999"]
+        )
+
+    def test_rewrite_parametro(self):
+        ids = self.indice.descendants("N3", "35", "N6")
+        parametro = Parametro(
+            agregado="1612",
+            territorios={"6": ids, "3": ["all"]},
+            variaveis=["214"],
+            periodos=["202001"],
+            classificacoes={},
+        )
+        rewritten = rewrite_parametro(parametro, self.indice)
+        self.assertEqual(
+            rewritten.territorios, {"6": ["in%20n3%2035"], "3": ["all"]}
+        )
+        self.assertIn("/n6/in%20n3%2035/n3/all/", rewritten.url())
+        self.assertEqual(parameter_from_url(rewritten.url()), rewritten)
+        self.assertEqual(parametro.territorios["6"], ids)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import gzip
+import json
+import math
+import tempfile
+import unittest
+from pathlib import Path
+
+from sidra_fetcher.mock import build_values
+from sidra_fetcher.sidra import Parametro, Precisao
+from sidra_fetcher.values import (
+    Status,
+    decode_rows,
+    decode_value,
+    decode_values,
+    read_values,
+    split_header,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TestValues(unittest.TestCase):
+    def test_decode_value(self):
+        self.assertEqual(decode_value("1.5"), (1.5, Status.OK))
+        self.assertEqual(decode_value("-"), (0.0, Status.ZERO))
+        for simbolo, status in [
+            ("..", Status.NAO_SE_APLICA),
+            ("...", Status.NAO_DISPONIVEL),
+            ("X", Status.SIGILO),
+            ("abc", Status.INVALIDO),
+            (None, Status.INVALIDO),
+        ]:
+            valor, s = decode_value(simbolo)
+            self.assertTrue(math.isnan(valor))
+            self.assertEqual(s, status)
+
+    def test_split_header(self):
+        rows = build_values(3)
+        header, data = split_header(rows)
+        self.assertEqual(header["V"], "Valor")
+        self.assertEqual(data, rows[1:])
+
+        header, data = split_header(rows[1:])
+        self.assertEqual(header["D1C"], "D1C")
+        self.assertEqual(len(data), 3)
+        self.assertEqual(split_header([]), ({}, []))
+
+    def test_read_values(self):
+        rows = build_values(3)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "values.json.gz"
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                json.dump(rows, f)
+            self.assertEqual(read_values(path), rows)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestDecodeValues(unittest.TestCase):
+    def test_decode_values(self):
+        valores = ["1.5", "-", "..", "...", "X", None, "-2"]
+        numeros, status = decode_values(valores)
+        self.assertEqual(numeros.dtype, np.float64)
+        self.assertEqual(status.dtype, np.int8)
+        np.testing.assert_array_equal(
+            numeros, [1.5, 0.0, np.nan, np.nan, np.nan, np.nan, -2.0]
+        )
+        self.assertEqual(status.tolist(), [0, 1, 2, 3, 4, 5, 0])
+
+    def test_decode_values_matches_decode_value(self):
+        valores = ["1.5", "abc", "X", "1e3"]
+        numeros, status = decode_values(valores)
+        esperado = [decode_value(v) for v in valores]
+        np.testing.assert_array_equal(numeros, [v for v, _ in esperado])
+        self.assertEqual(status.tolist(), [s for _, s in esperado])
+
+    def test_decode_values_decimais(self):
+        numeros, _ = decode_values(["1.2345", "2.5"], decimais=2)
+        np.testing.assert_array_equal(numeros, [1.23, 2.5])
+        numeros, status = decode_values([])
+        self.assertEqual((numeros.size, status.size), (0, 0))
+
+    def test_decode_rows(self):
+        header = {"V": "Valor", "D1C": "Variável (Código)"}
+        rows = [
+            header,
+            {"V": "1.234", "D1C": "63"},
+            {"V": "1.234", "D1C": "69"},
+            {"V": "X", "D1C": "69"},
+        ]
+        parametro = Parametro(
+            agregado="1419",
+            territorios={"1": ["all"]},
+            variaveis=["63", "69"],
+            periodos=[],
+            classificacoes={},
+            decimais={"63": Precisao.D1, "69": Precisao.D2},
+        )
+        numeros, status = decode_rows(rows, parametro)
+        np.testing.assert_array_equal(numeros, [1.2, 1.23, np.nan])
+        self.assertEqual(
+            status.tolist(), [Status.OK, Status.OK, Status.SIGILO]
+        )
+
+        numeros, _ = decode_rows(rows)
+        self.assertEqual(numeros[0], 1.234)
+
+        # A variable more precise than the general decimals keeps them
+        parametro.decimais = {"": Precisao.D0, "63": Precisao.M}
+        numeros, _ = decode_rows(rows, parametro)
+        np.testing.assert_array_equal(numeros, [1.234, 1.0, np.nan])
+
+
+if __name__ == "__main__":
+    unittest.main()